@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк задержки интерактивных запросов при интенсивной записи
+Сравнивает прямые вызовы Database из корутин и AsyncDatabase
+
+Запуск: python -m bench.async_db_latency [--writes N]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from config import DatabaseConfig
+
+# Глобальное подключение database.db не должно трогать рабочую БД
+DatabaseConfig.DB_FILENAME = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from database import Database, AsyncDatabase
+
+
+async def heavy_writer(call, writes):
+    """Поток записей из "тяжёлого" чата"""
+    for i in range(writes):
+        await call("add_user", f"bench_user_{i}_{time.perf_counter_ns()}")
+
+
+async def interactive_reader(call, task_id, stop, latencies):
+    """
+    Короткие запросы из интерактивного чата: get_task идет в SQLite
+    на каждый вызов (get_user отдал бы кэш пользователей без обращения к БД)
+    """
+    while not stop.is_set():
+        started = time.perf_counter()
+        await call("get_task", task_id)
+        await asyncio.sleep(0.005)
+        latencies.append((time.perf_counter() - started) * 1000 - 5)
+
+
+async def run_scenario(call, task_id, writes):
+    latencies = []
+    stop = asyncio.Event()
+    reader = asyncio.create_task(interactive_reader(call, task_id, stop, latencies))
+    started = time.perf_counter()
+    await asyncio.gather(*(heavy_writer(call, writes // 4) for _ in range(4)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await reader
+    return latencies, elapsed
+
+
+def report(name, latencies, elapsed, writes):
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0
+    print(
+        f"{name:<14} writes/s={writes / elapsed:8.0f}  "
+        f"reads={len(latencies):5d}  "
+        f"median={statistics.median(latencies or [0]):6.2f}ms  "
+        f"p99={p99:6.2f}ms"
+    )
+
+
+async def main(writes):
+    database = Database(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    database.add_user("bench_reader")
+    task_id = database.add_task("Задача интерактивного чата", "bench_reader")
+
+    async def direct(name, *args):
+        return getattr(database, name)(*args)
+
+    async_db = AsyncDatabase(database)
+
+    async def pooled(name, *args):
+        return await getattr(async_db, name)(*args)
+
+    report("sync Database", *await run_scenario(direct, task_id, writes), writes)
+    report("AsyncDatabase", *await run_scenario(pooled, task_id, writes), writes)
+    async_db.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writes", type=int, default=2000)
+    asyncio.run(main(parser.parse_args().writes))
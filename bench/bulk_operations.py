@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк групповых операций над задачами
+Сравнивает смену статуса и удаление N задач по одной
+(update_task_status/delete_task - транзакция на задачу) и пакетом
+(update_tasks_status/delete_tasks - executemany в одной транзакции)
+
+Запуск: python -m bench.bulk_operations [--tasks N] [--comments N]
+        [--synchronous NORMAL|FULL]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from config import DatabaseConfig, TaskStatuses
+
+# Глобальное подключение database.db не должно трогать рабочую БД
+DatabaseConfig.DB_FILENAME = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from database import Database
+
+
+def prepare(tasks, comments):
+    database = Database(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    task_ids = [database.add_task(f"Задача {i}", "bench") for i in range(tasks)]
+    for task_id in task_ids:
+        for i in range(comments):
+            database.add_comment(task_id, "bench", f"comment {i}")
+    return database, task_ids
+
+
+def timed(operation):
+    started = time.perf_counter()
+    operation()
+    return (time.perf_counter() - started) * 1000
+
+
+def run(batch, tasks, comments):
+    database, task_ids = prepare(tasks, comments)
+    if batch:
+        status_ms = timed(lambda: database.update_tasks_status(task_ids, TaskStatuses.DONE))
+        delete_ms = timed(lambda: database.delete_tasks(task_ids))
+    else:
+        status_ms = timed(lambda: [
+            database.update_task_status(task_id, TaskStatuses.DONE) for task_id in task_ids
+        ])
+        delete_ms = timed(lambda: [database.delete_task(task_id) for task_id in task_ids])
+
+    with database.pool.reader() as connection:
+        left = connection.execute("SELECT COUNT(*) FROM comments").fetchone()[0]
+    database.close()
+    return status_ms, delete_ms, left
+
+
+def main(tasks, comments):
+    print(f"synchronous={DatabaseConfig.SYNCHRONOUS} задач={tasks} "
+          f"комментариев на задачу={comments}")
+    for batch in (False, True):
+        status_ms, delete_ms, left = run(batch, tasks, comments)
+        title = "пакетом" if batch else "по одной"
+        print(f"{title:<9} статус: {status_ms:8.1f}ms  удаление: {delete_ms:8.1f}ms  "
+              f"комментариев осталось: {left}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--comments", type=int, default=5)
+    parser.add_argument("--synchronous", default=DatabaseConfig.SYNCHRONOUS)
+    args = parser.parse_args()
+    DatabaseConfig.SYNCHRONOUS = args.synchronous
+    main(args.tasks, args.comments)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Микробенчмарк выбора обработчика нажатия inline-кнопки
+Сравнивает прежнюю цепочку CallbackQueryHandler с регулярными выражениями
+(PTB проверяет check_update каждого по очереди) и CallbackRouter
+(один разбор callback_data и поиск в словаре)
+
+Запуск: python -m bench.callback_router [--presses N]
+"""
+
+import argparse
+import re
+import time
+
+from telegram import CallbackQuery, Update, User
+from telegram.ext import CallbackQueryHandler
+
+from utils.router import CallbackRouter, build_callback
+
+# Прежние шаблоны в порядке регистрации модулей
+LEGACY_PATTERNS = [
+    "^create_task$", "^task_", "^(take|complete|reopen)_", "^delete_", "^filter_",
+    re.compile(
+        r"^(?:status_(?P<status>[a-z_]+?)_)?(?:period_(?P<period>[a-z]+)_)?"
+        r"page_(?P<page>\d+)(?:_(?P<direction>[ab])_(?P<created_ts>\d+)_(?P<id>\d+))?$"
+    ),
+    r"^search_page_\d+$",
+    "^comment_", "^(view_comments|comments_older|comments_newer)_",
+    "^manage_users$", "^change_role_",
+    "^promote_", "^demote_", "^delete_user_", "^admin_tasks$",
+    "^(select_day|prev_month|next_month|quick_period)_",
+    None,  # button_handler из main.py без шаблона
+]
+
+# Одни и те же нажатия в прежнем и новом формате callback_data
+PRESSES = [
+    ("task_42", build_callback("task", 42)),
+    ("take_42", build_callback("status", 42, "take")),
+    ("comment_42", build_callback("comment", 42)),
+    ("comments_older_42_1792310256_900", build_callback("comments", 42, "older", 1792310256, 900)),
+    ("status_new_page_3_a_1792310256_17", build_callback("page", 3, "new", "", "a", 1792310256, 17)),
+    ("filter_period_week", build_callback("filter", "period", "week")),
+    ("delete_user_some_user", build_callback("delete_user", "some_user")),
+    ("next_month_2026_10", build_callback("calendar", "next", 2026, 10)),
+    ("back", build_callback("back")),
+]
+
+
+async def noop(update, context):
+    pass
+
+
+def make_update(data):
+    user = User(1, "Bench", False)
+    return Update(1, callback_query=CallbackQuery("1", user, "1", data=data))
+
+
+def legacy_dispatch(handlers, update):
+    for handler in handlers:
+        if handler.check_update(update) not in (None, False):
+            return handler
+    return None
+
+
+def measure(dispatch, updates, presses):
+    started = time.perf_counter()
+    for i in range(presses):
+        dispatch(updates[i % len(updates)])
+    return (time.perf_counter() - started) / presses * 1e9
+
+
+def main(presses):
+    legacy = [CallbackQueryHandler(noop, pattern=pattern) for pattern in LEGACY_PATTERNS]
+
+    router = CallbackRouter()
+    actions = ["create_task", "task", "status", "delete", "filter", "page", "search_page",
+               "comment", "comments", "manage_users", "user_detail", "change_role",
+               "promote", "demote", "delete_user", "admin_tasks", "calendar", "back", "ignore"]
+    router.add_routes({action: noop for action in actions})
+    router_handler = router.get_handler()
+
+    legacy_updates = [make_update(old) for old, _ in PRESSES]
+    router_updates = [make_update(new) for _, new in PRESSES]
+
+    legacy_ns = measure(lambda update: legacy_dispatch(legacy, update), legacy_updates, presses)
+    router_ns = measure(
+        lambda update: router_handler.check_update(update)
+        and router.resolve(update.callback_query.data),
+        router_updates, presses
+    )
+    print(f"regex chain ({len(legacy)} handlers): {legacy_ns:8.0f} ns/press")
+    print(f"CallbackRouter ({len(actions)} routes): {router_ns:8.0f} ns/press")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--presses", type=int, default=200000)
+    main(parser.parse_args().presses)
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+Регрессионная проверка планов частых запросов
+Завершается с кодом 1, если хотя бы один запрос из HOT_QUERIES
+выполняется полным просмотром таблицы
+
+Запуск: python -m bench.check_query_plans [--db путь_к_бд]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+from config import DatabaseConfig
+
+# Глобальное подключение database.db не должно трогать рабочую БД
+DatabaseConfig.DB_FILENAME = os.path.join(tempfile.mkdtemp(), "plans.db")
+
+from database import Database, HOT_QUERIES
+
+
+def main(db_filename):
+    database = Database(db_filename or DatabaseConfig.DB_FILENAME)
+    problems = database.check_query_plans()
+    for name, (sql, params) in HOT_QUERIES.items():
+        plan = database.explain_query_plan(sql, params)
+        mark = "FAIL" if name in problems else "ok"
+        print(f"[{mark:>4}] {name}: {' | '.join(plan)}")
+    database.close()
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", help="Проверить существующую БД вместо пустой")
+    sys.exit(main(parser.parse_args().db))
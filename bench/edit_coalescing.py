@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Стенд подавления пустых правок и слияния частых правок сообщений
+Два сценария на заглушке Bot API:
+  повторные нажатия - пользователь листает 3 страницы и фильтры,
+      часть нажатий не меняет сообщение;
+  быстрые нажатия - несколько правок одного сообщения подряд, пока
+      предыдущая ждет очереди SendScheduler
+Сравниваются SendScheduler без отслеживания состояния и
+MessageStateTracker поверх него: запросы правки, ответы
+"message is not modified" и время
+
+Запуск: python -m bench.edit_coalescing [--chats N] [--presses N]
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
+from telegram.ext import ExtBot
+
+from bench.fake_bot_api import FakeBotApi
+from utils.message_state import MessageStateTracker
+from utils.send_queue import SendScheduler
+
+TOKEN = "1:bench"
+PAGES = 3
+
+
+def render(page):
+    """Текст и клавиатура страницы списка задач"""
+    keyboard = InlineKeyboardMarkup([
+        [InlineKeyboardButton(str(number), callback_data=f"page:{number}")
+         for number in range(1, PAGES + 1)],
+        [InlineKeyboardButton("🔍 Фильтр", callback_data="filter")],
+    ])
+    return f"📋 Задачи, страница {page}", keyboard
+
+
+async def run(limiter, chats, presses, concurrent):
+    api = FakeBotApi()
+    api.start()
+    bot = ExtBot(TOKEN, base_url=api.base_url, rate_limiter=limiter)
+    await bot.initialize()
+    rng = random.Random(42)
+    errors = 0
+
+    async def edit(message, page):
+        nonlocal errors
+        text, keyboard = render(page)
+        try:
+            await bot.edit_message_text(
+                text, chat_id=message.chat_id, message_id=message.message_id,
+                reply_markup=keyboard
+            )
+        except BadRequest:
+            errors += 1
+
+    async def user(chat_id):
+        text, keyboard = render(1)
+        message = await bot.send_message(chat_id, text, reply_markup=keyboard)
+        pages = [rng.randint(1, PAGES) for _ in range(presses)]
+        if concurrent:
+            # Нажатия быстрее, чем Telegram позволяет править сообщение
+            await asyncio.gather(*(edit(message, page) for page in pages))
+        else:
+            for page in pages:
+                await edit(message, page)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(chat_id) for chat_id in range(1, chats + 1)))
+    elapsed = time.perf_counter() - started
+    await bot.shutdown()
+    await api.stop()
+    return {
+        "elapsed": elapsed,
+        "edit_calls": api.calls["editMessageText"],
+        "not_modified": api.not_modified,
+        "errors": errors,
+        "stats": limiter.get_stats() if isinstance(limiter, MessageStateTracker) else None,
+    }
+
+
+def report(title, requested, result):
+    print(f"  {title:<28} правок: {requested:5d}  запросов: {result['edit_calls']:5d}  "
+          f"not modified: {result['not_modified']:4d}  время: {result['elapsed']:6.2f} с")
+    stats = result["stats"]
+    if stats:
+        print(f"  {'':<28} подавлено: {stats['suppressed']}  слито: {stats['coalesced']}  "
+              f"сэкономлено запросов: {stats['saved_calls']}")
+
+
+async def main(chats, presses):
+    # Журнал каждого запроса искажает замер
+    logging.getLogger().setLevel(logging.ERROR)
+
+    for title, concurrent in (("повторные нажатия", False), ("быстрые нажатия", True)):
+        print(title)
+        requested = chats * presses
+        report("SendScheduler", requested, await run(SendScheduler(), chats, presses, concurrent))
+        report("MessageStateTracker", requested, await run(
+            MessageStateTracker(SendScheduler()), chats, presses, concurrent
+        ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--presses", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.chats, args.presses))
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Локальная заглушка Telegram Bot API для стендов
+Отвечает на методы бота (getMe, setWebhook, sendMessage, ...) без
+обращения к Telegram и считает вызовы; бот направляется на нее через
+TaskTrackerBot(base_url=FakeBotApi.base_url). При заданных лимитах
+отвечает 429 с retry_after, как Telegram при превышении лимитов, а на
+правку без изменений - 400 "message is not modified"
+"""
+
+import asyncio
+import itertools
+import json
+import socket
+import time
+from collections import Counter, defaultdict, deque
+
+from tornado.httpserver import HTTPServer
+from tornado.web import Application, RequestHandler
+
+# Методы, возвращающие отправленное/измененное сообщение
+MESSAGE_METHODS = {"sendMessage", "sendDocument", "editMessageText", "editMessageReplyMarkup"}
+
+
+class ApiError(Exception):
+    """Ответ Bot API с ошибкой"""
+
+    def __init__(self, code, description):
+        super().__init__(description)
+        self.code = code
+        self.description = description
+
+
+def free_port():
+    """Свободный TCP-порт на localhost"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class _MethodHandler(RequestHandler):
+    def initialize(self, api):
+        self.api = api
+
+    async def post(self, method):
+        params = self._params()
+        retry_after = self.api.check_flood(params)
+        if retry_after:
+            self.set_status(429)
+            self.set_header("Content-Type", "application/json")
+            self.write(json.dumps({
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {retry_after}",
+                "parameters": {"retry_after": retry_after},
+            }))
+            return
+        self.set_header("Content-Type", "application/json")
+        try:
+            result = await self.api.handle(method, params)
+        except ApiError as error:
+            self.set_status(error.code)
+            self.write(json.dumps({
+                "ok": False, "error_code": error.code, "description": error.description,
+            }))
+            return
+        self.write(json.dumps({"ok": True, "result": result}))
+
+    def _params(self):
+        if self.request.headers.get("Content-Type", "").startswith("application/json"):
+            return json.loads(self.request.body or b"{}")
+        params = {key: self.get_argument(key) for key in self.request.arguments}
+        # Загруженный файл (multipart) - первый из request.files
+        for uploads in self.request.files.values():
+            params["_document"] = (uploads[0].filename, uploads[0].body)
+            break
+        return params
+
+
+class _FileHandler(RequestHandler):
+    def initialize(self, api):
+        self.api = api
+
+    def get(self, file_path):
+        content = self.api.files.get(file_path)
+        if content is None:
+            self.set_status(404)
+            return
+        self.write(content)
+
+
+class FakeBotApi:
+    """Заглушка Bot API со счетчиками вызовов"""
+
+    def __init__(self, port=None, latency_ms=0, chat_limit=None, global_limit=None,
+                 retry_after=1):
+        """
+        :param port: Порт сервера (None - свободный)
+        :param latency_ms: Искусственная задержка ответа на каждый вызов
+        :param chat_limit: Максимум запросов к одному чату за секунду (None - без лимита)
+        :param global_limit: Максимум запросов к чатам за секунду (None - без лимита)
+        :param retry_after: Значение retry_after в ответе 429
+        """
+        self.port = port or free_port()
+        self.latency = latency_ms / 1000
+        self.chat_limit = chat_limit
+        self.global_limit = global_limit
+        self.retry_after = retry_after
+        self.calls = Counter()
+        self.flood_rejections = 0
+        self.not_modified = 0
+        # Текущие текст и клавиатура сообщений: (chat_id, message_id) -> (text, markup)
+        self.messages = {}
+        # Файлы для getFile: file_path -> содержимое
+        self.files = {}
+        # Отправленные ботом документы: (имя, содержимое)
+        self.documents = []
+        self._chat_window = defaultdict(deque)
+        self._global_window = deque()
+        self.call_times = []
+        self._message_ids = itertools.count(1)
+        self._server = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}/bot"
+
+    @property
+    def base_file_url(self):
+        return f"http://127.0.0.1:{self.port}/file/bot"
+
+    def add_file(self, name, content):
+        """
+        Файл, который бот может скачать (как присланный пользователем документ)
+        :return: file_id для Document в обновлении
+        """
+        file_id = f"file{len(self.files) + 1}"
+        self.files[f"documents/{file_id}_{name}"] = content
+        return file_id
+
+    def start(self):
+        """Запуск сервера в текущем цикле событий"""
+        app = Application([
+            (r"/bot[^/]+/(\w+)", _MethodHandler, {"api": self}),
+            (r"/file/bot[^/]+/(.+)", _FileHandler, {"api": self}),
+        ])
+        self._server = HTTPServer(app)
+        self._server.listen(self.port, "127.0.0.1")
+
+    async def stop(self):
+        self._server.stop()
+        await self._server.close_all_connections()
+
+    def check_flood(self, params):
+        """
+        Проверка лимитов по скользящему окну в одну секунду
+        :return: retry_after для ответа 429 или None
+        """
+        chat_id = params.get("chat_id")
+        if chat_id is None:
+            return None
+        now = time.monotonic()
+        windows = []
+        if self.chat_limit:
+            windows.append((self._chat_window[str(chat_id)], self.chat_limit))
+        if self.global_limit:
+            windows.append((self._global_window, self.global_limit))
+        for window, limit in windows:
+            while window and window[0] <= now - 1:
+                window.popleft()
+            if len(window) >= limit:
+                self.flood_rejections += 1
+                return self.retry_after
+        for window, _ in windows:
+            window.append(now)
+        return None
+
+    async def handle(self, method, params):
+        """Ответ на вызов метода Bot API"""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls[method] += 1
+        self.call_times.append((method, time.perf_counter()))
+
+        if method == "getFile":
+            file_id = params.get("file_id")
+            for file_path, content in self.files.items():
+                if file_path.startswith(f"documents/{file_id}_"):
+                    return {
+                        "file_id": file_id, "file_unique_id": file_id,
+                        "file_size": len(content), "file_path": file_path,
+                    }
+            raise ApiError(400, "Bad Request: file not found")
+        if method == "sendDocument":
+            self.documents.append(params.pop("_document", None))
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        if method in MESSAGE_METHODS:
+            chat_id = int(params.get("chat_id") or 1)
+            message_id = int(params.get("message_id") or next(self._message_ids))
+            if method == "editMessageReplyMarkup":
+                text = self.messages.get((chat_id, message_id), ("", None))[0]
+            else:
+                text = params.get("text", "")
+            new_state = (text, params.get("reply_markup"))
+            if method != "sendMessage" and self.messages.get((chat_id, message_id)) == new_state:
+                self.not_modified += 1
+                raise ApiError(400, "Bad Request: message is not modified: specified new "
+                                    "message content and reply markup are exactly the same")
+            self.messages[(chat_id, message_id)] = new_state
+            return {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": text,
+            }
+        return True
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк групповой фиксации записей
+Сравнивает устойчивую скорость вставки комментариев из параллельных
+обработчиков с GROUP_COMMIT и без него
+
+Запуск: python -m bench.group_commit [--writers N] [--inserts N]
+        [--interval-ms N] [--synchronous NORMAL|FULL]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import DatabaseConfig
+
+# Глобальное подключение database.db не должно трогать рабочую БД
+DatabaseConfig.DB_FILENAME = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from database import Database
+
+
+def run(group_commit, writers, inserts, interval_ms):
+    database = Database(
+        os.path.join(tempfile.mkdtemp(), "bench.db"),
+        group_commit=group_commit
+    )
+    if database.group_writer:
+        database.group_writer.interval = interval_ms / 1000
+    task_id = database.add_task("Бенчмарк", "bench")
+
+    def writer(worker):
+        for i in range(inserts // writers):
+            database.add_comment(task_id, f"user_{worker}", f"comment {i}")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers) as executor:
+        list(executor.map(writer, range(writers)))
+    elapsed = time.perf_counter() - started
+
+    batches = database.group_writer.batches if database.group_writer else inserts
+    database.close()
+    return inserts / elapsed, inserts / max(batches, 1)
+
+
+def main(writers, inserts, interval_ms):
+    print(f"synchronous={DatabaseConfig.SYNCHRONOUS} writers={writers}")
+    for group_commit in (False, True):
+        rate, per_batch = run(group_commit, writers, inserts, interval_ms)
+        print(
+            f"group_commit={str(group_commit):<5}  "
+            f"inserts/s={rate:9.0f}  operations/commit={per_batch:6.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--inserts", type=int, default=20000)
+    parser.add_argument(
+        "--interval-ms", type=int, default=DatabaseConfig.GROUP_COMMIT_INTERVAL_MS
+    )
+    parser.add_argument("--synchronous", default=DatabaseConfig.SYNCHRONOUS)
+    args = parser.parse_args()
+    DatabaseConfig.SYNCHRONOUS = args.synchronous
+    main(args.writers, args.inserts, args.interval_ms)
@@ -0,0 +1,443 @@
+# -*- coding: utf-8 -*-
+"""
+Нагрузочный стенд обработчиков бота
+Заполняет временную БД заданным количеством пользователей, задач и
+комментариев (Database.import_rows) и прогоняет через
+Application.process_update синтетические обновления для настоящих
+TaskHandlers, CommentHandlers, UserHandlers и AdminHandlers.
+Bot API заменен заглушкой StubRequest без сети, поэтому замер
+включает разбор обновления, маршрутизацию, обработчик, запросы к БД
+и сборку ответа, но не сеть и не ограничение частоты запросов.
+
+Каждый сценарий выполняется отдельно --ops раз при --concurrency
+одновременных обновлениях; для сценария выводятся p50/p95/p99 задержки
+и пропускная способность. С --baseline результаты сравниваются с
+сохраненными: рост p95 или падение пропускной способности больше
+--tolerance завершает стенд с кодом 1. Базовые значения зависят от
+машины - после смены окружения их нужно перезаписать (--update-baseline)
+
+Запуск: python -m bench.handler_load [--users N] [--tasks N] [--comments N]
+        [--ops N] [--concurrency N] [--warmup N] [--trace SAMPLE_RATE]
+        [--scenario NAME ...]
+        [--baseline bench/baselines/handler_load.json] [--update-baseline]
+        [--tolerance 0.5]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from config import BotConfig, DatabaseConfig, Roles, TaskStatuses
+
+# Глобальное подключение database.db не должно трогать рабочую БД
+DatabaseConfig.DB_FILENAME = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from telegram import Update
+from telegram.ext import ApplicationBuilder
+from telegram.request import BaseRequest
+
+from database import db, init_database
+from handlers.admin import register_admin_handlers
+from handlers.comments import register_comment_handlers
+from handlers.tasks import register_task_handlers
+from handlers.users import register_user_handlers
+from utils.router import CallbackRouter, build_callback
+from utils.tracing import Tracer
+
+TOKEN = "1:bench"
+ADMIN_ID = 1
+FIRST_USER_ID = 1000
+DAY = 24 * 60 * 60
+HISTORY_DAYS = 90
+WORDS = (
+    "принтер", "отчет", "сервер", "договор", "счет", "доступ", "почта",
+    "сайт", "релиз", "встреча", "бюджет", "закупка", "ошибка", "склад",
+)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "handler_load.json")
+# Рост p95 меньше этого порога (мс) не считается регрессией: шум планировщика
+MIN_REGRESSION_MS = 1.0
+
+
+class StubRequest(BaseRequest):
+    """Заглушка HTTP-слоя Bot API: мгновенный ответ без сети"""
+
+    MESSAGE_METHODS = {
+        "sendMessage", "editMessageText", "editMessageReplyMarkup", "sendDocument",
+    }
+
+    def __init__(self):
+        self.calls = Counter()
+        self._message_id = 0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        endpoint = url.rsplit("/", 1)[-1]
+        self.calls[endpoint] += 1
+        parameters = request_data.parameters if request_data else {}
+
+        if endpoint == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        elif endpoint in self.MESSAGE_METHODS:
+            self._message_id += 1
+            result = {
+                "message_id": parameters.get("message_id", self._message_id),
+                "date": int(time.time()),
+                "chat": {"id": int(parameters.get("chat_id", 0)), "type": "private"},
+                "text": parameters.get("text", ""),
+            }
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+def username(index):
+    return f"user_{index}"
+
+
+def text(rng, words=6):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed_records(rng, users, tasks, comments, now):
+    """Поток записей для Database.import_rows"""
+    yield "user", {"username": BotConfig.ADMIN_USERNAME, "role": Roles.ADMIN}
+    for index in range(users):
+        role = Roles.MANAGER if index % 50 == 0 else Roles.USER
+        yield "user", {"username": username(index), "role": role}
+
+    # Задачи равномерно распределены по последним HISTORY_DAYS дням,
+    # id растут вместе с датой, как в рабочей БД
+    started = now - HISTORY_DAYS * DAY
+    for task_id in range(1, tasks + 1):
+        yield "task", {
+            "id": task_id,
+            "description": text(rng),
+            "status": rng.choice(TaskStatuses.ALL_STATUSES),
+            "created_by": username(rng.randrange(users)),
+            "created_ts": started + (task_id * HISTORY_DAYS * DAY) // tasks,
+        }
+
+    for comment_id in range(1, comments + 1):
+        yield "comment", {
+            "id": comment_id,
+            "task_id": rng.randint(1, tasks),
+            "username": username(rng.randrange(users)),
+            "text": text(rng, 4),
+            "created_ts": started + (comment_id * HISTORY_DAYS * DAY) // comments,
+        }
+
+
+def seed(users, tasks, comments):
+    started = time.perf_counter()
+    inserted = db.import_rows(seed_records(random.Random(42), users, tasks, comments,
+                                           int(time.time())))
+    init_database()
+    print(f"БД: пользователей {inserted['user']}, задач {inserted['task']}, "
+          f"комментариев {inserted['comment']} за {time.perf_counter() - started:.1f} с")
+
+
+class UpdateFactory:
+    """Синтетические обновления Telegram от пользователя или администратора"""
+
+    def __init__(self, users):
+        self.users = users
+        self._update_id = 0
+
+    def _next_id(self):
+        self._update_id += 1
+        return self._update_id
+
+    def sender(self, rng, admin=False):
+        if admin:
+            return ADMIN_ID, BotConfig.ADMIN_USERNAME
+        index = rng.randrange(self.users)
+        return FIRST_USER_ID + index, username(index)
+
+    def message(self, sender, text):
+        user_id, name = sender
+        update_id = self._next_id()
+        entities = []
+        if text.startswith("/"):
+            entities.append({"type": "bot_command", "offset": 0, "length": len(text.split()[0])})
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": name, "username": name},
+                "text": text,
+                "entities": entities,
+            },
+        }
+
+    def callback(self, sender, data):
+        user_id, name = sender
+        update_id = self._next_id()
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "chat_instance": str(user_id),
+                "data": data,
+                "from": {"id": user_id, "is_bot": False, "first_name": name, "username": name},
+                "message": {
+                    "message_id": 1,
+                    "date": int(time.time()),
+                    "chat": {"id": user_id, "type": "private"},
+                    "text": "bench",
+                },
+            },
+        }
+
+
+def build_scenarios(factory, users, tasks):
+    """
+    Сценарии нагрузки: имя -> функция(rng), возвращающая список обновлений.
+    Обновления сценария обрабатываются последовательно (как нажатия
+    одного пользователя), задержка сценария - их суммарное время
+    """
+    def task_id(rng):
+        return rng.randint(1, tasks)
+
+    def user(rng):
+        return factory.sender(rng)
+
+    def admin(rng):
+        return factory.sender(rng, admin=True)
+
+    return {
+        # TaskHandlers
+        "tasks_user": lambda rng: [factory.message(user(rng), "/tasks")],
+        "tasks_admin": lambda rng: [factory.message(admin(rng), "/tasks")],
+        "page": lambda rng: [factory.callback(
+            user(rng), build_callback("page", 1, rng.choice(list(TaskStatuses.KEYS)), "")
+        )],
+        "filter_period": lambda rng: [factory.callback(
+            admin(rng), build_callback("filter", "period", rng.choice(("today", "week", "month")))
+        )],
+        "task_detail": lambda rng: [factory.callback(user(rng), build_callback("task", task_id(rng)))],
+        "change_status": lambda rng: [factory.callback(
+            admin(rng), build_callback("status", task_id(rng), rng.choice(("take", "complete")))
+        )],
+        "create_task": lambda rng: (lambda sender: [
+            factory.callback(sender, build_callback("create_task")),
+            factory.message(sender, text(rng)),
+        ])(user(rng)),
+        "search": lambda rng: [factory.message(user(rng), f"/search {rng.choice(WORDS)}")],
+        # CommentHandlers
+        "comments": lambda rng: [factory.callback(user(rng), build_callback("comments", task_id(rng)))],
+        "add_comment": lambda rng: (lambda sender: [
+            factory.callback(sender, build_callback("comment", task_id(rng))),
+            factory.message(sender, text(rng, 4)),
+        ])(user(rng)),
+        # UserHandlers
+        "profile": lambda rng: [factory.message(user(rng), "/profile")],
+        "manage_users": lambda rng: [factory.callback(admin(rng), build_callback("manage_users"))],
+        "user_detail": lambda rng: [factory.callback(
+            admin(rng), build_callback("user_detail", username(rng.randrange(users)))
+        )],
+        "change_role": lambda rng: [factory.callback(admin(rng), build_callback(
+            "change_role", username(rng.randrange(users)), rng.choice((Roles.USER, Roles.MANAGER))
+        ))],
+        # AdminHandlers
+        "admin_tasks": lambda rng: [factory.callback(admin(rng), build_callback("admin_tasks"))],
+        "promote": lambda rng: [factory.callback(
+            admin(rng), build_callback("promote", username(rng.randrange(users)))
+        )],
+    }
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run_scenario(application, make_updates, ops, concurrency, errors, warmup=0):
+    """
+    Прогон сценария: ops выполнений, не более concurrency одновременно.
+    Первые warmup выполнений прогревают кэши и не входят в результат
+    """
+    rng = random.Random(7)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    for _ in range(warmup):
+        for data in make_updates(rng):
+            await application.process_update(Update.de_json(data, application.bot))
+
+    async def one():
+        async with semaphore:
+            updates = [Update.de_json(data, application.bot) for data in make_updates(rng)]
+            started = time.perf_counter()
+            for update in updates:
+                await application.process_update(update)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    errors.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(ops)))
+    elapsed = time.perf_counter() - started
+    return {
+        "p50": round(percentile(latencies, 0.50), 2),
+        "p95": round(percentile(latencies, 0.95), 2),
+        "p99": round(percentile(latencies, 0.99), 2),
+        "throughput": round(ops / elapsed, 1),
+        "errors": len(errors),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Сравнение с базовыми значениями
+    :return: Список описаний регрессий (пустой - регрессий нет)
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if (result["p95"] > base["p95"] * (1 + tolerance)
+                and result["p95"] - base["p95"] > MIN_REGRESSION_MS):
+            regressions.append(f"{name}: p95 {base['p95']:.2f} -> {result['p95']:.2f} мс")
+        if result["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: пропускная способность {base['throughput']:.0f} -> "
+                f"{result['throughput']:.0f} /с"
+            )
+    return regressions
+
+
+async def main(args):
+    # Журнал каждого запроса искажает замер
+    logging.getLogger().setLevel(logging.ERROR)
+    seed(args.users, args.tasks, args.comments)
+
+    request = StubRequest()
+    application = (
+        ApplicationBuilder()
+        .token(TOKEN)
+        .request(request)
+        .get_updates_request(StubRequest())
+        .build()
+    )
+    # Регистрация как в TaskTrackerBot._register_handlers, без ограничителя запросов
+    router = CallbackRouter()
+    register_task_handlers(application, router)
+    register_comment_handlers(application, router)
+    register_user_handlers(application, router)
+    register_admin_handlers(application, router)
+    application.add_handler(router.get_handler())
+    if args.trace is not None:
+        # Замер накладных расходов оберток /stats
+        tracer = Tracer(args.trace)
+        tracer.instrument_application(application, router)
+        tracer.instrument_database(db)
+
+    errors = []
+
+    async def on_error(update, context):
+        errors.append(repr(context.error))
+
+    application.add_error_handler(on_error)
+
+    scenarios = build_scenarios(UpdateFactory(args.users), args.users, args.tasks)
+    names = args.scenario or list(scenarios)
+    results = {}
+    print(f"операций на сценарий: {args.ops}, одновременно: {args.concurrency}")
+    print(f"  {'сценарий':<14} {'p50 мс':>8} {'p95 мс':>8} {'p99 мс':>8} {'оп/с':>8}  ошибки")
+    async with application:
+        for name in names:
+            result = await run_scenario(
+                application, scenarios[name], args.ops, args.concurrency, errors,
+                warmup=args.warmup
+            )
+            results[name] = result
+            print(f"  {name:<14} {result['p50']:8.2f} {result['p95']:8.2f} "
+                  f"{result['p99']:8.2f} {result['throughput']:8.0f}  {result['errors']}"
+                  + (f" ({errors[0]})" if errors else ""))
+    db.close()
+    return results
+
+
+def params_of(args):
+    """Параметры, при которых сравнение с базовыми значениями имеет смысл"""
+    params = {
+        "users": args.users,
+        "tasks": args.tasks,
+        "comments": args.comments,
+        "ops": args.ops,
+        "concurrency": args.concurrency,
+    }
+    if args.trace is not None:
+        params["trace"] = args.trace
+    return params
+
+
+def check_baseline(args, results):
+    """
+    Сравнение с сохраненными значениями или их перезапись
+    :return: Код завершения процесса
+    """
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as stream:
+            json.dump({"params": params_of(args), "results": results}, stream,
+                      ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"Базовые значения сохранены: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Базовых значений нет ({args.baseline}), сравнение пропущено")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as stream:
+        baseline = json.load(stream)
+    if baseline["params"] != params_of(args):
+        print(f"Базовые значения сняты с другими параметрами {baseline['params']}, "
+              f"сравнение пропущено")
+        return 0
+
+    failed = any(result["errors"] for result in results.values())
+    regressions = compare(results, baseline["results"], args.tolerance)
+    for line in regressions:
+        print(f"РЕГРЕССИЯ {line}")
+    if failed:
+        print("Есть ошибки обработчиков")
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=50000)
+    parser.add_argument("--comments", type=int, default=200000)
+    parser.add_argument("--ops", type=int, default=300, help="Выполнений каждого сценария")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20,
+                        help="Прогревочных выполнений сценария перед замером")
+    parser.add_argument("--trace", type=float, metavar="SAMPLE_RATE",
+                        help="Обернуть обработчики и методы БД Tracer с долей замера")
+    parser.add_argument("--scenario", action="append",
+                        help="Запустить только указанные сценарии")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Перезаписать базовые значения результатами прогона")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Допустимое ухудшение p95 и пропускной способности (доля)")
+    args = parser.parse_args()
+    sys.exit(check_baseline(args, asyncio.run(main(args))))
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Микробенчмарк клавиатур
+Сравнивает время и объем выделяемой памяти на один отрисованный экран
+для готовых (закэшированных) клавиатур и их построения с нуля
+
+Запуск: python -m bench.keyboards [--screens N]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from config import BotConfig, TaskStatuses
+from utils.keyboards import Keyboards
+
+
+def render_screen(task_id, cached):
+    """
+    Клавиатуры типичного экрана: меню, фильтры, карточка, подтверждение
+    :return: Список разметок (удерживается, чтобы учесть всю выделенную память)
+    """
+    if cached:
+        return [
+            Keyboards.get_main_menu_keyboard("user"),
+            Keyboards.get_filters_keyboard("status"),
+            Keyboards.get_filters_keyboard("period"),
+            Keyboards.get_confirmation_keyboard("delete"),
+            Keyboards.get_task_keyboard(TaskStatuses.NEW, BotConfig.ADMIN_USERNAME, task_id),
+        ]
+
+    # Исходные построители без кэша
+    Keyboards._task_keyboard_rows.cache_clear()
+    return [
+        Keyboards._build_main_menu.__wrapped__(False),
+        Keyboards._build_filters_keyboard.__wrapped__("status"),
+        Keyboards._build_filters_keyboard.__wrapped__("period"),
+        Keyboards.get_confirmation_keyboard.__wrapped__("delete"),
+        Keyboards.get_task_keyboard(TaskStatuses.NEW, BotConfig.ADMIN_USERNAME, task_id),
+    ]
+
+
+def measure(screens, cached):
+    render_screen(0, cached)
+    started = time.perf_counter()
+    for task_id in range(screens):
+        render_screen(task_id, cached)
+    elapsed = time.perf_counter() - started
+
+    # Пиковый объем памяти, выделяемой за отрисовку одного экрана
+    tracemalloc.start()
+    allocated = 0
+    for task_id in range(screens):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        markups = render_screen(task_id, cached)
+        allocated += tracemalloc.get_traced_memory()[1] - current
+        del markups
+    tracemalloc.stop()
+    return elapsed / screens * 1e6, allocated / screens
+
+
+def main(screens):
+    for cached in (False, True):
+        per_screen_us, bytes_per_screen = measure(screens, cached)
+        print(
+            f"{'prebuilt' if cached else 'fresh':<9} "
+            f"{per_screen_us:8.1f} us/screen  "
+            f"{bytes_per_screen:8.0f} bytes allocated/screen"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--screens", type=int, default=2000)
+    main(parser.parse_args().screens)
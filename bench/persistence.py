@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк сохранения состояния диалогов
+Сравнивает PicklePersistence PTB (on_flush=False - файл перезаписывается
+на каждый update_user_data, on_flush=True - один раз при flush) и
+SQLitePersistence на N сохраненных пользователях:
+  запуск - то, что Application.initialize читает из хранилища;
+  проход - M пользователей начинают ввод (refresh_user_data перед
+      обработчиком, update_user_data и запись на диск), как при одном
+      проходе update_persistence
+
+Запуск: python -m bench.persistence [--users N ...] [--changed M]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import pickle
+import tempfile
+import time
+
+from config import DatabaseConfig
+
+# Глобальное подключение database.db не должно трогать рабочую БД
+DatabaseConfig.DB_FILENAME = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from telegram import Bot
+from telegram.ext import PersistenceInput, PicklePersistence
+
+from database import AsyncDatabase, Database
+from utils.persistence import SQLitePersistence
+
+STORE_DATA = PersistenceInput(bot_data=False, chat_data=False, callback_data=False)
+BATCH = 10000
+
+# Заполнение БД пакетами по BATCH строк попадает в журнал медленных запросов
+logging.getLogger("database").setLevel(logging.ERROR)
+
+
+def user_state(user_id):
+    """Типичное состояние: фильтры списка и выбранные задачи"""
+    return {
+        "task_filters": {"status": "new", "period": "week"},
+        "selected_tasks": {user_id, user_id + 1},
+        "search_query": f"запрос {user_id}",
+    }
+
+
+def make_pickle(directory, on_flush):
+    persistence = PicklePersistence(
+        os.path.join(directory, "state.pickle"), store_data=STORE_DATA, on_flush=on_flush
+    )
+    persistence.set_bot(Bot("1:bench"))
+    return persistence
+
+
+async def seed_pickle(directory, users):
+    persistence = make_pickle(directory, on_flush=True)
+    await persistence.get_user_data()
+    for user_id in range(users):
+        await persistence.update_user_data(user_id, user_state(user_id))
+    await persistence.flush()
+    return os.path.getsize(os.path.join(directory, "state.pickle"))
+
+
+def seed_sqlite(database, users):
+    for start in range(0, users, BATCH):
+        database.save_persistent_data([
+            ("user", str(user_id), pickle.dumps(user_state(user_id), pickle.HIGHEST_PROTOCOL))
+            for user_id in range(start, min(users, start + BATCH))
+        ])
+
+
+async def measure(persistence, users, changed):
+    """
+    :return: (мс запуска, мс прохода)
+    """
+    started = time.perf_counter()
+    user_data = dict(await persistence.get_user_data())
+    startup = (time.perf_counter() - started) * 1000
+
+    step = max(1, users // changed)
+    started = time.perf_counter()
+    for user_id in range(0, step * changed, step):
+        data = user_data.setdefault(user_id, {})
+        await persistence.refresh_user_data(user_id, data)
+        data["awaiting_task"] = True
+    await asyncio.gather(*(
+        persistence.update_user_data(user_id, dict(user_data[user_id]))
+        for user_id in range(0, step * changed, step)
+    ))
+    await persistence.flush()
+    return startup, (time.perf_counter() - started) * 1000
+
+
+async def run(users, changed):
+    directory = tempfile.mkdtemp()
+    size = await seed_pickle(directory, users)
+    results = {}
+    for title, on_flush in (("pickle", False), ("pickle on_flush", True)):
+        results[title] = await measure(make_pickle(directory, on_flush), users, changed)
+
+    database = Database(os.path.join(directory, "state.db"))
+    seed_sqlite(database, users)
+    async_database = AsyncDatabase(database)
+    results["sqlite"] = await measure(SQLitePersistence(async_database), users, changed)
+    async_database.shutdown()
+
+    print(f"пользователей {users}, изменили состояние {changed}, "
+          f"файл pickle {size / 1024 / 1024:.1f} МБ")
+    for title, (startup, update) in results.items():
+        print(f"  {title:<16} запуск: {startup:9.1f} мс  проход: {update:9.1f} мс")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--changed", type=int, default=100)
+    args = parser.parse_args()
+    for users in args.users:
+        asyncio.run(run(users, args.changed))
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк полнотекстового поиска /search
+Заполняет временную БД синтетическими задачами и комментариями
+(частоты слов по закону Ципфа) и измеряет задержку search_tasks
+для слов разной частоты
+
+Запуск: python -m bench.search [--comments N] [--tasks N] [--queries N]
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from config import DatabaseConfig
+
+# Глобальное подключение database.db не должно трогать рабочую БД
+DatabaseConfig.DB_FILENAME = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from database import Database
+from utils.filters import time_buckets
+
+VOCABULARY_SIZE = 50000
+WORDS_PER_TEXT = 12
+BATCH = 10000
+
+# Заполнение БД пакетами по BATCH строк попадает в журнал медленных запросов
+logging.getLogger("database").setLevel(logging.ERROR)
+
+
+def make_vocabulary(rng):
+    alphabet = "абвгдежзиклмнопрстуфхцчшэюя"
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choice(alphabet) for _ in range(rng.randint(4, 10))))
+    return sorted(words)
+
+
+def fill(database, rng, vocabulary, tasks, comments):
+    # Веса по закону Ципфа: первые слова словаря встречаются чаще всего
+    cum_weights = list(itertools.accumulate(
+        1 / rank for rank in range(1, len(vocabulary) + 1)
+    ))
+    created_ts = int(time.time())
+    buckets = time_buckets(created_ts)
+
+    def text():
+        return " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=WORDS_PER_TEXT))
+
+    with database.pool.writer() as connection:
+        connection.executemany(
+            """INSERT INTO tasks (description, status, created_by, created_ts,
+            day_bucket, week_bucket, month_bucket)
+            VALUES (?, 'Новая', ?, ?, ?, ?, ?)""",
+            [(text(), f"user_{i % 100}", created_ts, *buckets) for i in range(tasks)]
+        )
+
+    for start in range(0, comments, BATCH):
+        rows = [
+            (rng.randint(1, tasks), f"user_{i % 100}", text(), created_ts, *buckets)
+            for i in range(start, min(start + BATCH, comments))
+        ]
+        with database.pool.writer() as connection:
+            connection.executemany(
+                """INSERT INTO comments (task_id, username, text, created_ts,
+                day_bucket, week_bucket, month_bucket)
+                VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                rows
+            )
+
+
+def measure(database, words, author=None):
+    latencies = []
+    for word in words:
+        started = time.perf_counter()
+        database.search_tasks(word, author=author)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+def main(comments, tasks, queries):
+    rng = random.Random(42)
+    database = Database(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    vocabulary = make_vocabulary(rng)
+
+    started = time.perf_counter()
+    fill(database, rng, vocabulary, tasks, comments)
+    print(f"заполнение: {comments} комментариев, {tasks} задач "
+          f"за {time.perf_counter() - started:.1f}s")
+
+    # Диапазоны рангов слов: от частых к редким
+    bands = [("частые", 10, 100), ("средние", 1000, 5000), ("редкие", 20000, 50000)]
+    for name, low, high in bands:
+        words = [vocabulary[rng.randrange(low, high)] for _ in range(queries)]
+        matches = statistics.median(
+            len(database.search_tasks(word, limit=10 ** 9)) for word in words[:5]
+        )
+        median, p95 = measure(database, words)
+        author_median, author_p95 = measure(database, words, author="user_1")
+        print(
+            f"{name:<8} ранг {low}-{high:<6} задач~{matches:<7.0f} "
+            f"median={median:7.2f}ms p95={p95:7.2f}ms  "
+            f"(автор: median={author_median:7.2f}ms p95={author_p95:7.2f}ms)"
+        )
+    database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--comments", type=int, default=1000000)
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+    main(args.comments, args.tasks, args.queries)
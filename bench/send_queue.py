@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Стенд планировщика исходящих запросов
+Рассылка уведомлений по многим чатам идет одновременно с ответами
+пользователям; заглушка Bot API отвечает 429 при превышении лимитов.
+Сравниваются бот без ограничителя и с SendScheduler: число ошибок 429,
+ожидание ответов пользователям и время рассылки
+
+Запуск: python -m bench.send_queue [--notifications N] [--chats N]
+        [--replies N] [--strict]
+--strict - заглушка строже лимитов планировщика: 429 неизбежны,
+проверяется повтор после RetryAfter
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from telegram.error import RetryAfter
+from telegram.ext import ExtBot
+
+from bench.fake_bot_api import FakeBotApi
+from config import SendQueueConfig
+from utils.send_queue import SendPriority, SendScheduler
+
+TOKEN = "1:bench"
+# Ответы пользователям идут в чаты, не получающие рассылку
+REPLY_CHAT_OFFSET = 100000
+
+
+def fake_limits(strict):
+    """
+    Лимиты заглушки: максимум, который допускают корзины планировщика
+    за секунду (всплеск + пополнение), либо строже при strict
+    """
+    chat = SendQueueConfig.PRIVATE_CHAT_BURST + SendQueueConfig.PRIVATE_CHAT_RATE
+    total = SendQueueConfig.GLOBAL_BURST + SendQueueConfig.GLOBAL_RATE
+    if strict:
+        return 2, SendQueueConfig.GLOBAL_RATE
+    return int(chat), int(total)
+
+
+async def run(scheduler, notifications, chats, replies, strict):
+    chat_limit, global_limit = fake_limits(strict)
+    api = FakeBotApi(chat_limit=chat_limit, global_limit=global_limit)
+    api.start()
+    bot = ExtBot(TOKEN, base_url=api.base_url, rate_limiter=scheduler)
+    await bot.initialize()
+
+    failures = 0
+
+    async def send(chat_id, text, priority):
+        nonlocal failures
+        # Без ограничителя PTB не принимает rate_limit_args
+        extra = {"rate_limit_args": priority} if scheduler else {}
+        try:
+            await bot.send_message(chat_id, text, **extra)
+        except RetryAfter:
+            failures += 1
+
+    started = time.perf_counter()
+    broadcast = [
+        asyncio.create_task(send(i % chats + 1, f"Уведомление {i}", SendPriority.NOTIFICATION))
+        for i in range(notifications)
+    ]
+
+    # Ответы пользователям приходят по одному, пока идет рассылка
+    reply_latencies = []
+    for i in range(replies):
+        await asyncio.sleep(0.05)
+        reply_started = time.perf_counter()
+        await send(REPLY_CHAT_OFFSET + i, "Ответ", SendPriority.INTERACTIVE)
+        reply_latencies.append((time.perf_counter() - reply_started) * 1000)
+
+    await asyncio.gather(*broadcast)
+    elapsed = time.perf_counter() - started
+    stats = scheduler.get_stats() if scheduler else None
+    await bot.shutdown()
+    await api.stop()
+
+    reply_latencies.sort()
+    return {
+        "elapsed": elapsed,
+        "failures": failures,
+        "rejections": api.flood_rejections,
+        "reply_p50": statistics.median(reply_latencies),
+        "reply_p95": reply_latencies[int(len(reply_latencies) * 0.95) - 1],
+        "limits": (chat_limit, global_limit),
+        "stats": stats,
+    }
+
+
+def report(title, result):
+    chat_limit, global_limit = result["limits"]
+    print(f"{title} (заглушка: {chat_limit}/с на чат, {global_limit}/с всего)")
+    print(f"  время: {result['elapsed']:6.2f} с  ответов 429: {result['rejections']}  "
+          f"не доставлено: {result['failures']}")
+    print(f"  ответ пользователю: p50={result['reply_p50']:7.1f}ms  "
+          f"p95={result['reply_p95']:7.1f}ms")
+    stats = result["stats"]
+    if stats:
+        for name, lane in stats["lanes"].items():
+            print(f"  {name:>12}: отправлено={lane['sent']:4d} "
+                  f"макс. глубина={lane['max_depth']:4d} "
+                  f"ожидание p50={lane['p50_wait_ms']:7.1f}ms "
+                  f"p95={lane['p95_wait_ms']:7.1f}ms макс={lane['max_wait_ms']:7.1f}ms")
+        print(f"  повторов после 429: {stats['retries']}")
+
+
+async def main(notifications, chats, replies, strict):
+    # Предупреждения о каждом 429 искажают замер
+    logging.getLogger().setLevel(logging.ERROR)
+
+    report("без ограничителя", await run(None, notifications, chats, replies, strict))
+    report("SendScheduler", await run(SendScheduler(), notifications, chats, replies, strict))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notifications", type=int, default=300)
+    parser.add_argument("--chats", type=int, default=60)
+    parser.add_argument("--replies", type=int, default=40)
+    parser.add_argument("--strict", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.notifications, args.chats, args.replies, args.strict))
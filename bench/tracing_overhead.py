@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк накладных расходов Tracer
+Замеряет добавочное время одного вызова обертки trace_sync (методы БД)
+и trace_async (обработчики) при разной доле замера SAMPLE_RATE.
+Доля от времени обработчика: расход на вызов, умноженный на число
+оберток за обновление (обработчик и его запросы к БД), деленный на
+время обработки обновления (см. python -m bench.handler_load)
+
+Запуск: python -m bench.tracing_overhead [--calls N]
+"""
+
+import argparse
+import asyncio
+import time
+
+from utils.tracing import TraceKind, Tracer
+
+SAMPLE_RATES = (1.0, 0.1, 0.01)
+
+
+def noop():
+    return [(1,)]
+
+
+async def noop_async():
+    return None
+
+
+def per_call_ns(function, calls):
+    started = time.perf_counter_ns()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter_ns() - started) / calls
+
+
+def per_call_async_ns(function, calls):
+    async def loop():
+        started = time.perf_counter_ns()
+        for _ in range(calls):
+            await function()
+        return (time.perf_counter_ns() - started) / calls
+    return asyncio.run(loop())
+
+
+def main(calls):
+    bare_sync = per_call_ns(noop, calls)
+    bare_async = per_call_async_ns(noop_async, calls)
+    print(f"без обертки: метод {bare_sync:6.0f} нс, корутина {bare_async:6.0f} нс")
+    for rate in SAMPLE_RATES:
+        tracer = Tracer(rate)
+        traced_sync = tracer.trace_sync(TraceKind.DATABASE, "noop", noop)
+        traced_async = tracer.trace_async(TraceKind.HANDLER, "noop", noop_async)
+        sync_ns = per_call_ns(traced_sync, calls) - bare_sync
+        async_ns = per_call_async_ns(traced_async, calls) - bare_async
+        print(f"SAMPLE_RATE={rate:<5} +{sync_ns:5.0f} нс на метод БД, "
+              f"+{async_ns:5.0f} нс на обработчик")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+    main(args.calls)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Стенд режима webhook
+Поднимает TaskTrackerBot со встроенным HTTP-сервером и заглушкой Bot API,
+отправляет POST-запросами записанные обновления и измеряет задержку
+приема, время до обработки всех обновлений и глубину очереди
+
+Запуск: python -m bench.webhook_replay [--updates FILE.jsonl] [--count N]
+        [--concurrency N] [--queue-size N]
+FILE.jsonl - по одному JSON объекту Update (как их присылает Telegram) в строке;
+без --updates используются синтетические команды /start и /help
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from config import DatabaseConfig, WebhookConfig
+
+# Глобальное подключение database.db не должно трогать рабочую БД
+DatabaseConfig.DB_FILENAME = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from bench.fake_bot_api import FakeBotApi, free_port
+
+SECRET_TOKEN = "bench-secret"
+
+
+def synthetic_updates(count, users=50):
+    """Команды /start и /help от users пользователей"""
+    updates = []
+    for update_id in range(1, count + 1):
+        user_id = update_id % users + 1
+        command = "/start" if update_id % 2 else "/help"
+        user = {
+            "id": user_id,
+            "is_bot": False,
+            "first_name": f"User {user_id}",
+            "username": f"bench_user_{user_id}",
+        }
+        updates.append({
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": user,
+                "text": command,
+                "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+            },
+        })
+    return updates
+
+
+def load_updates(path):
+    with open(path, encoding="utf-8") as updates_file:
+        return [json.loads(line) for line in updates_file if line.strip()]
+
+
+async def replay(url, updates, concurrency):
+    """POST обновлений с ограниченным числом одновременных запросов"""
+    latencies = []
+    statuses = []
+    pending = iter(updates)
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET_TOKEN}
+
+    async with httpx.AsyncClient(timeout=60) as client:
+        async def worker():
+            for update in pending:
+                started = time.perf_counter()
+                response = await client.post(url, json=update, headers=headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses.append(response.status_code)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+        # Запрос без секрета должен быть отклонен
+        rejected = await client.post(url, json=updates[0])
+    return latencies, statuses, rejected.status_code
+
+
+async def main(updates, concurrency):
+    # Импорт после подмены DB_FILENAME и настройки очереди
+    from main import TaskTrackerBot
+
+    # Журнал каждого запроса искажает замер
+    logging.getLogger().setLevel(logging.WARNING)
+
+    api = FakeBotApi()
+    api.start()
+
+    WebhookConfig.PORT = free_port()
+    WebhookConfig.SECRET_TOKEN = SECRET_TOKEN
+    bot = TaskTrackerBot(base_url=api.base_url)
+    application = bot.application
+    url = f"http://127.0.0.1:{WebhookConfig.PORT}/{WebhookConfig.URL_PATH}"
+
+    max_depth = 0
+
+    async def sample_queue():
+        nonlocal max_depth
+        while True:
+            max_depth = max(max_depth, application.update_queue.qsize())
+            await asyncio.sleep(0.001)
+
+    async with application:
+        await application.updater.start_webhook(**bot.webhook_options())
+        await application.start()
+        baseline = sum(api.calls.values())
+
+        sampler = asyncio.create_task(sample_queue())
+        started = time.perf_counter()
+        latencies, statuses, rejected = await replay(url, updates, concurrency)
+        accepted = time.perf_counter() - started
+
+        # Ожидание, пока все обновления будут разобраны из очереди
+        while application.update_queue.qsize():
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.05)
+        processed = time.perf_counter() - started
+        sampler.cancel()
+
+        await application.updater.stop()
+        await application.stop()
+
+    await api.stop()
+
+    latencies.sort()
+    print(f"обновлений: {len(updates)}, одновременных запросов: {concurrency}, "
+          f"очередь: {WebhookConfig.INGRESS_QUEUE_SIZE}")
+    print(f"HTTP 200: {statuses.count(200)}/{len(statuses)}, без секрета: HTTP {rejected}")
+    print(f"прием: {len(updates) / accepted:8.0f} обновлений/с  "
+          f"p50={statistics.median(latencies):6.2f}ms  "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1]:6.2f}ms")
+    print(f"обработка: {len(updates) / processed:8.0f} обновлений/с  "
+          f"макс. глубина очереди={max_depth}  "
+          f"вызовов Bot API={sum(api.calls.values()) - baseline}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", help="JSONL-файл с записанными обновлениями")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=WebhookConfig.MAX_CONNECTIONS)
+    parser.add_argument("--queue-size", type=int, default=WebhookConfig.INGRESS_QUEUE_SIZE)
+    args = parser.parse_args()
+    WebhookConfig.INGRESS_QUEUE_SIZE = args.queue_size
+    updates = load_updates(args.updates) if args.updates else synthetic_updates(args.count)
+    asyncio.run(main(updates, args.concurrency))
@@ -15,6 +15,63 @@ class BotConfig:
     # ID чата для логов (опционально)
     LOG_CHAT_ID = None
 
+class WebhookConfig:
+    """Настройки приема обновлений через webhook"""
+    # True - встроенный HTTP-сервер (webhook), False - long polling
+    ENABLED = False
+    
+    # Адрес и порт локального HTTP-сервера
+    LISTEN = "127.0.0.1"
+    PORT = 8443
+    
+    # Путь, на который Telegram отправляет обновления
+    URL_PATH = "telegram"
+    
+    # Публичный HTTPS-адрес (обычно reverse proxy), регистрируемый в setWebhook;
+    # None - адрес строится из LISTEN, PORT и URL_PATH
+    WEBHOOK_URL = None
+    
+    # Секрет из заголовка X-Telegram-Bot-Api-Secret-Token
+    # (запросы без него отклоняются с 403)
+    SECRET_TOKEN = None
+    
+    # Размер очереди входящих обновлений: при переполнении HTTP-ответ
+    # задерживается до освобождения места, и Telegram снижает темп доставки
+    INGRESS_QUEUE_SIZE = 1000
+    
+    # Максимум одновременных соединений Telegram к webhook
+    MAX_CONNECTIONS = 40
+    
+    # Обновления, обрабатываемые одновременно (обновления одного чата -
+    # по очереди): ожидание лимита отправки в одном чате не задерживает другие
+    CONCURRENT_UPDATES = 64
+
+class SendQueueConfig:
+    """Ограничение исходящих запросов к Bot API (лимиты Telegram)"""
+    # Общий лимит бота: сообщений в секунду и допустимый всплеск
+    GLOBAL_RATE = 30
+    GLOBAL_BURST = 30
+
+    # Личный чат: около одного сообщения в секунду, короткие всплески допустимы
+    PRIVATE_CHAT_RATE = 1.0
+    PRIVATE_CHAT_BURST = 3
+
+    # Группы и каналы: не более 20 сообщений в минуту
+    GROUP_CHAT_RATE = 20 / 60
+    GROUP_CHAT_BURST = 3
+
+    # Повторов запроса после ответа 429 (RetryAfter)
+    MAX_RETRIES = 3
+
+    # Запас к retry_after из ответа Telegram (секунды)
+    RETRY_MARGIN = 0.1
+
+    # Количество чатов, после которого неактивные корзины удаляются
+    CHAT_STATE_LIMIT = 10000
+
+    # Количество последних ожиданий для расчета перцентилей
+    WAIT_SAMPLES = 1000
+
 class Roles:
     """Система ролей пользователей"""
     USER = "Пользователь"
@@ -38,6 +95,18 @@ class TaskStatuses:
     
     # Статус по умолчанию для новых задач
     DEFAULT_STATUS = NEW
+    
+    # Ключи статусов в callback_data фильтров
+    KEYS = {
+        "new": NEW,
+        "in_progress": IN_PROGRESS,
+        "done": DONE,
+    }
+    
+    @staticmethod
+    def get_status_name(status):
+        """Отображаемое название статуса (поддерживает ключи из KEYS)"""
+        return TaskStatuses.KEYS.get(status, status)
 
 class DatabaseConfig:
     """Настройки базы данных"""
@@ -45,7 +114,114 @@ class DatabaseConfig:
     DB_FILENAME = "task_tracker.db"
     
     # Максимальное количество соединений
+    # (одно соединение на запись, остальные на чтение)
     POOL_SIZE = 5
+    
+    # Время ожидания блокировки БД другим соединением (секунды)
+    BUSY_TIMEOUT = 5
+    
+    # Режим синхронизации с диском (NORMAL достаточно для WAL, FULL - fsync на каждый commit)
+    SYNCHRONOUS = "NORMAL"
+    
+    # Групповая фиксация записей: одна транзакция на пакет операций
+    GROUP_COMMIT = False
+    
+    # Дополнительное ожидание новых операций перед фиксацией пакета (миллисекунды).
+    # При 0 пакет составляют операции, накопившиеся за время предыдущей фиксации
+    GROUP_COMMIT_INTERVAL_MS = 0
+    
+    # Максимальное количество операций в пакете
+    GROUP_COMMIT_MAX_BATCH = 100
+    
+    # Порог медленного запроса (миллисекунды): такие запросы попадают в журнал
+    # вместе с типами параметров и планом EXPLAIN QUERY PLAN.
+    # None - запросы не замеряются
+    SLOW_QUERY_MS = 50
+    
+    # Количество последних медленных запросов в журнале (кольцевой буфер)
+    SLOW_QUERY_LOG_SIZE = 200
+    
+    # Получать план медленного запроса (один EXPLAIN на текст запроса)
+    SLOW_QUERY_EXPLAIN = True
+    
+    # Срок хранения длинных callback_data (секунды): кнопки, не выдававшиеся
+    # в клавиатурах дольше срока, перестают работать
+    CALLBACK_PAYLOAD_TTL = 30 * 24 * 3600
+    
+    # Как часто удаляются устаревшие callback_data (секунды)
+    CALLBACK_PAYLOAD_PRUNE_INTERVAL = 3600
+
+class PersistenceConfig:
+    """Сохранение состояния диалогов (context.user_data) в БД между перезапусками"""
+    # False - состояние живет только в памяти процесса
+    ENABLED = True
+    
+    # Интервал записи изменившихся ключей в БД (секунды);
+    # при штатной остановке бота все изменения записываются сразу
+    UPDATE_INTERVAL = 10
+
+class TransferConfig:
+    """Настройки импорта и экспорта данных"""
+    # Строк в одном fetchmany при выгрузке и в одной транзакции при загрузке
+    BATCH_SIZE = 5000
+    
+    # Степень сжатия gzip (1 - быстрее, 9 - меньше файл)
+    GZIP_LEVEL = 6
+    
+    # Интервал сообщений о ходе импорта/экспорта (секунды)
+    PROGRESS_INTERVAL = 2.0
+    
+    # Лимиты Bot API на размер файла: отправка ботом и скачивание присланного;
+    # большие выгрузки переносятся через python transfer.py
+    MAX_UPLOAD_SIZE = 50 * 1024 * 1024
+    MAX_DOWNLOAD_SIZE = 20 * 1024 * 1024
+
+class TracingConfig:
+    """Замер обработчиков и методов БД (команда /stats, файл Prometheus)"""
+    # Обертки вокруг обработчиков и методов Database
+    ENABLED = True
+    
+    # Доля вызовов, для которых замеряется время (0..1); вызовы и ошибки
+    # считаются всегда. Уменьшение доли снижает накладные расходы
+    SAMPLE_RATE = 1.0
+    
+    # Файл метрик в текстовом формате Prometheus (node_exporter textfile);
+    # None - файл не пишется
+    PROMETHEUS_FILE = None
+    
+    # Интервал перезаписи файла метрик (секунды)
+    PROMETHEUS_INTERVAL = 15
+    
+    # Строк в каждом разделе ответа /stats
+    STATS_TOP = 10
+
+class CacheConfig:
+    """Настройки кэшей в памяти процесса"""
+    # Максимальное количество пользователей в кэше get_user
+    USER_CACHE_SIZE = 10000
+    
+    # Максимальное количество версий задач в памяти
+    TASK_VERSION_CACHE_SIZE = 10000
+    
+    # Максимальное количество готовых карточек задач
+    TASK_CARD_CACHE_SIZE = 1000
+    
+    # Максимальное количество готовых клавиатур календаря
+    CALENDAR_CACHE_SIZE = 64
+    
+    # Длинные callback_data, сохраненные в БД (payload <-> id)
+    CALLBACK_PAYLOAD_CACHE_SIZE = 1024
+    
+    # Сообщения, для которых помнится отображенный текст и клавиатура
+    MESSAGE_STATE_CACHE_SIZE = 10000
+    
+    # Планы EXPLAIN QUERY PLAN медленных запросов (текст запроса -> план)
+    QUERY_PLAN_CACHE_SIZE = 256
+    
+    # Ключи состояния диалогов (пользователи, чаты), о которых SQLitePersistence
+    # помнит хэш записанного состояния; вытесненный ключ при следующем
+    # обновлении снова читается из БД
+    PERSISTENCE_STATE_CACHE_SIZE = 10000
 
 class Pagination:
     """Настройки пагинации"""
@@ -54,6 +230,19 @@ class Pagination:
     
     # Максимальное количество кнопок пагинации
     MAX_PAGE_BUTTONS = 5
+    
+    # Количество комментариев, читаемых из БД за один запрос
+    COMMENTS_BATCH_SIZE = 20
+    
+    # Максимальная длина сообщения Telegram
+    MESSAGE_MAX_LENGTH = 4096
+    
+    # Максимальное количество результатов поиска
+    SEARCH_RESULTS_LIMIT = 50
+    
+    # Сколько самых новых совпадений в описаниях и в комментариях
+    # ранжируется по bm25 (более старые в выдачу не попадают)
+    SEARCH_RANK_WINDOW = 500
 
 class CalendarConfig:
     """Настройки календаря"""
@@ -4,143 +4,1563 @@
 Соответствует концепции Task Tracker Bot
 """
 
+import asyncio
+import functools
+import json
+import logging
+import queue
 import sqlite3
-from datetime import datetime
-from config import DatabaseConfig, Roles, TaskStatuses, BotConfig
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import deque
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from config import (
+    CacheConfig, DatabaseConfig, Pagination, Roles, TaskStatuses, BotConfig, TransferConfig
+)
+from utils.cache import LRUCache
+from utils.filters import (
+    TaskFilter,
+    sqlite_timestamp_to_epoch,
+    time_buckets,
+    to_fts_query,
+)
 
-class Database:
-    """Класс для работы с базой данных"""
+# Настройка логгирования
+logger = logging.getLogger(__name__)
+
+# ========== Migrations ==========
+def _migration_base_tables(connection):
+    """Базовые таблицы users, tasks и comments"""
+    # Создаем таблицу users без параметра для DEFAULT
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            role TEXT NOT NULL DEFAULT 'user',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
     
-    def __init__(self):
-        """Инициализация соединения с БД"""
-        self.connection = sqlite3.connect(DatabaseConfig.DB_FILENAME)
-        self.cursor = self.connection.cursor()
-        self._create_tables()
-    
-    def _create_tables(self):
-        # Создаем таблицу users без параметра для DEFAULT
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                role TEXT NOT NULL DEFAULT 'user',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Таблица tasks
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'new',
-                created_by TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (created_by) REFERENCES users(username)
-            )
+    # Таблица tasks
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'new',
+            created_by TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (created_by) REFERENCES users(username)
+        )
+    """)
+    
+    # Таблица comments
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS comments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL,
+            username TEXT NOT NULL,
+            text TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (task_id) REFERENCES tasks(id),
+            FOREIGN KEY (username) REFERENCES users(username)
+        )
+    """)
+
+def _migration_task_description(connection):
+    """Переименование tasks.title в tasks.description, которое ожидает код"""
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(tasks)")]
+    if "title" in columns and "description" not in columns:
+        connection.execute("ALTER TABLE tasks RENAME COLUMN title TO description")
+
+def _migration_hot_query_indexes(connection):
+    """Составные индексы для частых запросов"""
+    connection.execute("""
+        CREATE INDEX IF NOT EXISTS idx_comments_task_created
+        ON comments (task_id, created_at)
+    """)
+    connection.execute("""
+        CREATE INDEX IF NOT EXISTS idx_tasks_author_status_created
+        ON tasks (created_by, status, created_at)
+    """)
+    connection.execute("""
+        CREATE INDEX IF NOT EXISTS idx_tasks_status_created
+        ON tasks (status, created_at)
+    """)
+
+def _migration_created_at_index(connection):
+    """Индекс для фильтрации всех задач по периоду"""
+    connection.execute("""
+        CREATE INDEX IF NOT EXISTS idx_tasks_created
+        ON tasks (created_at)
+    """)
+
+def _migration_epoch_timestamps(connection):
+    """
+    Время создания как целое epoch (created_ts) и предвычисленные бакеты
+    day/week/month для задач и комментариев; индексы переводятся на них
+    """
+    for table in ("tasks", "comments"):
+        for column in ("created_ts", "day_bucket", "week_bucket", "month_bucket"):
+            connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER")
+
+        # Заполнение для существующих строк из created_at (UTC)
+        rows = connection.execute(f"SELECT id, created_at FROM {table}").fetchall()
+        updates = []
+        for row_id, created_at in rows:
+            created_ts = sqlite_timestamp_to_epoch(created_at)
+            updates.append((created_ts, *time_buckets(created_ts), row_id))
+        connection.executemany(
+            f"""UPDATE {table} SET created_ts = ?, day_bucket = ?,
+            week_bucket = ?, month_bucket = ? WHERE id = ?""",
+            updates
+        )
+
+    for index in ("idx_comments_task_created", "idx_tasks_author_status_created",
+                  "idx_tasks_status_created", "idx_tasks_created"):
+        connection.execute(f"DROP INDEX IF EXISTS {index}")
+
+    connection.execute("""
+        CREATE INDEX idx_comments_task_created_ts
+        ON comments (task_id, created_ts)
+    """)
+    connection.execute("""
+        CREATE INDEX idx_tasks_author_status_created_ts
+        ON tasks (created_by, status, created_ts)
+    """)
+    connection.execute("""
+        CREATE INDEX idx_tasks_status_created_ts
+        ON tasks (status, created_ts)
+    """)
+    connection.execute("""
+        CREATE INDEX idx_tasks_created_ts
+        ON tasks (created_ts)
+    """)
+    connection.execute("""
+        CREATE INDEX idx_tasks_day_bucket
+        ON tasks (day_bucket)
+    """)
+
+def _migration_task_version(connection):
+    """Счетчик версий задачи для инвалидации готовых карточек"""
+    connection.execute(
+        "ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+    )
+
+SQL_COMMENT_STATS = """
+    SELECT task_id, COUNT(*), MAX(created_ts)
+    FROM comments GROUP BY task_id
+"""
+
+def _migration_comment_counts(connection):
+    """
+    Денормализованные tasks.comment_count и tasks.last_comment_at,
+    поддерживаемые триггерами на comments
+    """
+    connection.execute(
+        "ALTER TABLE tasks ADD COLUMN comment_count INTEGER NOT NULL DEFAULT 0"
+    )
+    connection.execute("ALTER TABLE tasks ADD COLUMN last_comment_at INTEGER")
+
+    connection.execute("""
+        CREATE TRIGGER trg_comments_insert_count AFTER INSERT ON comments
+        BEGIN
+            UPDATE tasks SET
+                comment_count = comment_count + 1,
+                last_comment_at = MAX(COALESCE(last_comment_at, 0), NEW.created_ts)
+            WHERE id = NEW.task_id;
+        END
+    """)
+    connection.execute("""
+        CREATE TRIGGER trg_comments_delete_count AFTER DELETE ON comments
+        BEGIN
+            UPDATE tasks SET
+                comment_count = comment_count - 1,
+                last_comment_at = (
+                    SELECT MAX(created_ts) FROM comments WHERE task_id = OLD.task_id
+                )
+            WHERE id = OLD.task_id;
+        END
+    """)
+
+    # Разовое заполнение для существующих комментариев
+    connection.executemany(
+        "UPDATE tasks SET comment_count = ?, last_comment_at = ? WHERE id = ?",
+        [(count, last, task_id)
+         for task_id, count, last in connection.execute(SQL_COMMENT_STATS)]
+    )
+
+def _migration_full_text_search(connection):
+    """
+    Полнотекстовый поиск FTS5 по описаниям задач и тексту комментариев.
+    Индексы external content хранят только токены, тексты читаются
+    из tasks/comments; синхронизация - триггерами
+    """
+    connection.execute("""
+        CREATE VIRTUAL TABLE tasks_fts USING fts5(
+            description,
+            content='tasks', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    connection.execute("""
+        CREATE VIRTUAL TABLE comments_fts USING fts5(
+            text, task_id UNINDEXED,
+            content='comments', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+
+    connection.execute("""
+        CREATE TRIGGER trg_tasks_fts_insert AFTER INSERT ON tasks
+        BEGIN
+            INSERT INTO tasks_fts(rowid, description) VALUES (NEW.id, NEW.description);
+        END
+    """)
+    connection.execute("""
+        CREATE TRIGGER trg_tasks_fts_delete AFTER DELETE ON tasks
+        BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, description)
+            VALUES ('delete', OLD.id, OLD.description);
+        END
+    """)
+    connection.execute("""
+        CREATE TRIGGER trg_tasks_fts_update AFTER UPDATE OF description ON tasks
+        BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, description)
+            VALUES ('delete', OLD.id, OLD.description);
+            INSERT INTO tasks_fts(rowid, description) VALUES (NEW.id, NEW.description);
+        END
+    """)
+    connection.execute("""
+        CREATE TRIGGER trg_comments_fts_insert AFTER INSERT ON comments
+        BEGIN
+            INSERT INTO comments_fts(rowid, text, task_id)
+            VALUES (NEW.id, NEW.text, NEW.task_id);
+        END
+    """)
+    connection.execute("""
+        CREATE TRIGGER trg_comments_fts_delete AFTER DELETE ON comments
+        BEGIN
+            INSERT INTO comments_fts(comments_fts, rowid, text, task_id)
+            VALUES ('delete', OLD.id, OLD.text, OLD.task_id);
+        END
+    """)
+    connection.execute("""
+        CREATE TRIGGER trg_comments_fts_update AFTER UPDATE OF text, task_id ON comments
+        BEGIN
+            INSERT INTO comments_fts(comments_fts, rowid, text, task_id)
+            VALUES ('delete', OLD.id, OLD.text, OLD.task_id);
+            INSERT INTO comments_fts(rowid, text, task_id)
+            VALUES (NEW.id, NEW.text, NEW.task_id);
+        END
+    """)
+
+    # Разовое построение индексов по существующим данным
+    connection.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+    connection.execute("INSERT INTO comments_fts(comments_fts) VALUES ('rebuild')")
+
+def _migration_callback_payloads(connection):
+    """Длинные callback_data, вынесенные из кнопок (кнопка хранит только id)"""
+    connection.execute("""
+        CREATE TABLE callback_payloads (
+            id INTEGER PRIMARY KEY,
+            payload BLOB UNIQUE NOT NULL,
+            created_ts INTEGER NOT NULL
+        )
+    """)
+
+def _migration_orphan_comments(connection):
+    """Комментарии задач, удаленных до каскадного удаления"""
+    connection.execute(
+        "DELETE FROM comments WHERE task_id NOT IN (SELECT id FROM tasks)"
+    )
+
+def _migration_persistent_data(connection):
+    """Состояние диалогов PTB (user_data, chat_data, ...) для SQLitePersistence"""
+    connection.execute("""
+        CREATE TABLE persistent_data (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            data BLOB NOT NULL,
+            updated_ts INTEGER NOT NULL,
+            PRIMARY KEY (kind, key)
+        ) WITHOUT ROWID
+    """)
+
+def _migration_callback_payload_ids(connection):
+    """
+    id длинной callback_data - хэш ее тела (кодек назначает его без
+    обращения к БД), поэтому уникальность payload снимается; индекс
+    по created_ts - для удаления устаревших записей
+    """
+    connection.execute("""
+        CREATE TABLE callback_payloads_new (
+            id INTEGER PRIMARY KEY,
+            payload BLOB NOT NULL,
+            created_ts INTEGER NOT NULL
+        )
+    """)
+    connection.execute("""
+        INSERT INTO callback_payloads_new (id, payload, created_ts)
+        SELECT id, payload, created_ts FROM callback_payloads
+    """)
+    connection.execute("DROP TABLE callback_payloads")
+    connection.execute("ALTER TABLE callback_payloads_new RENAME TO callback_payloads")
+    connection.execute("""
+        CREATE INDEX idx_callback_payloads_created_ts
+        ON callback_payloads (created_ts)
+    """)
+
+def _migration_period_bucket_indexes(connection):
+    """
+    Индексы фильтров по периоду: равенство бакета дня/недели/месяца
+    и сортировка по created_ts без временного B-дерева
+    """
+    connection.execute("DROP INDEX IF EXISTS idx_tasks_day_bucket")
+    for column in ("day_bucket", "week_bucket", "month_bucket"):
+        connection.execute(f"""
+            CREATE INDEX idx_tasks_{column}_created_ts
+            ON tasks ({column}, created_ts)
         """)
-        
-        # Таблица comments
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS comments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                task_id INTEGER NOT NULL,
-                username TEXT NOT NULL,
-                text TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (task_id) REFERENCES tasks(id),
-                FOREIGN KEY (username) REFERENCES users(username)
+
+# Упорядоченный список миграций: (версия схемы, функция миграции).
+# Уже выпущенные миграции не меняются, новые добавляются в конец.
+MIGRATIONS = [
+    (1, _migration_base_tables),
+    (2, _migration_task_description),
+    (3, _migration_hot_query_indexes),
+    (4, _migration_created_at_index),
+    (5, _migration_epoch_timestamps),
+    (6, _migration_task_version),
+    (7, _migration_comment_counts),
+    (8, _migration_full_text_search),
+    (9, _migration_callback_payloads),
+    (10, _migration_orphan_comments),
+    (11, _migration_persistent_data),
+    (12, _migration_callback_payload_ids),
+    (13, _migration_period_bucket_indexes),
+]
+
+# ========== Hot Queries ==========
+TASK_COLUMNS = (
+    "id, description, status, created_by, created_ts, "
+    "comment_count, last_comment_at"
+)
+
+SQL_TASK_COMMENTS = """
+    SELECT username, text, created_ts
+    FROM comments WHERE task_id = ?
+    ORDER BY created_ts, id
+"""
+
+SQL_COMMENTS_AFTER = """
+    SELECT id, username, text, created_ts
+    FROM comments WHERE task_id = ? AND (created_ts, id) > (?, ?)
+    ORDER BY created_ts, id LIMIT ?
+"""
+
+SQL_COMMENTS_BEFORE = """
+    SELECT id, username, text, created_ts
+    FROM comments WHERE task_id = ? AND (created_ts, id) < (?, ?)
+    ORDER BY created_ts DESC, id DESC LIMIT ?
+"""
+
+SQL_COMMENTS_LATEST = """
+    SELECT id, username, text, created_ts
+    FROM comments WHERE task_id = ?
+    ORDER BY created_ts DESC, id DESC LIMIT ?
+"""
+
+SQL_TASKS_BY_AUTHOR = f"""
+    SELECT {TASK_COLUMNS} FROM tasks
+    WHERE created_by = ?
+    ORDER BY created_ts DESC, id DESC
+"""
+
+SQL_TASKS_BY_AUTHOR_STATUS = f"""
+    SELECT {TASK_COLUMNS} FROM tasks
+    WHERE created_by = ? AND status = ?
+    ORDER BY created_ts DESC, id DESC
+"""
+
+SQL_TASKS_BY_STATUS = f"""
+    SELECT {TASK_COLUMNS} FROM tasks
+    WHERE status = ?
+    ORDER BY created_ts DESC, id DESC
+"""
+
+SQL_TASK_COUNTS_BY_DAY = """
+    SELECT day_bucket, COUNT(*) FROM tasks
+    WHERE day_bucket >= ? AND day_bucket < ?
+    GROUP BY day_bucket
+"""
+
+# Окно ранжирования: SEARCH_RANK_WINDOW самых новых совпадений таблицы
+# (обход списка совпадений по rowid дешев, bm25 вычисляется только для
+# строк окна). Одна строка сверх окна - признак того, что более старые
+# совпадения в ранжирование не попали. Для автора ограничение по
+# задачам применяется внутри окна: чужие совпадения не вытесняют его
+# старые задачи (множество rowid автора строится один раз, "+" не дает
+# передать его в FTS5 как поиск по каждому rowid)
+SQL_SEARCH_TASK_HITS = """
+    SELECT f.rowid, bm25(tasks_fts) FROM tasks_fts f
+    WHERE tasks_fts MATCH :query {author}
+    ORDER BY f.rowid DESC LIMIT :window + 1
+"""
+
+SQL_SEARCH_COMMENT_HITS = """
+    SELECT f.task_id, bm25(comments_fts) FROM comments_fts f
+    WHERE comments_fts MATCH :query {author}
+    ORDER BY f.rowid DESC LIMIT :window + 1
+"""
+
+SQL_SEARCH_AUTHOR_TASKS = """
+    AND +f.rowid IN (SELECT id FROM tasks WHERE created_by = :author)
+"""
+
+SQL_SEARCH_AUTHOR_COMMENTS = """
+    AND +f.rowid IN (
+        SELECT c.id FROM tasks t JOIN comments c ON c.task_id = t.id
+        WHERE t.created_by = :author
+    )
+"""
+
+def build_search_queries(author=None):
+    """SQL совпадений в описаниях и комментариях, опционально только по задачам автора"""
+    return (
+        SQL_SEARCH_TASK_HITS.format(author=SQL_SEARCH_AUTHOR_TASKS if author else ""),
+        SQL_SEARCH_COMMENT_HITS.format(author=SQL_SEARCH_AUTHOR_COMMENTS if author else ""),
+    )
+
+class SearchResults(list):
+    """
+    Задачи, найденные search_tasks, в порядке релевантности.
+    truncated - совпадений больше окна SEARCH_RANK_WINDOW, и более
+    старые из них не ранжировались
+    """
+
+    def __init__(self, tasks=(), truncated=False):
+        super().__init__(tasks)
+        self.truncated = truncated
+
+def build_tasks_query(**filters):
+    """SQL-запрос к tasks по аргументам TaskFilter.build_query"""
+    clause, params = TaskFilter.build_query(**filters)
+    return f"SELECT {TASK_COLUMNS} FROM tasks{clause}", params
+
+# Запросы, которые обязаны использовать индекс: имя -> (SQL, пример параметров)
+HOT_QUERIES = {
+    "get_task_comments": (SQL_TASK_COMMENTS, (1,)),
+    "get_comments_page": (SQL_COMMENTS_BEFORE, (1, 946684800, 1, 20)),
+    "get_user_tasks": (SQL_TASKS_BY_AUTHOR, ("user",)),
+    "get_user_tasks_by_status": (SQL_TASKS_BY_AUTHOR_STATUS, ("user", TaskStatuses.NEW)),
+    "get_all_tasks_by_status": (SQL_TASKS_BY_STATUS, (TaskStatuses.NEW,)),
+    "get_filtered_tasks_by_period": build_tasks_query(period_filter="week", limit=50),
+    "get_task_counts_by_day": (SQL_TASK_COUNTS_BY_DAY, (739000, 739031)),
+    "get_tasks_page": build_tasks_query(
+        status_filter="new", after=(946684800, 1), limit=6
+    ),
+}
+
+# ========== Import / Export ==========
+# Поля записей выгрузки: вид записи -> колонки
+EXPORT_FIELDS = {
+    "user": ("username", "role"),
+    "task": ("id", "description", "status", "created_by", "created_ts"),
+    "comment": ("id", "task_id", "username", "text", "created_ts"),
+}
+
+# Порядок выгрузки: пользователи и задачи раньше ссылающихся на них комментариев
+EXPORT_QUERIES = (
+    ("user", "SELECT username, role FROM users ORDER BY id"),
+    ("task", "SELECT id, description, status, created_by, created_ts FROM tasks ORDER BY id"),
+    ("comment", "SELECT id, task_id, username, text, created_ts FROM comments ORDER BY id"),
+)
+
+# Загрузка с сохранением id; уже существующие строки пропускаются
+IMPORT_QUERIES = {
+    "user": "INSERT OR IGNORE INTO users (username, role) VALUES (:username, :role)",
+    "task": """
+        INSERT OR IGNORE INTO tasks (id, description, status, created_by, created_ts,
+            created_at, day_bucket, week_bucket, month_bucket)
+        VALUES (:id, :description, :status, :created_by, :created_ts,
+            datetime(:created_ts, 'unixepoch'), :day_bucket, :week_bucket, :month_bucket)
+    """,
+    "comment": """
+        INSERT OR IGNORE INTO comments (id, task_id, username, text, created_ts,
+            created_at, day_bucket, week_bucket, month_bucket)
+        VALUES (:id, :task_id, :username, :text, :created_ts,
+            datetime(:created_ts, 'unixepoch'), :day_bucket, :week_bucket, :month_bucket)
+    """,
+}
+
+# Уже занятые id из пакета загружаемых задач (id передаются массивом JSON)
+SQL_IMPORT_EXISTING_TASKS = "SELECT id FROM tasks WHERE id IN (SELECT value FROM json_each(?))"
+
+# Карточки задач, получивших загруженные комментарии, перерисовываются
+SQL_IMPORT_BUMP_VERSION = "UPDATE tasks SET version = version + 1 WHERE id = ?"
+
+# Значения полей, отсутствующих в загружаемой записи
+IMPORT_DEFAULTS = {
+    "role": Roles.DEFAULT_ROLE,
+    "status": TaskStatuses.DEFAULT_STATUS,
+}
+
+# ========== Slow Query Log ==========
+# Операторы, для которых EXPLAIN QUERY PLAN возвращает план
+EXPLAINABLE_STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+
+def has_full_scan(plan):
+    """
+    План содержит полный просмотр таблицы (шаг SCAN); поиск по
+    виртуальной таблице FTS5 тоже называется SCAN, но просмотром не является
+    """
+    return any(
+        step.startswith("SCAN ") and "VIRTUAL TABLE" not in step for step in plan
+    )
+
+def parameter_shape(params):
+    """
+    Типы параметров запроса без значений (в журнал не попадают данные
+    пользователей): (1, "abc") -> ["int", "str(3)"]
+    """
+    def shape(value):
+        if value is None:
+            return "null"
+        if isinstance(value, (str, bytes)):
+            return f"{type(value).__name__}({len(value)})"
+        return type(value).__name__
+
+    if isinstance(params, dict):
+        return {name: shape(value) for name, value in params.items()}
+    return [shape(value) for value in params]
+
+class SlowQueryLog:
+    """
+    Кольцевой буфер медленных запросов.
+    Запись содержит время, текст запроса, типы параметров, количество
+    строк и план EXPLAIN QUERY PLAN; план получается один раз на текст
+    запроса и кэшируется
+    """
+
+    def __init__(self, threshold_ms=None, size=None, explain=None):
+        """
+        :param threshold_ms: Порог в миллисекундах (по умолчанию DatabaseConfig.SLOW_QUERY_MS)
+        :param size: Размер буфера (по умолчанию SLOW_QUERY_LOG_SIZE)
+        :param explain: Получать план запроса (по умолчанию SLOW_QUERY_EXPLAIN)
+        """
+        if threshold_ms is None:
+            threshold_ms = DatabaseConfig.SLOW_QUERY_MS
+        self.threshold = threshold_ms / 1000
+        self.explain = DatabaseConfig.SLOW_QUERY_EXPLAIN if explain is None else explain
+        self._entries = deque(maxlen=size or DatabaseConfig.SLOW_QUERY_LOG_SIZE)
+        self._plans = LRUCache(CacheConfig.QUERY_PLAN_CACHE_SIZE)
+        self.total = 0
+
+    def _query_plan(self, connection, sql, params):
+        """План запроса или None, если его нельзя получить"""
+        if not self.explain or not sql.lstrip().upper().startswith(EXPLAINABLE_STATEMENTS):
+            return None
+
+        def load():
+            try:
+                # Обычный курсор: EXPLAIN не замеряется и не попадает в журнал
+                rows = connection.cursor(sqlite3.Cursor).execute(
+                    f"EXPLAIN QUERY PLAN {sql}", params
+                ).fetchall()
+            except sqlite3.Error:
+                return None
+            return [row[3] for row in rows]
+        return self._plans.get_or_load(sql, load)
+
+    def record(self, connection, sql, params, duration, rows, many=False):
+        """
+        Запись медленного оператора в журнал (быстрые отсекает вызывающий)
+        :param connection: Соединение, на котором выполнялся оператор (для EXPLAIN)
+        :param params: Параметры (для executemany - последовательность наборов)
+        :param duration: Время выполнения и чтения результата в секундах
+        :param rows: Прочитано или изменено строк
+        :param many: Оператор выполнен через executemany
+        """
+        if many:
+            batch = params if isinstance(params, (list, tuple)) else None
+            first = batch[0] if batch else ()
+            shape = {"batch": len(batch) if batch is not None else None,
+                     "params": parameter_shape(first)}
+        else:
+            first = params
+            shape = parameter_shape(params)
+        plan = self._query_plan(connection, sql, first)
+        entry = {
+            "at": time.time(),
+            "ms": duration * 1000,
+            "sql": " ".join(sql.split()),
+            "params": shape,
+            "rows": rows,
+            "plan": plan,
+            "full_scan": bool(plan) and has_full_scan(plan),
+        }
+        self._entries.append(entry)
+        self.total += 1
+        logger.warning(
+            "Медленный запрос %.1f мс (строк: %s)%s: %s; параметры: %s; план: %s",
+            entry["ms"], rows, " [SCAN]" if entry["full_scan"] else "",
+            entry["sql"], shape, "; ".join(plan or ()) or "-"
+        )
+
+    def get_entries(self, limit=None):
+        """Последние медленные запросы, новые первыми"""
+        entries = list(self._entries)
+        entries.reverse()
+        return entries[:limit] if limit else entries
+
+    def clear(self):
+        """Очистка журнала (кэш планов сохраняется)"""
+        self._entries.clear()
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    Курсор, замеряющий каждый оператор: время execute и чтения
+    результата (fetchone/fetchall/fetchmany до конца). Операторы без
+    результата учитываются сразу после execute. Результат, прочитанный
+    перебором курсора, учитывается только временем execute
+    """
+
+    # (sql, параметры) оператора, результат которого еще читается
+    _statement = None
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        self._statement = (sql, parameters)
+        self._elapsed = time.perf_counter() - started
+        self._rows = 0
+        if self.description is None:
+            # rowcount -1: оператор не изменяет строки (DDL, PRAGMA, BEGIN)
+            self._finish(self.rowcount if self.rowcount >= 0 else None)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._statement = (sql, seq_of_parameters)
+        self._elapsed = time.perf_counter() - started
+        self._finish(self.rowcount, many=True)
+        return self
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._consumed(started, 0 if row is None else 1, done=True)
+        return row
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._consumed(started, len(rows), done=True)
+        return rows
+
+    def fetchmany(self, size=None):
+        size = size or self.arraysize
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._consumed(started, len(rows), done=len(rows) < size)
+        return rows
+
+    def _consumed(self, started, rows, done):
+        if self._statement is None:
+            return
+        self._elapsed += time.perf_counter() - started
+        self._rows += rows
+        if done:
+            self._finish(self._rows)
+
+    def _finish(self, rows, many=False):
+        sql, params = self._statement
+        self._statement = None
+        slow_log = self.connection.slow_log
+        if self._elapsed >= slow_log.threshold:
+            slow_log.record(self.connection, sql, params, self._elapsed, rows, many)
+
+class TimedConnection(sqlite3.Connection):
+    """Соединение, выполняющее операторы через TimedCursor"""
+
+    # Журнал медленных запросов (задается ConnectionPool)
+    slow_log = None
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute создает курсор в обход cursor(),
+    # поэтому сокращенные формы переопределены явно
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+class ConnectionPool:
+    """
+    Пул соединений SQLite в режиме WAL.
+    Одно выделенное соединение используется для записи, остальные
+    POOL_SIZE - 1 соединений обслуживают чтение и не ждут писателя.
+    """
+
+    def __init__(self, db_filename: str, size: int = DatabaseConfig.POOL_SIZE):
+        self.db_filename = db_filename
+        self.size = max(2, size)
+        # Журнал медленных запросов всех соединений пула
+        self.slow_log = SlowQueryLog() if DatabaseConfig.SLOW_QUERY_MS is not None else None
+
+        self._writer = self._connect()
+        self._writer_lock = threading.Lock()
+
+        # Соединения на чтение открываются лениво при первой выдаче,
+        # уже после применения миграций писателем
+        self._readers = queue.LifoQueue()
+        for _ in range(self.size - 1):
+            self._readers.put(None)
+
+        # Учёт выдачи соединений
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "reader_checkouts": 0,
+            "writer_checkouts": 0,
+            "reader_waits": 0,
+            "writer_waits": 0,
+            "in_use": 0,
+            "max_in_use": 0,
+        }
+
+    def _connect(self):
+        """Открытие нового соединения с настройками пула"""
+        connection = sqlite3.connect(
+            self.db_filename,
+            timeout=DatabaseConfig.BUSY_TIMEOUT,
+            check_same_thread=False,
+            factory=TimedConnection if self.slow_log else sqlite3.Connection
+        )
+        if self.slow_log:
+            connection.slow_log = self.slow_log
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(f"PRAGMA synchronous={DatabaseConfig.SYNCHRONOUS}")
+        return connection
+
+    def _account(self, kind: str, waited: bool, delta: int):
+        """Обновление счётчиков выдачи/возврата соединений"""
+        with self._stats_lock:
+            if delta > 0:
+                self._stats[f"{kind}_checkouts"] += 1
+                if waited:
+                    self._stats[f"{kind}_waits"] += 1
+            self._stats["in_use"] += delta
+            self._stats["max_in_use"] = max(
+                self._stats["max_in_use"], self._stats["in_use"]
             )
-        """)
-        self.connection.commit()
+
+    @contextmanager
+    def reader(self):
+        """Выдача соединения для чтения"""
+        try:
+            connection = self._readers.get_nowait()
+            waited = False
+        except queue.Empty:
+            connection = self._readers.get()
+            waited = True
+        if connection is None:
+            try:
+                connection = self._connect()
+            except Exception:
+                self._readers.put(None)
+                raise
+        self._account("reader", waited, 1)
+        try:
+            yield connection
+        finally:
+            self._readers.put(connection)
+            self._account("reader", False, -1)
+
+    @contextmanager
+    def writer(self):
+        """
+        Выдача соединения для записи.
+        Транзакция фиксируется при выходе из блока и откатывается при ошибке.
+        """
+        waited = not self._writer_lock.acquire(blocking=False)
+        if waited:
+            self._writer_lock.acquire()
+        self._account("writer", waited, 1)
+        try:
+            yield self._writer
+            self._writer.commit()
+        except Exception:
+            self._writer.rollback()
+            raise
+        finally:
+            self._account("writer", False, -1)
+            self._writer_lock.release()
+
+    def get_stats(self):
+        """Снимок счётчиков пула"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["readers_idle"] = self._readers.qsize()
+        stats["size"] = self.size
+        return stats
+
+    def close(self):
+        """Закрытие всех соединений пула"""
+        with self._writer_lock:
+            self._writer.close()
+        for _ in range(self.size - 1):
+            connection = self._readers.get()
+            if connection is not None:
+                connection.close()
+
+class GroupCommitWriter:
+    """
+    Групповая фиксация записей.
+    Операции из разных потоков накапливаются в очереди и выполняются
+    одной транзакцией раз в GROUP_COMMIT_INTERVAL_MS миллисекунд или при
+    накоплении GROUP_COMMIT_MAX_BATCH операций. Каждая операция изолирована
+    точкой сохранения, поэтому ошибка одной не откатывает остальные;
+    результат или исключение возвращается вызывающему через Future.
+    """
+
+    _STOP = object()
+
+    def __init__(self, pool: ConnectionPool,
+                 interval_ms: int = DatabaseConfig.GROUP_COMMIT_INTERVAL_MS,
+                 max_batch: int = DatabaseConfig.GROUP_COMMIT_MAX_BATCH):
+        self.pool = pool
+        self.interval = interval_ms / 1000
+        self.max_batch = max_batch
+        self.batches = 0
+        self.operations = 0
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="db-group-commit", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, operation):
+        """
+        Постановка операции operation(connection) в очередь
+        :return: concurrent.futures.Future с результатом операции
+        """
+        future = Future()
+        self._queue.put((operation, future))
+        return future
+
+    def _run(self):
+        """Цикл сборки и фиксации пакетов"""
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is self._STOP:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_batch:
+                # Сначала забираем всё, что накопилось за время прошлой
+                # фиксации, и только затем ждем новых операций
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+
+    def _flush(self, batch):
+        """Выполнение пакета операций в одной транзакции"""
+        outcomes = []
+        try:
+            with self.pool.writer() as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                for operation, _ in batch:
+                    connection.execute("SAVEPOINT operation")
+                    try:
+                        outcomes.append((True, operation(connection)))
+                        connection.execute("RELEASE operation")
+                    except Exception as error:
+                        connection.execute("ROLLBACK TO operation")
+                        connection.execute("RELEASE operation")
+                        outcomes.append((False, error))
+        except Exception as error:
+            # Не удалось зафиксировать транзакцию: ошибка у всех операций
+            for _, future in batch:
+                future.set_exception(error)
+            return
+
+        self.batches += 1
+        self.operations += len(batch)
+        for (_, future), (ok, value) in zip(batch, outcomes):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def stop(self):
+        """Фиксация оставшихся операций и остановка потока"""
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+class Database:
+    """Класс для работы с базой данных"""
+    
+    def __init__(self, db_filename=None, group_commit=None):
+        """
+        Инициализация пула соединений с БД
+        :param db_filename: Файл БД (по умолчанию DatabaseConfig.DB_FILENAME)
+        :param group_commit: Включить групповую фиксацию записей
+            (по умолчанию DatabaseConfig.GROUP_COMMIT)
+        """
+        self.pool = ConnectionPool(db_filename or DatabaseConfig.DB_FILENAME)
+        # Кэш количества задач по фильтрам, сбрасывается при записи в tasks
+        self._task_counts = {}
+        self._task_counts_generation = 0
+        self._task_counts_lock = threading.Lock()
+        # Кэш get_user: username -> (username, role) или None
+        self.user_cache = LRUCache(CacheConfig.USER_CACHE_SIZE)
+        # Кэш get_task_version: task_id -> версия или None
+        self.task_versions = LRUCache(CacheConfig.TASK_VERSION_CACHE_SIZE)
+        self._migrate()
+
+        if group_commit is None:
+            group_commit = DatabaseConfig.GROUP_COMMIT
+        self.group_writer = GroupCommitWriter(self.pool) if group_commit else None
+    
+    def _write(self, operation):
+        """
+        Выполнение записи operation(connection) с фиксацией транзакции.
+        В режиме групповой фиксации вызывающий поток ждет, пока операция
+        будет зафиксирована вместе с остальными операциями пакета.
+        :return: Результат operation
+        """
+        if self.group_writer:
+            return self.group_writer.submit(operation).result()
+        with self.pool.writer() as connection:
+            return operation(connection)
+    
+    def _migrate(self):
+        """Применение недостающих миграций схемы"""
+        with self.pool.writer() as connection:
+            current = connection.execute("PRAGMA user_version").fetchone()[0]
+
+        for version, migration in MIGRATIONS:
+            if version <= current:
+                continue
+            # Каждая миграция выполняется в отдельной транзакции вместе
+            # с повышением user_version
+            with self.pool.writer() as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                migration(connection)
+                connection.execute(f"PRAGMA user_version = {version}")
+    
+    def get_schema_version(self):
+        """Текущая версия схемы БД"""
+        with self.pool.reader() as connection:
+            return connection.execute("PRAGMA user_version").fetchone()[0]
     
     # ========== Users ==========
     def add_user(self, username: str, role: str = Roles.DEFAULT_ROLE):
         """Добавление нового пользователя"""
         try:
-            self.cursor.execute(
+            self._write(lambda connection: connection.execute(
                 "INSERT INTO users (username, role) VALUES (?, ?)",
                 (username, role)
-            )
-            self.connection.commit()
+            ))
             return True
         except sqlite3.IntegrityError:
             return False
+        finally:
+            self.user_cache.invalidate(username)
     
     def get_user(self, username: str):
-        """Получение данных пользователя"""
-        self.cursor.execute(
-            "SELECT username, role FROM users WHERE username = ?",
-            (username,)
-        )
-        return self.cursor.fetchone()
+        """Получение данных пользователя (через кэш)"""
+        def load():
+            with self.pool.reader() as connection:
+                return connection.execute(
+                    "SELECT username, role FROM users WHERE username = ?",
+                    (username,)
+                ).fetchone()
+        return self.user_cache.get_or_load(username, load)
+    
+    def get_all_users(self):
+        """Получение списка всех пользователей"""
+        with self.pool.reader() as connection:
+            return connection.execute(
+                "SELECT id, username, role FROM users ORDER BY username"
+            ).fetchall()
     
     def update_user_role(self, username: str, new_role: str):
         """Изменение роли пользователя"""
-        self.cursor.execute(
+        self._write(lambda connection: connection.execute(
             "UPDATE users SET role = ? WHERE username = ?",
             (new_role, username)
-        )
-        return self.connection.commit()
+        ))
+        self.user_cache.invalidate(username)
     
     # ========== Tasks ==========
     def add_task(self, description: str, created_by: str):
         """Добавление новой задачи"""
-        self.cursor.execute(
-            "INSERT INTO tasks (description, created_by) VALUES (?, ?)",
-            (description, created_by)
-        )
-        self.connection.commit()
-        return self.cursor.lastrowid
+        created_ts = int(time.time())
+        task_id = self._write(lambda connection: connection.execute(
+            """INSERT INTO tasks (description, status, created_by, created_ts,
+            day_bucket, week_bucket, month_bucket)
+            VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (description, TaskStatuses.DEFAULT_STATUS, created_by,
+             created_ts, *time_buckets(created_ts))
+        ).lastrowid)
+        self._invalidate_task_counts()
+        # Сбрасываем возможный закэшированный "None" для нового id
+        self.task_versions.invalidate(task_id)
+        return task_id
     
     def get_task(self, task_id: int):
         """Получение данных задачи"""
-        self.cursor.execute(
-            "SELECT * FROM tasks WHERE id = ?",
-            (task_id,)
+        with self.pool.reader() as connection:
+            return connection.execute(
+                f"SELECT {TASK_COLUMNS} FROM tasks WHERE id = ?",
+                (task_id,)
+            ).fetchone()
+    
+    def get_task_version(self, task_id: int):
+        """
+        Версия задачи (растет при смене статуса и изменении комментариев)
+        :return: Номер версии или None, если задачи нет
+        """
+        def load():
+            with self.pool.reader() as connection:
+                row = connection.execute(
+                    "SELECT version FROM tasks WHERE id = ?", (task_id,)
+                ).fetchone()
+            return row[0] if row else None
+        return self.task_versions.get_or_load(task_id, load)
+    
+    def get_all_tasks(self, status: str = None):
+        """Получение всех задач (опционально с заданным статусом)"""
+        with self.pool.reader() as connection:
+            if status:
+                return connection.execute(SQL_TASKS_BY_STATUS, (status,)).fetchall()
+            return connection.execute(
+                f"SELECT {TASK_COLUMNS} FROM tasks ORDER BY created_ts DESC, id DESC"
+            ).fetchall()
+    
+    def get_user_tasks(self, username: str, status: str = None):
+        """Получение задач, созданных пользователем"""
+        with self.pool.reader() as connection:
+            if status:
+                return connection.execute(
+                    SQL_TASKS_BY_AUTHOR_STATUS, (username, status)
+                ).fetchall()
+            return connection.execute(SQL_TASKS_BY_AUTHOR, (username,)).fetchall()
+    
+    def get_filtered_tasks(self, status_filter=None, period_filter=None,
+                           author_filter=None, custom_dates=None, limit=None):
+        """Получение задач с фильтрацией на стороне SQLite (см. TaskFilter.build_query)"""
+        sql, params = build_tasks_query(
+            status_filter=status_filter,
+            period_filter=period_filter,
+            author_filter=author_filter,
+            custom_dates=custom_dates,
+            limit=limit
         )
-        return self.cursor.fetchone()
+        with self.pool.reader() as connection:
+            return connection.execute(sql, params).fetchall()
+    
+    def get_tasks_page(self, after=None, before=None, limit=None, **filters):
+        """
+        Страница задач для keyset-пагинации
+        :param after: Курсор (created_ts, id) последней показанной задачи
+        :param before: Курсор (created_ts, id) первой показанной задачи
+        :param limit: Количество задач (по умолчанию TASKS_PER_PAGE + 1)
+        :param filters: Аргументы фильтров TaskFilter.build_query
+        :return: Список задач, упорядоченных от новых к старым
+        """
+        sql, params = build_tasks_query(
+            after=after,
+            before=before,
+            limit=limit or Pagination.TASKS_PER_PAGE + 1,
+            **filters
+        )
+        with self.pool.reader() as connection:
+            rows = connection.execute(sql, params).fetchall()
+        if before:
+            rows.reverse()
+        return rows
+    
+    def count_tasks(self, **filters):
+        """Количество задач по фильтрам (кэшируется до следующей записи)"""
+        conditions, params = TaskFilter.build_where(**filters)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        # Ключ включает вычисленные границы периода, поэтому "сегодня"
+        # не переживает смену дня
+        key = (where, tuple(params))
+        with self._task_counts_lock:
+            if key in self._task_counts:
+                return self._task_counts[key]
+            generation = self._task_counts_generation
+
+        with self.pool.reader() as connection:
+            count = connection.execute(
+                f"SELECT COUNT(*) FROM tasks{where}", params
+            ).fetchone()[0]
+
+        # Значение, посчитанное параллельно с записью, не кэшируем
+        with self._task_counts_lock:
+            if generation == self._task_counts_generation:
+                self._task_counts[key] = count
+        return count
+    
+    def _invalidate_task_counts(self):
+        """Сброс кэша количества задач"""
+        with self._task_counts_lock:
+            self._task_counts.clear()
+            self._task_counts_generation += 1
+    
+    def search_tasks(self, text: str, author: str = None, limit: int = None):
+        """
+        Полнотекстовый поиск задач по описанию и комментариям.
+        bm25 вычисляется только для SEARCH_RANK_WINDOW самых новых совпадений
+        в описаниях и в комментариях (среди задач автора, если он задан):
+        время запроса по частому слову не растет вместе с числом комментариев,
+        но более старые совпадения за окном не ранжируются и не выдаются
+        :param text: Текст запроса
+        :param author: Искать только среди задач автора (None - среди всех)
+        :param limit: Максимальное количество задач (по умолчанию SEARCH_RESULTS_LIMIT)
+        :return: SearchResults - задачи (TASK_COLUMNS) в порядке релевантности bm25
+            (ранг задачи - лучший bm25 среди ее совпадений)
+        """
+        query = to_fts_query(text)
+        if not query:
+            return SearchResults()
+        window = Pagination.SEARCH_RANK_WINDOW
+        params = {"query": query, "author": author, "window": window}
+        scores = {}
+        truncated = False
+        with self.pool.reader() as connection:
+            for sql in build_search_queries(author):
+                hits = connection.execute(sql, params).fetchall()
+                truncated = truncated or len(hits) > window
+                for task_id, score in hits[:window]:
+                    if task_id not in scores or score < scores[task_id]:
+                        scores[task_id] = score
+            ranked = sorted(scores, key=lambda task_id: (scores[task_id], -task_id))
+            ranked = ranked[:limit or Pagination.SEARCH_RESULTS_LIMIT]
+            rows = connection.execute(
+                f"SELECT {TASK_COLUMNS} FROM tasks WHERE id IN ({', '.join('?' * len(ranked))})",
+                ranked
+            ).fetchall() if ranked else []
+        by_id = {row[0]: row for row in rows}
+        return SearchResults(
+            [by_id[task_id] for task_id in ranked if task_id in by_id], truncated
+        )
+    
+    def get_task_counts_by_day(self, year: int, month: int):
+        """
+        Количество созданных задач по дням месяца (один GROUP BY на месяц)
+        :return: Словарь {день месяца: количество задач}
+        """
+        first_day = date(year, month, 1)
+        next_month = (first_day + timedelta(days=32)).replace(day=1)
+        with self.pool.reader() as connection:
+            rows = connection.execute(
+                SQL_TASK_COUNTS_BY_DAY,
+                (first_day.toordinal(), next_month.toordinal())
+            ).fetchall()
+        return {date.fromordinal(day_bucket).day: count for day_bucket, count in rows}
     
     def update_task_status(self, task_id: int, new_status: str):
         """Обновление статуса задачи"""
-        self.cursor.execute(
-            "UPDATE tasks SET status = ? WHERE id = ?",
+        self._write(lambda connection: connection.execute(
+            "UPDATE tasks SET status = ?, version = version + 1 WHERE id = ?",
             (new_status, task_id)
-        )
-        return self.connection.commit()
+        ))
+        self.task_versions.invalidate(task_id)
+        self._invalidate_task_counts()
+    
+    def update_tasks_status(self, task_ids, new_status: str):
+        """
+        Обновление статуса нескольких задач одной транзакцией
+        :return: Количество обновленных задач
+        """
+        task_ids = list(task_ids)
+        updated = self._write(lambda connection: connection.executemany(
+            "UPDATE tasks SET status = ?, version = version + 1 WHERE id = ?",
+            [(new_status, task_id) for task_id in task_ids]
+        ).rowcount)
+        for task_id in task_ids:
+            self.task_versions.invalidate(task_id)
+        self._invalidate_task_counts()
+        return updated
     
     def delete_task(self, task_id: int):
-        """Удаление задачи"""
-        self.cursor.execute(
-            "DELETE FROM tasks WHERE id = ?",
-            (task_id,)
-        )
-        return self.connection.commit()
+        """Удаление задачи вместе с комментариями"""
+        self.delete_tasks([task_id])
+    
+    def delete_tasks(self, task_ids):
+        """
+        Удаление нескольких задач и их комментариев одной транзакцией
+        :return: Количество удаленных задач
+        """
+        params = [(task_id,) for task_id in task_ids]
+
+        def delete(connection):
+            # Задачи удаляются первыми: триггер счетчика комментариев
+            # тогда не пересчитывает строки удаляемых задач
+            deleted = connection.executemany(
+                "DELETE FROM tasks WHERE id = ?", params
+            ).rowcount
+            connection.executemany("DELETE FROM comments WHERE task_id = ?", params)
+            return deleted
+
+        deleted = self._write(delete)
+        for (task_id,) in params:
+            self.task_versions.invalidate(task_id)
+        self._invalidate_task_counts()
+        return deleted
     
     # ========== Comments ==========
     def add_comment(self, task_id: int, username: str, text: str):
         """Добавление комментария к задаче"""
-        self.cursor.execute(
-            """INSERT INTO comments (task_id, username, text) 
-            VALUES (?, ?, ?)""",
-            (task_id, username, text)
-        )
-        return self.connection.commit()
+        created_ts = int(time.time())
+
+        def insert(connection):
+            comment_id = connection.execute(
+                """INSERT INTO comments (task_id, username, text, created_ts,
+                day_bucket, week_bucket, month_bucket)
+                VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (task_id, username, text, created_ts, *time_buckets(created_ts))
+            ).lastrowid
+            connection.execute(
+                "UPDATE tasks SET version = version + 1 WHERE id = ?",
+                (task_id,)
+            )
+            return comment_id
+
+        comment_id = self._write(insert)
+        self.task_versions.invalidate(task_id)
+        return comment_id
+    
+    def delete_comment(self, comment_id: int):
+        """Удаление комментария"""
+        def delete(connection):
+            row = connection.execute(
+                "SELECT task_id FROM comments WHERE id = ?", (comment_id,)
+            ).fetchone()
+            if not row:
+                return None
+            connection.execute("DELETE FROM comments WHERE id = ?", (comment_id,))
+            connection.execute(
+                "UPDATE tasks SET version = version + 1 WHERE id = ?",
+                (row[0],)
+            )
+            return row[0]
+
+        task_id = self._write(delete)
+        if task_id is not None:
+            self.task_versions.invalidate(task_id)
     
     def get_task_comments(self, task_id: int):
         """Получение комментариев задачи"""
-        self.cursor.execute(
-            """SELECT username, text, created_at 
-            FROM comments WHERE task_id = ? 
-            ORDER BY created_at""",
-            (task_id,)
-        )
-        return self.cursor.fetchall()
+        with self.pool.reader() as connection:
+            return connection.execute(SQL_TASK_COMMENTS, (task_id,)).fetchall()
+    
+    def get_comments_page(self, task_id: int, after=None, before=None, limit=None):
+        """
+        Порция комментариев задачи для keyset-пагинации по (created_ts, id)
+        :param after: Курсор (created_ts, id) - комментарии новее курсора по возрастанию
+        :param before: Курсор (created_ts, id) или None - комментарии старше курсора
+            (или самые новые) по убыванию
+        :param limit: Размер порции (по умолчанию COMMENTS_BATCH_SIZE)
+        :return: Список (id, username, text, created_ts)
+        """
+        limit = limit or Pagination.COMMENTS_BATCH_SIZE
+        if after:
+            sql = SQL_COMMENTS_AFTER
+            params = (task_id, *after, limit)
+        elif before:
+            sql = SQL_COMMENTS_BEFORE
+            params = (task_id, *before, limit)
+        else:
+            sql = SQL_COMMENTS_LATEST
+            params = (task_id, limit)
+        with self.pool.reader() as connection:
+            return connection.execute(sql, params).fetchall()
+    
+    def check_comment_counts(self, repair: bool = False):
+        """
+        Проверка согласованности tasks.comment_count/last_comment_at с comments
+        :param repair: Исправить найденные расхождения
+        :return: Список (task_id, comment_count, фактическое количество,
+            last_comment_at, фактическое время последнего комментария)
+        """
+        with self.pool.reader() as connection:
+            mismatches = connection.execute("""
+                SELECT t.id, t.comment_count, COALESCE(c.total, 0),
+                       t.last_comment_at, c.last
+                FROM tasks t
+                LEFT JOIN (
+                    SELECT task_id, COUNT(*) AS total, MAX(created_ts) AS last
+                    FROM comments GROUP BY task_id
+                ) c ON c.task_id = t.id
+                WHERE t.comment_count != COALESCE(c.total, 0)
+                   OR t.last_comment_at IS NOT c.last
+            """).fetchall()
+
+        if repair and mismatches:
+            self._write(lambda connection: connection.executemany(
+                """UPDATE tasks SET comment_count = ?, last_comment_at = ?,
+                version = version + 1 WHERE id = ?""",
+                [(actual, last, task_id)
+                 for task_id, _, actual, _, last in mismatches]
+            ))
+            for task_id, *_ in mismatches:
+                self.task_versions.invalidate(task_id)
+        return mismatches
+    
+    # ========== Callback Payloads ==========
+    def save_callback_payloads(self, payloads):
+        """
+        Сохранение длинных callback_data одной транзакцией
+        (повторное сохранение того же id обновляет время выдачи)
+        :param payloads: Список (id, payload, время выдачи в секундах)
+        """
+        self._write(lambda connection: connection.executemany(
+            """INSERT INTO callback_payloads (id, payload, created_ts) VALUES (?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET created_ts = excluded.created_ts""",
+            payloads
+        ))
+
+    def prune_callback_payloads(self, before_ts: int):
+        """
+        Удаление callback_data, не выдававшихся с момента before_ts
+        :return: Количество удаленных записей
+        """
+        return self._write(lambda connection: connection.execute(
+            "DELETE FROM callback_payloads WHERE created_ts < ?", (before_ts,)
+        ).rowcount)
+
+    def load_callback_payload(self, payload_id: int):
+        """Сохраненная callback_data по id или None"""
+        with self.pool.reader() as connection:
+            row = connection.execute(
+                "SELECT payload FROM callback_payloads WHERE id = ?", (payload_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    # ========== Persistent Data ==========
+    def load_persistent_data(self, kind: str, key: str):
+        """
+        Сохраненное состояние одного ключа (см. utils.persistence)
+        :return: Сериализованные данные или None
+        """
+        with self.pool.reader() as connection:
+            row = connection.execute(
+                "SELECT data FROM persistent_data WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+        return row[0] if row else None
+
+    def load_persistent_kind(self, kind: str):
+        """Все сохраненные ключи вида kind: список (key, data)"""
+        with self.pool.reader() as connection:
+            return connection.execute(
+                "SELECT key, data FROM persistent_data WHERE kind = ?", (kind,)
+            ).fetchall()
+
+    def save_persistent_data(self, changes):
+        """
+        Запись изменившихся ключей одной транзакцией
+        :param changes: Список (kind, key, data); data None - удаление ключа
+        :return: Количество записанных и удаленных ключей
+        """
+        updated_ts = int(time.time())
+        upserts = [
+            (kind, key, data, updated_ts) for kind, key, data in changes if data is not None
+        ]
+        deletes = [(kind, key) for kind, key, data in changes if data is None]
+
+        def save(connection):
+            count = 0
+            if upserts:
+                count += connection.executemany(
+                    """INSERT INTO persistent_data (kind, key, data, updated_ts)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (kind, key) DO UPDATE
+                    SET data = excluded.data, updated_ts = excluded.updated_ts""",
+                    upserts
+                ).rowcount
+            if deletes:
+                count += connection.executemany(
+                    "DELETE FROM persistent_data WHERE kind = ? AND key = ?", deletes
+                ).rowcount
+            return count
+        return self._write(save)
+
+    # ========== Import / Export ==========
+    def export_rows(self, batch_size: int = None):
+        """
+        Потоковая выгрузка пользователей, задач и комментариев.
+        Строки читаются порциями fetchmany в одной транзакции чтения,
+        поэтому выгрузка - согласованный снимок всех таблиц
+        :param batch_size: Строк в одном fetchmany
+        :return: Генератор пар (вид записи, словарь полей)
+        """
+        batch_size = batch_size or TransferConfig.BATCH_SIZE
+        with self.pool.reader() as connection:
+            connection.execute("BEGIN")
+            try:
+                for kind, sql in EXPORT_QUERIES:
+                    fields = EXPORT_FIELDS[kind]
+                    cursor = connection.execute(sql)
+                    while rows := cursor.fetchmany(batch_size):
+                        for row in rows:
+                            yield kind, dict(zip(fields, row))
+            finally:
+                connection.rollback()
+    
+    def import_rows(self, records, batch_size: int = None):
+        """
+        Потоковая загрузка записей пакетами executemany, по транзакции на пакет.
+        Записи с уже существующими id (пользователи - username) пропускаются,
+        вместе с задачей пропускаются и ее комментарии из той же загрузки:
+        они относятся не к локальной задаче с этим id
+        :param records: Итерируемое пар (вид записи, словарь полей)
+        :param batch_size: Строк в одной транзакции
+        :return: Словарь {вид записи: количество добавленных строк}
+        :raises ValueError: Неизвестный вид записи
+        """
+        batch_size = batch_size or TransferConfig.BATCH_SIZE
+        inserted = dict.fromkeys(IMPORT_QUERIES, 0)
+        # id задач загрузки, пропущенных из-за уже существующей задачи
+        ignored_tasks = set()
+        skipped_comments = 0
+        batch_kind, batch = None, []
+
+        def insert_tasks(connection):
+            task_ids = [params["id"] for params in batch if params["id"] is not None]
+            ignored_tasks.update(
+                row[0] for row in
+                connection.execute(SQL_IMPORT_EXISTING_TASKS, (json.dumps(task_ids),))
+            )
+            return connection.executemany(IMPORT_QUERIES["task"], batch).rowcount
+
+        def insert_comments(connection):
+            count = connection.executemany(IMPORT_QUERIES["comment"], batch).rowcount
+            task_ids = {params["task_id"] for params in batch}
+            connection.executemany(SQL_IMPORT_BUMP_VERSION, [(task_id,) for task_id in task_ids])
+            return count
+
+        def flush():
+            if batch:
+                if batch_kind == "task":
+                    operation = insert_tasks
+                elif batch_kind == "comment":
+                    operation = insert_comments
+                else:
+                    sql = IMPORT_QUERIES[batch_kind]
+                    operation = lambda connection: connection.executemany(sql, batch).rowcount
+                inserted[batch_kind] += self._write(operation)
+
+        try:
+            for kind, fields in records:
+                if kind not in IMPORT_QUERIES:
+                    raise ValueError(f"Неизвестный вид записи: {kind!r}")
+                if kind != batch_kind or len(batch) >= batch_size:
+                    flush()
+                    batch_kind, batch = kind, []
+                if kind == "comment" and fields.get("task_id") in ignored_tasks:
+                    skipped_comments += 1
+                    continue
+
+                params = {
+                    field: fields.get(field, IMPORT_DEFAULTS.get(field))
+                    for field in EXPORT_FIELDS[kind]
+                }
+                if kind != "user":
+                    params["created_ts"] = params["created_ts"] or int(time.time())
+                    params["day_bucket"], params["week_bucket"], params["month_bucket"] = (
+                        time_buckets(params["created_ts"])
+                    )
+                batch.append(params)
+            flush()
+        finally:
+            # Загруженные строки могли заменить закэшированные "нет данных"
+            self.user_cache.clear()
+            self.task_versions.clear()
+            self._invalidate_task_counts()
+        if ignored_tasks:
+            logger.warning(
+                "Импорт: пропущено задач с занятым id: %s, их комментариев: %s",
+                len(ignored_tasks), skipped_comments
+            )
+        return inserted
     
     # ========== Utility Methods ==========
+    def explain_query_plan(self, sql: str, params=()):
+        """Получение плана выполнения запроса (EXPLAIN QUERY PLAN)"""
+        with self.pool.reader() as connection:
+            rows = connection.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        return [row[3] for row in rows]
+
+    def check_query_plans(self):
+        """
+        Проверка, что частые запросы не делают полный просмотр таблиц
+        :return: Словарь {имя запроса: план} для запросов без индекса
+        """
+        problems = {}
+        for name, (sql, params) in HOT_QUERIES.items():
+            plan = self.explain_query_plan(sql, params)
+            if has_full_scan(plan):
+                problems[name] = plan
+        return problems
+
+    def get_slow_queries(self, limit: int = None):
+        """
+        Журнал медленных запросов (см. SlowQueryLog)
+        :param limit: Количество последних записей (None - все)
+        :return: Список записей, новые первыми (пустой, если замер выключен)
+        """
+        if not self.pool.slow_log:
+            return []
+        return self.pool.slow_log.get_entries(limit)
+
+    def clear_slow_queries(self):
+        """Очистка журнала медленных запросов"""
+        if self.pool.slow_log:
+            self.pool.slow_log.clear()
+
+    def get_pool_stats(self):
+        """Статистика использования пула соединений"""
+        return self.pool.get_stats()
+
+    def get_cache_stats(self):
+        """Статистика кэшей (попадания, промахи, вытеснения)"""
+        return {
+            "users": self.user_cache.get_stats(),
+            "task_versions": self.task_versions.get_stats(),
+        }
+
     def close(self):
-        """Закрытие соединения с БД"""
-        self.connection.close()
+        """Закрытие соединений с БД"""
+        if self.group_writer:
+            self.group_writer.stop()
+        self.pool.close()
     
     def __enter__(self):
         """Поддержка контекстного менеджера"""
@@ -150,8 +1570,46 @@ class Database:
         """Автоматическое закрытие соединения"""
         self.close()
 
+class AsyncDatabase:
+    """
+    Асинхронный фасад над Database для вызова из async-обработчиков.
+    Каждый публичный метод Database доступен как одноимённая корутина,
+    а сам запрос выполняется в ограниченном пуле потоков, не блокируя
+    цикл событий бота.
+    """
+
+    def __init__(self, database: Database, max_workers: int = DatabaseConfig.POOL_SIZE):
+        self.database = database
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="db-worker"
+        )
+
+    def __getattr__(self, name):
+        """Создание корутины для метода Database"""
+        method = getattr(self.database, name)
+        if name.startswith("_") or not callable(method):
+            raise AttributeError(name)
+
+        @functools.wraps(method)
+        async def run_in_pool(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, functools.partial(method, *args, **kwargs)
+            )
+
+        # Кэшируем обёртку, чтобы не создавать её на каждый вызов
+        setattr(self, name, run_in_pool)
+        return run_in_pool
+
+    def shutdown(self):
+        """Остановка пула потоков и закрытие соединения с БД"""
+        self.executor.shutdown(wait=True)
+        self.database.close()
+
 # Инициализация глобального подключения
 db = Database()
+adb = AsyncDatabase(db)
 
 def init_database():
     """Инициализация базы данных при старте"""
@@ -4,33 +4,55 @@
 Только для пользователей с ролью ADMIN
 """
 
+import asyncio
+import io
+import json
 import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import CallbackQueryHandler, ContextTypes
-from config import BotConfig, Roles
-from database import db
+from telegram.ext import CommandHandler, ContextTypes, MessageHandler, filters
+from config import BotConfig, DatabaseConfig, Pagination, Roles, TracingConfig, TransferConfig
+from database import adb, db
 from utils.keyboards import get_back_button
+from utils.router import build_callback
+from utils.tracing import TraceKind, tracer
+from utils.transfer import FORMATS, TransferProgress, export_data, import_data
 
 # Настройка логгирования
 logger = logging.getLogger(__name__)
 
+# Записей журнала медленных запросов в ответе /slowlog по умолчанию
+SLOW_QUERY_PREVIEW = 10
+# Символов текста запроса в ответе /slowlog
+SLOW_QUERY_SQL_PREVIEW = 300
+
 class AdminHandlers:
     """Класс для обработки административных команд"""
 
-    def __init__(self, application):
+    def __init__(self, application, router):
         self.application = application
+        self.router = router
         self._register_handlers()
 
     def _register_handlers(self):
         """Регистрация обработчиков административных команд"""
-        handlers = [
-            CallbackQueryHandler(self.promote_user_handler, pattern="^promote_"),
-            CallbackQueryHandler(self.demote_user_handler, pattern="^demote_"),
-            CallbackQueryHandler(self.delete_user_handler, pattern="^delete_user_"),
-            CallbackQueryHandler(self.admin_tasks_handler, pattern="^admin_tasks$"),
-        ]
-        for handler in handlers:
-            self.application.add_handler(handler)
+        self.application.add_handler(CommandHandler("export", self.export_handler))
+        self.application.add_handler(CommandHandler("import", self.import_handler))
+        self.application.add_handler(CommandHandler("stats", self.stats_handler))
+        self.application.add_handler(CommandHandler("slowlog", self.slow_log_handler))
+        self.application.add_handler(
+            MessageHandler(filters.Document.ALL, self.import_file_handler)
+        )
+        self.router.add_routes({
+            "promote": self.promote_user_handler,
+            "demote": self.demote_user_handler,
+            "delete_user": self.delete_user_handler,
+            "admin_tasks": self.admin_tasks_handler,
+        }, owner=type(self).__name__)
 
     async def _check_admin(self, update: Update) -> bool:
         """Проверка прав администратора"""
@@ -40,13 +62,212 @@ class AdminHandlers:
             return False
         return True
 
+    async def _check_admin_message(self, update: Update) -> bool:
+        """Проверка прав администратора для текстовой команды"""
+        if update.effective_user.username != BotConfig.ADMIN_USERNAME:
+            await update.message.reply_text("Эта команда только для администратора!")
+            return False
+        return True
+
+    @staticmethod
+    def _progress_reporter(message, title):
+        """
+        Отчет о ходе импорта/экспорта правкой сообщения message.
+        Вызывается из потока передачи, поэтому правка передается в цикл событий
+        """
+        loop = asyncio.get_running_loop()
+
+        def report(progress):
+            asyncio.run_coroutine_threadsafe(
+                message.edit_text(f"{title}: {progress.rows} строк, {progress.rate:.0f} строк/с"),
+                loop
+            )
+        return report
+
+    async def export_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Выгрузка задач и комментариев: /export [jsonl|csv]"""
+        if not await self._check_admin_message(update):
+            return
+
+        fmt = context.args[0].lower() if context.args else FORMATS[0]
+        if fmt not in FORMATS:
+            await update.message.reply_text("Использование: /export [jsonl|csv]")
+            return
+
+        status = await update.message.reply_text("⏳ Экспорт данных...")
+        progress = TransferProgress(self._progress_reporter(status, "⏳ Экспорт"))
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, f"task_tracker_{datetime.now():%Y%m%d_%H%M%S}.{fmt}.gz")
+        try:
+            # Выгрузка блокирующая и долгая: выполняется вне цикла событий
+            await asyncio.to_thread(export_data, db, path, fmt, progress)
+            if os.path.getsize(path) > TransferConfig.MAX_UPLOAD_SIZE:
+                await status.edit_text(
+                    f"Файл выгрузки больше лимита Telegram; используйте "
+                    f"python transfer.py export. {progress.summary()}"
+                )
+                return
+            with open(path, "rb") as export_file:
+                await update.message.reply_document(
+                    export_file, filename=os.path.basename(path), caption=progress.summary()
+                )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        await status.edit_text(f"✅ Экспорт завершен: {progress.summary()}")
+
+    async def import_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Начало загрузки данных: следующий файл от администратора импортируется"""
+        if not await self._check_admin_message(update):
+            return
+
+        context.user_data["awaiting_import"] = True
+        await update.message.reply_text(
+            "Отправьте файл выгрузки (.jsonl.gz или .csv.gz). Записи с уже "
+            "существующими id пропускаются.",
+            reply_markup=InlineKeyboardMarkup([[get_back_button()]])
+        )
+
+    async def import_file_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Загрузка присланного файла выгрузки"""
+        if not context.user_data.get("awaiting_import"):
+            return
+        if not await self._check_admin_message(update):
+            return
+
+        document = update.message.document
+        if document.file_size and document.file_size > TransferConfig.MAX_DOWNLOAD_SIZE:
+            await update.message.reply_text(
+                "Файл больше лимита Telegram на скачивание; используйте "
+                "python transfer.py import"
+            )
+            return
+
+        context.user_data.pop("awaiting_import", None)
+        status = await update.message.reply_text("⏳ Импорт данных...")
+        progress = TransferProgress(self._progress_reporter(status, "⏳ Импорт"))
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, os.path.basename(document.file_name or "import.jsonl.gz"))
+        try:
+            telegram_file = await document.get_file()
+            await telegram_file.download_to_drive(path)
+            _, inserted = await asyncio.to_thread(import_data, db, path, None, progress)
+        except (ValueError, OSError, sqlite3.Error) as error:
+            logger.exception("Ошибка импорта")
+            # Пакеты, загруженные до ошибки, остаются в БД
+            await status.edit_text(
+                f"❌ Импорт прерван после {progress.rows} строк: {error}"
+            )
+            return
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        added = ", ".join(f"{kind}: {count}" for kind, count in inserted.items())
+        await status.edit_text(f"✅ Импорт завершен: {progress.summary()}\nДобавлено: {added}")
+
+    @staticmethod
+    def _format_stats():
+        """Текст ответа /stats: самые затратные обработчики и методы БД"""
+        started = datetime.fromtimestamp(tracer.started)
+        lines = [
+            f"📊 Статистика с {started:%d.%m.%Y %H:%M} "
+            f"(замер времени: {tracer.sample_rate:.0%} вызовов)"
+        ]
+        for title, kind in (("⚙️ Обработчики", TraceKind.HANDLER), ("🗄 БД", TraceKind.DATABASE)):
+            lines.append(f"\n{title}:")
+            series = tracer.snapshot(kind)[:TracingConfig.STATS_TOP]
+            if not series:
+                lines.append("нет вызовов")
+            for item in series:
+                rows = f", строк {item['rows']}" if kind == TraceKind.DATABASE else ""
+                lines.append(
+                    f"{item['name']}\n"
+                    f"  {item['calls']} выз., ошибок {item['errors']}{rows}, "
+                    f"p50/p95/p99 {item['p50_ms']:.1f}/{item['p95_ms']:.1f}/"
+                    f"{item['p99_ms']:.1f} мс"
+                )
+        return "\n".join(lines)[:Pagination.MESSAGE_MAX_LENGTH]
+
+    async def stats_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Задержки обработчиков и запросов к БД: /stats [reset]"""
+        if not await self._check_admin_message(update):
+            return
+
+        if context.args and context.args[0].lower() == "reset":
+            tracer.reset()
+            await update.message.reply_text("Счетчики сброшены")
+            return
+        await update.message.reply_text(self._format_stats())
+
+    @staticmethod
+    def _format_slow_queries(entries):
+        """Текст ответа /slowlog: записи журнала, пока помещаются в сообщение"""
+        text = (
+            f"🐢 Медленные запросы (порог {DatabaseConfig.SLOW_QUERY_MS} мс), "
+            f"новые первыми:"
+        )
+        for entry in entries:
+            scan = " ⚠️ SCAN" if entry["full_scan"] else ""
+            lines = [
+                f"\n{datetime.fromtimestamp(entry['at']):%d.%m %H:%M:%S} "
+                f"{entry['ms']:.1f} мс, строк {entry['rows']}{scan}",
+                entry["sql"][:SLOW_QUERY_SQL_PREVIEW],
+                f"параметры: {entry['params']}",
+            ]
+            if entry["plan"]:
+                lines.append("план: " + "; ".join(entry["plan"]))
+            block = "\n".join(lines)
+            if len(text) + len(block) + 1 > Pagination.MESSAGE_MAX_LENGTH:
+                break
+            text += "\n" + block
+        return text
+
+    async def slow_log_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Журнал медленных запросов: /slowlog [N|file|clear]"""
+        if not await self._check_admin_message(update):
+            return
+
+        if DatabaseConfig.SLOW_QUERY_MS is None:
+            await update.message.reply_text("Замер запросов выключен (SLOW_QUERY_MS = None)")
+            return
+
+        argument = context.args[0].lower() if context.args else ""
+        if argument == "clear":
+            await adb.clear_slow_queries()
+            await update.message.reply_text("Журнал медленных запросов очищен")
+            return
+
+        if argument == "file":
+            # Весь буфер одним файлом JSONL
+            entries = await adb.get_slow_queries()
+            if entries:
+                content = "".join(
+                    json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries
+                )
+                await update.message.reply_document(
+                    io.BytesIO(content.encode("utf-8")),
+                    filename=f"slow_queries_{datetime.now():%Y%m%d_%H%M%S}.jsonl"
+                )
+                return
+        else:
+            if argument and not argument.isdigit():
+                await update.message.reply_text("Использование: /slowlog [N|file|clear]")
+                return
+            entries = await adb.get_slow_queries(int(argument) if argument else SLOW_QUERY_PREVIEW)
+
+        if not entries:
+            await update.message.reply_text(
+                f"Запросов дольше {DatabaseConfig.SLOW_QUERY_MS} мс не было"
+            )
+            return
+        await update.message.reply_text(self._format_slow_queries(entries))
+
     async def promote_user_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Повышение пользователя до руководителя"""
         if not await self._check_admin(update):
             return
 
-        username = update.callback_query.data.split("_")[1]
-        db.update_user_role(username, Roles.MANAGER)
+        username = context.args[0]
+        await adb.update_user_role(username, Roles.MANAGER)
         
         await update.callback_query.answer(f"Пользователь @{username} теперь руководитель")
         await self._show_user_management(update)
@@ -56,8 +277,8 @@ class AdminHandlers:
         if not await self._check_admin(update):
             return
 
-        username = update.callback_query.data.split("_")[1]
-        db.update_user_role(username, Roles.USER)
+        username = context.args[0]
+        await adb.update_user_role(username, Roles.USER)
         
         await update.callback_query.answer(f"Пользователь @{username} теперь обычный пользователь")
         await self._show_user_management(update)
@@ -67,7 +288,7 @@ class AdminHandlers:
         if not await self._check_admin(update):
             return
 
-        username = update.callback_query.data.split("_")[2]
+        username = context.args[0]
         if username == BotConfig.ADMIN_USERNAME:
             await update.callback_query.answer("Нельзя удалить администратора!", show_alert=True)
             return
@@ -82,9 +303,9 @@ class AdminHandlers:
             return
 
         keyboard = [
-            [InlineKeyboardButton("Управление пользователями", callback_data="manage_users")],
-            [InlineKeyboardButton("Просмотр всех задач", callback_data="view_all_tasks")],
-            get_back_button()
+            [InlineKeyboardButton("Управление пользователями", callback_data=build_callback("manage_users"))],
+            [InlineKeyboardButton("Просмотр всех задач", callback_data=build_callback("tasks"))],
+            [get_back_button()]
         ]
         
         await update.callback_query.edit_message_text(
@@ -94,7 +315,7 @@ class AdminHandlers:
 
     async def _show_user_management(self, update: Update):
         """Отображение списка пользователей для управления"""
-        users = db.get_all_users()
+        users = await adb.get_all_users()
         keyboard = []
         
         for user in users:
@@ -107,15 +328,15 @@ class AdminHandlers:
             if user[2] == Roles.USER:
                 buttons.append(InlineKeyboardButton(
                     f"{role} Повысить до руководителя", 
-                    callback_data=f"promote_{user[1]}"))
+                    callback_data=build_callback("promote", user[1])))
             else:
                 buttons.append(InlineKeyboardButton(
                     f"{role} Понизить до пользователя", 
-                    callback_data=f"demote_{user[1]}"))
+                    callback_data=build_callback("demote", user[1])))
                 
             buttons.append(InlineKeyboardButton(
                 "❌ Удалить", 
-                callback_data=f"delete_user_{user[1]}"))
+                callback_data=build_callback("delete_user", user[1])))
                 
             keyboard.append(buttons)
         
@@ -126,6 +347,6 @@ class AdminHandlers:
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
-def register_admin_handlers(application):
+def register_admin_handlers(application, router):
     """Функция для регистрации административных обработчиков"""
-    AdminHandlers(application)
\ No newline at end of file
+    AdminHandlers(application, router)
\ No newline at end of file
@@ -6,14 +6,16 @@
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
-    CallbackQueryHandler,
+    ApplicationHandlerStop,
     MessageHandler,
     filters,
     ContextTypes,
 )
-from config import BotConfig
-from database import db
+from config import BotConfig, Pagination
+from database import adb
 from utils.keyboards import get_back_button
+from utils.filters import format_timestamp
+from utils.router import build_callback
 
 # Настройка логгирования
 logger = logging.getLogger(__name__)
@@ -21,23 +23,28 @@ logger = logging.getLogger(__name__)
 class CommentHandlers:
     """Класс для обработки операций с комментариями"""
 
-    def __init__(self, application):
+    # Группа текстового обработчика (после TaskHandlers.TEXT_GROUP)
+    TEXT_GROUP = 2
+
+    def __init__(self, application, router):
         self.application = application
+        self.router = router
         self._register_handlers()
 
     def _register_handlers(self):
         """Регистрация обработчиков комментариев"""
-        handlers = [
-            CallbackQueryHandler(self.add_comment_handler, pattern="^comment_"),
-            CallbackQueryHandler(self.view_comments_handler, pattern="^view_comments_"),
+        self.application.add_handler(
             MessageHandler(filters.TEXT & ~filters.COMMAND, self.save_comment_handler),
-        ]
-        for handler in handlers:
-            self.application.add_handler(handler)
+            group=self.TEXT_GROUP
+        )
+        self.router.add_routes({
+            "comment": self.add_comment_handler,
+            "comments": self.view_comments_handler,
+        }, owner=type(self).__name__)
 
     async def add_comment_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик начала добавления комментария"""
-        task_id = int(update.callback_query.data.split("_")[1])
+        task_id = int(context.args[0])
         context.user_data["current_task"] = task_id
         context.user_data["awaiting_comment"] = True
 
@@ -55,7 +62,7 @@ class CommentHandlers:
         username = update.effective_user.username
         comment_text = update.message.text
 
-        db.add_comment(task_id, username, comment_text)
+        await adb.add_comment(task_id, username, comment_text)
 
         # Очищаем состояние
         context.user_data.pop("awaiting_comment", None)
@@ -65,34 +72,99 @@ class CommentHandlers:
             "Комментарий добавлен!",
             reply_markup=InlineKeyboardMarkup([[get_back_button()]])
         )
+        raise ApplicationHandlerStop
 
     async def view_comments_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Просмотр всех комментариев к задаче"""
-        task_id = int(update.callback_query.data.split("_")[2])
-        comments = db.get_task_comments(task_id)
-
-        if not comments:
+        """
+        Просмотр комментариев к задаче постранично
+        comments:<id> - последние комментарии,
+        comments:<id>:<older|newer>:<created_ts>:<comment_id> - соседняя страница
+        """
+        task_id = int(context.args[0])
+        if len(context.args) == 1:
+            direction, cursor = "older", None
+        else:
+            direction = context.args[1]
+            cursor = (int(context.args[2]), int(context.args[3]))
+
+        header = f"Комментарии к задаче #{task_id}:\n\n"
+        budget = Pagination.MESSAGE_MAX_LENGTH - len(header)
+        lines, has_more = await self._collect_comments_page(task_id, direction, cursor, budget)
+
+        if not lines:
             await update.callback_query.message.reply_text(
                 "Комментарии отсутствуют",
                 reply_markup=InlineKeyboardMarkup([[get_back_button()]])
             )
             return
 
-        comments_text = "\n".join(
-            [f"{i+1}. @{comment[0]}: {comment[1]} ({comment[2].split()[0]})" 
-             for i, comment in enumerate(comments)]
-        )
+        # Страница всегда отображается в хронологическом порядке
+        if direction == "older":
+            lines.reverse()
+            has_older, has_newer = has_more, cursor is not None
+        else:
+            has_older, has_newer = True, has_more
+
+        first, last = lines[0][0], lines[-1][0]
+        navigation = []
+        if has_older:
+            navigation.append(InlineKeyboardButton(
+                "⬅️ Старше",
+                callback_data=build_callback("comments", task_id, "older", first[3], first[0])
+            ))
+        if has_newer:
+            navigation.append(InlineKeyboardButton(
+                "Новее ➡️",
+                callback_data=build_callback("comments", task_id, "newer", last[3], last[0])
+            ))
 
         keyboard = [
-            [InlineKeyboardButton("✏️ Добавить комментарий", callback_data=f"comment_{task_id}")],
+            [InlineKeyboardButton("✏️ Добавить комментарий", callback_data=build_callback("comment", task_id))],
             [get_back_button()]
         ]
+        if navigation:
+            keyboard.insert(0, navigation)
 
+        await update.callback_query.answer()
         await update.callback_query.message.edit_text(
-            f"Комментарии к задаче #{task_id}:\n\n{comments_text}",
+            header + "\n".join(line for _, line in lines),
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
-def register_comment_handlers(application):
+    @staticmethod
+    async def _collect_comments_page(task_id, direction, cursor, budget):
+        """
+        Набор страницы комментариев порциями до заполнения лимита сообщения.
+        В памяти одновременно держится не больше одной порции из БД и одной страницы.
+        :param direction: older - от курсора к старым, newer - от курсора к новым
+        :param cursor: Курсор (created_ts, id) или None для самых новых
+        :param budget: Допустимая длина текста страницы
+        :return: Кортеж (список (comment, line) в порядке чтения, есть ли еще комментарии)
+        """
+        lines = []
+        used = 0
+        batch_size = Pagination.COMMENTS_BATCH_SIZE
+
+        while True:
+            if direction == "older":
+                batch = await adb.get_comments_page(task_id, before=cursor, limit=batch_size)
+            else:
+                batch = await adb.get_comments_page(task_id, after=cursor, limit=batch_size)
+
+            for comment in batch:
+                line = f"@{comment[1]}: {comment[2]} ({format_timestamp(comment[3])})"
+                if used + len(line) > budget:
+                    if lines:
+                        return lines, True
+                    # Один комментарий длиннее сообщения - показываем начало
+                    line = line[:budget - 1] + "…"
+                lines.append((comment, line))
+                used += len(line) + 1
+                cursor = (comment[3], comment[0])
+
+            if len(batch) < batch_size:
+                return lines, False
+
+def register_comment_handlers(application, router):
     """Функция для регистрации обработчиков комментариев"""
-    CommentHandlers(application)
\ No newline at end of file
+    CommentHandlers(application, router)
\ No newline at end of file
@@ -4,22 +4,25 @@
 """
 
 import logging
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, InlineKeyboardMarkup
 from telegram.ext import (
+    ApplicationHandlerStop,
     CommandHandler,
-    CallbackQueryHandler,
     MessageHandler,
     filters,
     ContextTypes,
 )
-from config import BotConfig, TaskStatuses
-from database import db
+from config import BotConfig, CacheConfig, Pagination, TaskStatuses
+from database import adb
 from utils.keyboards import (
     get_main_menu_keyboard,
     get_task_keyboard,
     get_back_button,
     get_filters_keyboard,
 )
+from utils.pagination import Paginator
+from utils.filters import format_timestamp
+from utils.cache import LRUCache, MISSING
 
 # Настройка логгирования
 logger = logging.getLogger(__name__)
@@ -27,55 +30,155 @@ logger = logging.getLogger(__name__)
 class TaskHandlers:
     """Класс для обработки операций с задачами"""
 
-    def __init__(self, application):
+    # Группа текстового обработчика: группы проверяются по очереди,
+    # обработчик, принявший сообщение, останавливает дальнейшие группы
+    TEXT_GROUP = 1
+
+    # Действия кнопок смены статуса
+    STATUS_ACTIONS = {
+        "take": TaskStatuses.IN_PROGRESS,
+        "complete": TaskStatuses.DONE,
+        "reopen": TaskStatuses.IN_PROGRESS,
+    }
+
+    def __init__(self, application, router):
         self.application = application
+        self.router = router
+        self.paginator = Paginator()
+        # Готовые карточки задач: (task_id, version, viewer_role) -> (text, keyboard)
+        self.card_cache = LRUCache(CacheConfig.TASK_CARD_CACHE_SIZE)
         self._register_handlers()
 
     def _register_handlers(self):
         """Регистрация обработчиков задач"""
         handlers = [
             CommandHandler("tasks", self.list_tasks_handler),
-            CallbackQueryHandler(self.create_task_handler, pattern="^create_task$"),
-            CallbackQueryHandler(self.task_detail_handler, pattern="^task_"),
-            CallbackQueryHandler(self.change_status_handler, pattern="^(take|complete|reopen)_"),
-            CallbackQueryHandler(self.delete_task_handler, pattern="^delete_"),
-            CallbackQueryHandler(self.filter_tasks_handler, pattern="^filter_"),
-            MessageHandler(filters.TEXT & ~filters.COMMAND, self.save_task_handler),
+            CommandHandler("search", self.search_handler),
         ]
         for handler in handlers:
             self.application.add_handler(handler)
+        self.application.add_handler(
+            MessageHandler(filters.TEXT & ~filters.COMMAND, self.save_task_handler),
+            group=self.TEXT_GROUP
+        )
+
+        self.router.add_routes({
+            "tasks": self.all_tasks_handler,
+            "page": self.page_handler,
+            "search_page": self.search_page_handler,
+            "create_task": self.create_task_handler,
+            "task": self.task_detail_handler,
+            "status": self.change_status_handler,
+            "delete": self.delete_task_handler,
+            "filter": self.filter_tasks_handler,
+            "select": self.select_task_handler,
+            "bulk": self.bulk_action_handler,
+        }, owner=type(self).__name__)
 
     async def list_tasks_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показать список задач"""
+        context.user_data.pop("task_filters", None)
+        context.user_data.pop("selected_tasks", None)
+        await self._show_task_list(update, context, update.message, edit=False)
+
+    async def all_tasks_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Список задач по кнопке (без фильтров)"""
+        context.user_data.pop("task_filters", None)
+        context.user_data.pop("selected_tasks", None)
+        await update.callback_query.answer()
+        await self._show_task_list(update, context, update.callback_query.message, edit=True)
+
+    async def page_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Переход по страницам списка задач"""
+        page, cursor, filters_state = Paginator.parse_page_callback(context.args)
+        context.user_data["task_filters"] = filters_state
+        await update.callback_query.answer()
+        await self._show_task_list(
+            update, context, update.callback_query.message,
+            edit=True, page=page, cursor=cursor
+        )
+
+    async def _show_task_list(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                              message, edit, page=1, cursor=None):
+        """Отображение страницы списка задач с учетом сохраненных фильтров"""
         user = update.effective_user
         is_admin = user.username == BotConfig.ADMIN_USERNAME
-        
-        if is_admin:
-            tasks = db.get_all_tasks()
-        else:
-            tasks = db.get_user_tasks(user.username)
+        filters_state = context.user_data.get("task_filters", {})
 
-        if not tasks:
-            await update.message.reply_text("Задачи не найдены")
+        # Фильтрация выполняется в SQLite; не-админ видит только свои задачи
+        query_filters = {
+            "status_filter": filters_state.get("status"),
+            "period_filter": filters_state.get("period"),
+            "author_filter": None if is_admin else user.username,
+        }
+
+        total = await adb.count_tasks(**query_filters)
+        if not total:
+            if edit:
+                await message.edit_text("Задачи не найдены")
+            else:
+                await message.reply_text("Задачи не найдены")
             return
 
-        keyboard = []
-        for task in tasks:
-            keyboard.append([
-                InlineKeyboardButton(
-                    f"#{task[0]} {task[1][:30]}... ({TaskStatuses.get_status_name(task[2])})",
-                    callback_data=f"task_{task[0]}"
-                )
-            ])
+        async def load_page(**page_args):
+            return await adb.get_tasks_page(**page_args, **query_filters)
 
-        keyboard.append([
-            InlineKeyboardButton("➕ Создать задачу", callback_data="create_task"),
-            InlineKeyboardButton("🔍 Фильтры", callback_data="filter_status")
-        ])
+        # Текущая страница нужна, чтобы перерисовать ее после отметки задачи
+        context.user_data["task_list_view"] = {"page": page, "cursor": cursor}
+        await self.paginator.show_cursor_page(
+            message, load_page, total,
+            page=page, cursor=cursor, filters=filters_state, edit=edit,
+            selection=context.user_data.get("selected_tasks") if is_admin else None,
+            selectable=is_admin
+        )
 
-        await update.message.reply_text(
-            "Список задач:",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+    async def search_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Полнотекстовый поиск задач: /search <запрос>"""
+        query = " ".join(context.args)
+        if not query:
+            await update.message.reply_text("Использование: /search <запрос>")
+            return
+
+        context.user_data["search_query"] = query
+        await self._show_search_results(update, update.message, query, edit=False)
+
+    async def search_page_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Переход по страницам результатов поиска"""
+        await update.callback_query.answer()
+        query = context.user_data.get("search_query")
+        if not query:
+            return
+
+        page, _, _ = Paginator.parse_page_callback(context.args)
+        await self._show_search_results(
+            update, update.callback_query.message, query, edit=True, page=page
+        )
+
+    async def _show_search_results(self, update: Update, message, query, edit, page=1):
+        """Отображение страницы результатов поиска, ранжированных по bm25"""
+        user = update.effective_user
+        # Не-админ ищет только среди своих задач
+        author = None if user.username == BotConfig.ADMIN_USERNAME else user.username
+
+        tasks = await adb.search_tasks(query, author=author)
+        if not tasks:
+            text = f"По запросу «{query}» ничего не найдено"
+            if edit:
+                await message.edit_text(text)
+            else:
+                await message.reply_text(text)
+            return
+
+        title = f"🔎 Поиск: {query}"
+        if tasks.truncated:
+            # Более старые совпадения за окном ранжирования не выдаются
+            title += (
+                f"\nℹ️ Совпадений много: ранжированы {Pagination.SEARCH_RANK_WINDOW} "
+                f"самых новых. Уточните запрос, чтобы найти более старые задачи"
+            )
+        await self.paginator.show_page(
+            message, tasks, page=page,
+            page_action="search_page", title=title, edit=edit
         )
 
     async def create_task_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -93,73 +196,171 @@ class TaskHandlers:
 
         description = update.message.text
         user = update.effective_user
-        task_id = db.add_task(description, user.username)
+        task_id = await adb.add_task(description, user.username)
 
         context.user_data.pop("awaiting_task", None)
         await update.message.reply_text(
             f"Задача #{task_id} создана!",
             reply_markup=get_main_menu_keyboard(user.username)
         )
+        raise ApplicationHandlerStop
 
     async def task_detail_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Просмотр деталей задачи"""
-        task_id = int(update.callback_query.data.split("_")[1])
-        task = db.get_task(task_id)
+        task_id = int(context.args[0])
+        username = update.effective_user.username
+        viewer_role = "admin" if username == BotConfig.ADMIN_USERNAME else "user"
 
-        if not task:
+        # Версия задачи хранится в памяти процесса, поэтому карточка
+        # популярной задачи отдается из кэша без обращения к SQLite
+        version = await adb.get_task_version(task_id)
+        card_key = (task_id, version, viewer_role)
+        card = self.card_cache.get(card_key)
+
+        if card is MISSING:
+            card = await self._render_task_card(task_id, username)
+            if card:
+                self.card_cache.set(card_key, card)
+
+        if not card:
             await update.callback_query.answer("Задача не найдена")
             return
 
-        comments = db.get_task_comments(task_id)
-        comments_text = "\n".join(
-            [f"{i+1}. @{c[1]}: {c[2]}" for i, c in enumerate(comments)]
-        ) if comments else "Комментарии отсутствуют"
+        text, keyboard = card
+        await update.callback_query.message.edit_text(
+            text,
+            reply_markup=keyboard
+        )
+
+    async def _render_task_card(self, task_id, username):
+        """
+        Формирование текста и клавиатуры карточки задачи
+        :return: Кортеж (text, keyboard) или None, если задачи нет
+        """
+        task = await adb.get_task(task_id)
+        if not task:
+            return None
+
+        # comment_count и last_comment_at поддерживаются триггерами: карточка
+        # строится из одной строки tasks, а сами комментарии показывает
+        # постраничный просмотр "💬 Комментарии"
+        comment_count, last_comment_at = task[5], task[6]
+        if comment_count:
+            comments_text = (
+                f"Комментарии: {comment_count}, последний "
+                f"{format_timestamp(last_comment_at)}"
+            )
+        else:
+            comments_text = "Комментарии отсутствуют"
 
-        text = (
+        template = (
             f"Задача #{task[0]}\n"
-            f"Описание: {task[1]}\n"
+            "Описание: {description}\n"
             f"Статус: {TaskStatuses.get_status_name(task[2])}\n"
             f"Автор: @{task[3]}\n"
-            f"Дата: {task[4]}\n\n"
-            f"Комментарии:\n{comments_text}"
+            f"Дата: {format_timestamp(task[4])}\n\n"
+            f"{comments_text}"
         )
+        # Длинное описание обрезается, чтобы карточка уложилась в лимит сообщения
+        description = task[1]
+        budget = Pagination.MESSAGE_MAX_LENGTH - len(template) + len("{description}")
+        if len(description) > budget:
+            description = description[:budget - 1] + "…"
+        text = template.replace("{description}", description)
 
-        keyboard = get_task_keyboard(task[2], update.effective_user.username, task_id)
-        await update.callback_query.message.edit_text(
-            text,
-            reply_markup=keyboard
-        )
+        keyboard = get_task_keyboard(task[2], username, task_id)
+        return text, keyboard
 
     async def change_status_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Изменение статуса задачи"""
-        action, task_id = update.callback_query.data.split("_")
+        task_id, action = context.args
         task_id = int(task_id)
-        user = update.effective_user
-
-        if action == "take":
-            new_status = TaskStatuses.IN_PROGRESS
-        elif action == "complete":
-            new_status = TaskStatuses.DONE
-        else:  # reopen
-            new_status = TaskStatuses.IN_PROGRESS
+        new_status = self.STATUS_ACTIONS[action]
 
-        db.update_task_status(task_id, new_status)
+        await adb.update_task_status(task_id, new_status)
         await update.callback_query.answer(f"Статус обновлен: {TaskStatuses.get_status_name(new_status)}")
         await self.task_detail_handler(update, context)
 
     async def delete_task_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Удаление задачи"""
-        task_id = int(update.callback_query.data.split("_")[1])
-        db.delete_task(task_id)
+        task_id = int(context.args[0])
+        await adb.delete_task(task_id)
         await update.callback_query.answer("Задача удалена", show_alert=True)
         await update.callback_query.message.delete()
 
     async def filter_tasks_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Фильтрация задач"""
-        filter_type = update.callback_query.data.split("_")[1]
-        keyboard = get_filters_keyboard(filter_type)
-        await update.callback_query.message.edit_reply_markup(reply_markup=keyboard)
+        # filter:<тип> - показать фильтры, filter:<тип>:<значение> - применить
+        filter_type, *value = context.args
+
+        if not value or filter_type not in ("status", "period"):
+            keyboard = get_filters_keyboard(filter_type)
+            await update.callback_query.message.edit_reply_markup(reply_markup=keyboard)
+            return
+
+        context.user_data.setdefault("task_filters", {})[filter_type] = value[0]
+        await update.callback_query.answer()
+        await self._show_task_list(
+            update, context, update.callback_query.message, edit=True
+        )
+
+    async def select_task_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Режим выбора задач для групповых действий (только администратор):
+        select - включить режим, select:<task_id> - отметить/снять отметку
+        """
+        query = update.callback_query
+        if update.effective_user.username != BotConfig.ADMIN_USERNAME:
+            await query.answer("Групповые действия доступны только администратору", show_alert=True)
+            return
+
+        selection = context.user_data.setdefault("selected_tasks", set())
+        if context.args:
+            selection.symmetric_difference_update({int(context.args[0])})
+        await query.answer()
+        await self._refresh_task_list(update, context)
+
+    async def bulk_action_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Групповое действие над отмеченными задачами: bulk:<take|complete|delete|cancel>.
+        Все задачи обрабатываются одной транзакцией, список перерисовывается один раз
+        """
+        query = update.callback_query
+        if update.effective_user.username != BotConfig.ADMIN_USERNAME:
+            await query.answer("Групповые действия доступны только администратору", show_alert=True)
+            return
+
+        action = context.args[0]
+        selection = context.user_data.get("selected_tasks") or set()
+        if action != "cancel" and not selection:
+            await query.answer("Не выбрано ни одной задачи", show_alert=True)
+            return
+
+        if action == "delete":
+            deleted = await adb.delete_tasks(sorted(selection))
+            await query.answer(f"Удалено задач: {deleted}", show_alert=True)
+            # Страница, на которой были удаленные задачи, могла опустеть
+            context.user_data.pop("task_list_view", None)
+        elif action in self.STATUS_ACTIONS:
+            new_status = self.STATUS_ACTIONS[action]
+            updated = await adb.update_tasks_status(sorted(selection), new_status)
+            await query.answer(
+                f"Статус «{TaskStatuses.get_status_name(new_status)}» у задач: {updated}"
+            )
+        else:
+            await query.answer()
+
+        context.user_data.pop("selected_tasks", None)
+        await self._refresh_task_list(update, context)
+
+    async def _refresh_task_list(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Перерисовка последней показанной страницы списка задач"""
+        view = context.user_data.get("task_list_view", {})
+        await self._show_task_list(
+            update, context, update.callback_query.message, edit=True,
+            page=view.get("page", 1), cursor=view.get("cursor")
+        )
 
-def register_task_handlers(application):
+def register_task_handlers(application, router):
     """Функция для регистрации обработчиков задач"""
-    TaskHandlers(application)
\ No newline at end of file
+    TaskHandlers(application, router)
\ No newline at end of file
@@ -8,12 +8,12 @@ import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     CommandHandler,
-    CallbackQueryHandler,
     ContextTypes,
 )
 from config import BotConfig, Roles
-from database import db
-from utils.keyboards import get_back_button, get_main_menu_keyboard
+from database import adb
+from utils.keyboards import get_back_button, get_main_menu_keyboard, get_user_actions_keyboard
+from utils.router import build_callback
 
 # Настройка логгирования
 logger = logging.getLogger(__name__)
@@ -21,27 +21,27 @@ logger = logging.getLogger(__name__)
 class UserHandlers:
     """Класс для обработки пользовательских операций"""
 
-    def __init__(self, application):
+    def __init__(self, application, router):
         self.application = application
+        self.router = router
         self._register_handlers()
 
     def _register_handlers(self):
         """Регистрация обработчиков пользователей"""
-        handlers = [
-            CommandHandler("profile", self.profile_handler),
-            CallbackQueryHandler(self.manage_users_handler, pattern="^manage_users$"),
-            CallbackQueryHandler(self.change_role_handler, pattern="^change_role_"),
-        ]
-        for handler in handlers:
-            self.application.add_handler(handler)
+        self.application.add_handler(CommandHandler("profile", self.profile_handler))
+        self.router.add_routes({
+            "manage_users": self.manage_users_handler,
+            "user_detail": self.user_detail_handler,
+            "change_role": self.change_role_handler,
+        }, owner=type(self).__name__)
 
     async def profile_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показать профиль пользователя"""
         user = update.effective_user
-        user_data = db.get_user(user.username)
+        user_data = await adb.get_user(user.username)
 
         if not user_data:
-            db.add_user(user.username)
+            await adb.add_user(user.username)
             user_data = (user.username, Roles.DEFAULT_ROLE)
 
         role_name = "👤 Пользователь" if user_data[1] == Roles.USER else \
@@ -59,7 +59,7 @@ class UserHandlers:
         if user.username == BotConfig.ADMIN_USERNAME:
             keyboard.append([InlineKeyboardButton(
                 "Управление пользователями", 
-                callback_data="manage_users"
+                callback_data=build_callback("manage_users")
             )])
 
         keyboard.append([get_back_button()])
@@ -75,7 +75,7 @@ class UserHandlers:
             await update.callback_query.answer("Эта команда только для администратора!", show_alert=True)
             return
 
-        users = db.get_all_users()
+        users = await adb.get_all_users()
         keyboard = []
 
         for user in users:
@@ -86,7 +86,7 @@ class UserHandlers:
             keyboard.append([
                 InlineKeyboardButton(
                     f"{role_icon} @{user[1]} ({user[2]})",
-                    callback_data=f"user_detail_{user[1]}"
+                    callback_data=build_callback("user_detail", user[1])
                 )
             ])
 
@@ -97,24 +97,40 @@ class UserHandlers:
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
+    async def user_detail_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Действия с выбранным пользователем"""
+        if update.effective_user.username != BotConfig.ADMIN_USERNAME:
+            await update.callback_query.answer("Эта команда только для администратора!", show_alert=True)
+            return
+
+        username = context.args[0]
+        user_data = await adb.get_user(username)
+        if not user_data:
+            await update.callback_query.answer("Пользователь не найден")
+            return
+
+        await update.callback_query.answer()
+        await update.callback_query.message.edit_text(
+            f"Пользователь @{username}\nРоль: {user_data[1]}",
+            reply_markup=get_user_actions_keyboard(username, user_data[1])
+        )
+
     async def change_role_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Изменение роли пользователя"""
         if update.effective_user.username != BotConfig.ADMIN_USERNAME:
             await update.callback_query.answer("Эта команда только для администратора!", show_alert=True)
             return
 
-        data = update.callback_query.data.split("_")
-        username = data[2]
-        new_role = data[3]
+        username, new_role = context.args
 
         if username == BotConfig.ADMIN_USERNAME:
             await update.callback_query.answer("Нельзя изменить роль администратора!", show_alert=True)
             return
 
-        db.update_user_role(username, new_role)
+        await adb.update_user_role(username, new_role)
         await update.callback_query.answer(f"Роль пользователя @{username} изменена")
         await self.manage_users_handler(update, context)
 
-def register_user_handlers(application):
+def register_user_handlers(application, router):
     """Функция для регистрации обработчиков пользователей"""
-    UserHandlers(application)
\ No newline at end of file
+    UserHandlers(application, router)
\ No newline at end of file
@@ -4,19 +4,30 @@
 Точка входа и обработка основных команд
 """
 
+import asyncio
 import logging
 from telegram import Update
 from telegram.ext import (
     Application,
     CommandHandler,
     MessageHandler,
-    CallbackQueryHandler,
     filters,
     ContextTypes,
 )
-from config import BotConfig, Roles
-from database import db
+from config import BotConfig, PersistenceConfig, Roles, TracingConfig, WebhookConfig
+from database import db, adb
+from handlers.admin import register_admin_handlers
+from handlers.comments import register_comment_handlers
+from handlers.tasks import register_task_handlers
+from handlers.users import register_user_handlers
+from utils.calendar import CalendarHandler, register_calendar_handlers
+from utils.callback_codec import codec
 from utils.keyboards import get_main_menu_keyboard
+from utils.message_state import MessageStateTracker
+from utils.persistence import SQLitePersistence
+from utils.router import CallbackRouter
+from utils.send_queue import ChatUpdateProcessor, SendScheduler
+from utils.tracing import tracer
 
 # Настройка логгирования
 logging.basicConfig(
@@ -26,24 +37,83 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class TaskTrackerBot:
-    def __init__(self):
-        self.application = Application.builder().token(BotConfig.BOT_TOKEN).build()
+    # Группа ответа на текст, не принятый обработчиками модулей
+    FALLBACK_GROUP = 10
+
+    def __init__(self, base_url=None, base_file_url=None):
+        """
+        :param base_url: Адрес Bot API (None - api.telegram.org),
+            используется для локальных стендов
+        :param base_file_url: Адрес скачивания файлов Bot API (None - api.telegram.org)
+        """
+        builder = Application.builder().token(BotConfig.BOT_TOKEN)
+        if base_url:
+            builder = builder.base_url(base_url)
+        if base_file_url:
+            builder = builder.base_file_url(base_file_url)
+        # Ограниченная очередь входящих обновлений
+        builder = builder.update_queue(
+            asyncio.Queue(maxsize=WebhookConfig.INGRESS_QUEUE_SIZE)
+        )
+        # Все исходящие запросы проходят через планировщик лимитов Telegram;
+        # пустые и частые правки сообщений отсекаются до очереди
+        self.send_queue = SendScheduler()
+        self.message_state = MessageStateTracker(self.send_queue)
+        builder = builder.rate_limiter(self.message_state)
+        # Ожидание лимита отправки в одном чате не останавливает обработку других
+        builder = builder.concurrent_updates(
+            ChatUpdateProcessor(WebhookConfig.CONCURRENT_UPDATES)
+        )
+        if PersistenceConfig.ENABLED:
+            # Незавершенный ввод (awaiting_task, current_task, ...) переживает перезапуск
+            builder = builder.persistence(SQLitePersistence(adb))
+        builder = builder.post_init(self._post_init).post_shutdown(self._post_shutdown)
+        self.application = builder.build()
+        # Длинные callback_data переживают перезапуск бота; запись из
+        # обработчиков идет через adb и не блокирует цикл событий
+        codec.store = db
+        codec.async_store = adb
+        self.router = CallbackRouter()
         self._register_handlers()
+        if TracingConfig.ENABLED:
+            # Обертки ставятся после регистрации всех обработчиков
+            # и до первого обращения к БД через adb
+            tracer.instrument_application(self.application, self.router)
+            tracer.instrument_database(db)
 
     def _register_handlers(self):
-        """Регистрация всех обработчиков команд"""
+        """
+        Регистрация всех обработчиков команд.
+        Маршруты inline-кнопок объявляются модулями обработчиков;
+        повторное объявление действия прерывает запуск (RouteCollisionError)
+        """
         self.application.add_handler(CommandHandler("start", self.start_handler))
         self.application.add_handler(CommandHandler("help", self.help_handler))
-        self.application.add_handler(CallbackQueryHandler(self.button_handler))
+
+        register_task_handlers(self.application, self.router)
+        register_comment_handlers(self.application, self.router)
+        register_user_handlers(self.application, self.router)
+        register_admin_handlers(self.application, self.router)
+        # Тепловая карта календаря: количество задач по дням месяца из БД
+        self.calendar = CalendarHandler(count_loader=adb.get_task_counts_by_day)
+        register_calendar_handlers(self.calendar, self.router)
+        self.router.add_routes({
+            "back": self.back_handler,
+            "ignore": self.ignore_handler,
+        }, owner=type(self).__name__)
+
+        # Все нажатия inline-кнопок проходят через один обработчик
+        self.application.add_handler(self.router.get_handler())
         self.application.add_handler(
-            MessageHandler(filters.TEXT & ~filters.COMMAND, self.message_handler)
+            MessageHandler(filters.TEXT & ~filters.COMMAND, self.message_handler),
+            group=self.FALLBACK_GROUP
         )
 
     async def start_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /start"""
         user = update.effective_user
-        if not db.get_user(user.username):
-            db.add_user(user.username)
+        if not await adb.get_user(user.username):
+            await adb.add_user(user.username)
 
         keyboard = get_main_menu_keyboard(user.username)
         await update.message.reply_text(
@@ -62,28 +132,52 @@ class TaskTrackerBot:
         """
         await update.message.reply_text(help_text)
 
-    async def button_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обработчик нажатий на inline-кнопки"""
-        query = update.callback_query
-        await query.answer()
+    async def back_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Кнопка 'Назад': закрыть inline-меню (главное меню остается внизу)"""
+        context.user_data.pop("awaiting_task", None)
+        context.user_data.pop("awaiting_comment", None)
+        context.user_data.pop("awaiting_import", None)
+        await update.callback_query.answer()
+        await update.callback_query.message.delete()
 
-        if query.data == "create_task":
-            context.user_data["awaiting_task"] = True
-            await query.message.reply_text("Введите описание задачи:")
+    async def ignore_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Нажатие на кнопку-надпись (номер страницы, день недели)"""
+        await update.callback_query.answer()
 
     async def message_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обработчик текстовых сообщений"""
-        if context.user_data.get("awaiting_task"):
-            description = update.message.text
-            task_id = db.add_task(description, update.effective_user.username)
-            context.user_data.pop("awaiting_task")
-            await update.message.reply_text(f"Задача #{task_id} создана!")
-        else:
-            await update.message.reply_text("Используйте кнопки меню")
+        """Текст, не принятый обработчиками задач и комментариев"""
+        await update.message.reply_text("Используйте кнопки меню")
+
+    async def _post_init(self, application):
+        """Запуск периодической записи метрик (если задан PROMETHEUS_FILE)"""
+        tracer.start_export()
+
+    async def _post_shutdown(self, application):
+        """Запись ожидающих callback_data и остановка записи метрик"""
+        await codec.flush()
+        await tracer.stop_export()
+
+    @staticmethod
+    def webhook_options():
+        """Параметры run_webhook/Updater.start_webhook из WebhookConfig"""
+        return {
+            "listen": WebhookConfig.LISTEN,
+            "port": WebhookConfig.PORT,
+            "url_path": WebhookConfig.URL_PATH,
+            "webhook_url": WebhookConfig.WEBHOOK_URL,
+            "secret_token": WebhookConfig.SECRET_TOKEN,
+            "max_connections": WebhookConfig.MAX_CONNECTIONS,
+        }
 
     def run(self):
-        """Запуск бота"""
-        self.application.run_polling()
+        """Запуск бота в режиме webhook или long polling"""
+        try:
+            if WebhookConfig.ENABLED:
+                self.application.run_webhook(**self.webhook_options())
+            else:
+                self.application.run_polling()
+        finally:
+            adb.shutdown()
 
 if __name__ == "__main__":
     # Инициализация базы данных
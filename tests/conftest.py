@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Общие фикстуры тестов
+Глобальное подключение database.db направляется во временный файл
+до импорта модулей бота, поэтому тесты не трогают рабочую БД
+
+Запуск: python -m pytest
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DatabaseConfig
+
+DatabaseConfig.DB_FILENAME = os.path.join(tempfile.mkdtemp(), "test.db")
+
+from database import Database
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Пустая БД со всеми миграциями"""
+    database = Database(str(tmp_path / "tracker.db"))
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def seed(database):
+    """
+    Заполнение БД через import_rows
+    :return: Функция seed(users, tasks, comments) со списками словарей полей
+    """
+    def seed(users=(), tasks=(), comments=()):
+        records = [("user", user) for user in users]
+        records += [("task", task) for task in tasks]
+        records += [("comment", comment) for comment in comments]
+        return database.import_rows(records)
+    return seed
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Кодек callback_data: кодирование и разбор без потерь, длинные данные
+через хранилище (в памяти и в БД, синхронно и через AsyncDatabase),
+срок хранения и ошибки разбора
+"""
+
+import asyncio
+import base64
+import time
+
+import pytest
+
+from database import AsyncDatabase
+from utils.callback_codec import (
+    ACTIONS,
+    CALLBACK_DATA_LIMIT,
+    CallbackCodec,
+    CallbackDecodeError,
+    MemoryPayloadStore,
+)
+
+ARGS = [
+    (),
+    (0,),
+    (42, "take"),
+    (-1, -2 ** 40, 2 ** 40),
+    ("", "привет", "a:b_c"),
+    (7, "new", "", "a", 1792310256, 17),
+]
+
+LONG_ARGS = ("delete_user", "очень_длинное_имя_пользователя_" * 3)
+
+
+@pytest.mark.parametrize("args", ARGS)
+@pytest.mark.parametrize("action", ACTIONS)
+def test_inline_round_trip(action, args):
+    codec = CallbackCodec()
+    data = codec.encode(action, *args)
+    assert len(data) <= CALLBACK_DATA_LIMIT
+    assert codec.decode(data) == (action, list(args))
+
+
+def test_stored_round_trip_in_memory():
+    store = MemoryPayloadStore()
+    codec = CallbackCodec(store)
+    data = codec.encode(*LONG_ARGS)
+    assert len(data) <= CALLBACK_DATA_LIMIT
+    assert codec.encode(*LONG_ARGS) == data
+    # Новый кодек (после перезапуска) читает тело из хранилища
+    assert CallbackCodec(store).decode(data) == (LONG_ARGS[0], [LONG_ARGS[1]])
+
+
+def test_stored_round_trip_in_database(database):
+    data = CallbackCodec(database).encode(*LONG_ARGS)
+    assert CallbackCodec(database).decode(data) == (LONG_ARGS[0], [LONG_ARGS[1]])
+
+
+def test_async_store_writes_in_background(database):
+    async_database = AsyncDatabase(database)
+
+    async def scenario():
+        codec = CallbackCodec(database, async_database)
+        data = [codec.encode("delete_user", f"{LONG_ARGS[1]}{i}") for i in range(3)]
+        # До записи тела берутся из памяти, БД еще пуста
+        assert codec.decode(data[0]) == ("delete_user", [f"{LONG_ARGS[1]}0"])
+        await codec.flush()
+        return data
+
+    try:
+        data = asyncio.run(scenario())
+    finally:
+        async_database.executor.shutdown(wait=True)
+    with database.pool.reader() as connection:
+        assert connection.execute("SELECT COUNT(*) FROM callback_payloads").fetchone()[0] == 3
+    for i, item in enumerate(data):
+        assert CallbackCodec(database).decode(item) == ("delete_user", [f"{LONG_ARGS[1]}{i}"])
+
+
+def test_prune_expired_payloads(database):
+    codec = CallbackCodec(database)
+    data = codec.encode(*LONG_ARGS)
+    assert database.prune_callback_payloads(int(time.time()) - 60) == 0
+    assert database.prune_callback_payloads(int(time.time()) + 60) == 1
+    with pytest.raises(CallbackDecodeError):
+        CallbackCodec(database).decode(data)
+
+
+def test_reissue_after_half_ttl_refreshes_timestamp():
+    store = MemoryPayloadStore()
+    codec = CallbackCodec(store, ttl=100)
+    codec.encode(*LONG_ARGS)
+    payload_id = CallbackCodec.payload_id(CallbackCodec.pack(*LONG_ARGS))
+    store._payloads[payload_id] = (store._payloads[payload_id][0], 0)
+
+    codec.encode(*LONG_ARGS)
+    assert store._payloads[payload_id][1] == 0
+    codec._issued.set(CallbackCodec.pack(*LONG_ARGS), time.time() - 60)
+    codec.encode(*LONG_ARGS)
+    assert store._payloads[payload_id][1] > 0
+
+
+@pytest.mark.parametrize("data", [
+    "",
+    "не base64!",
+    base64.urlsafe_b64encode(bytes((0x20, 0))).decode().rstrip("="),
+    base64.urlsafe_b64encode(bytes((0x10, 0x7F))).decode().rstrip("="),
+    base64.urlsafe_b64encode(bytes((0x10, 0x05, 0x09))).decode().rstrip("="),
+    base64.urlsafe_b64encode(bytes((0x11, 0x80))).decode().rstrip("="),
+    base64.urlsafe_b64encode(bytes((0x11, 0x05))).decode().rstrip("="),
+])
+def test_malformed_data(data):
+    with pytest.raises(CallbackDecodeError):
+        CallbackCodec().decode(data)
+
+
+def test_unknown_action_and_argument_type():
+    codec = CallbackCodec()
+    with pytest.raises(ValueError):
+        codec.encode("no_such_action")
+    with pytest.raises(TypeError):
+        codec.encode("task", 1.5)
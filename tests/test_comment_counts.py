@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Счетчики comment_count и last_comment_at, которые ведут триггеры comments:
+после добавления, удаления и импорта они совпадают с таблицей comments
+"""
+
+from database import Database
+
+COMMENT_COUNT = 5
+LAST_COMMENT_AT = 6
+
+
+def test_insert_and_delete(database):
+    database.add_user("alice")
+    task_id = database.add_task("Задача", "alice")
+    other_id = database.add_task("Другая задача", "alice")
+
+    first = database.add_comment(task_id, "alice", "Первый")
+    second = database.add_comment(task_id, "alice", "Второй")
+    database.add_comment(other_id, "alice", "Чужой")
+    task = database.get_task(task_id)
+    assert task[COMMENT_COUNT] == 2
+    assert task[LAST_COMMENT_AT] is not None
+    assert database.check_comment_counts() == []
+
+    database.delete_comment(second)
+    assert database.get_task(task_id)[COMMENT_COUNT] == 1
+    database.delete_comment(first)
+    task = database.get_task(task_id)
+    assert task[COMMENT_COUNT] == 0
+    assert task[LAST_COMMENT_AT] is None
+    assert database.get_task(other_id)[COMMENT_COUNT] == 1
+    assert database.check_comment_counts() == []
+
+
+def test_last_comment_at_follows_latest(database, seed):
+    seed(
+        users=[{"username": "alice"}],
+        tasks=[{"id": 1, "description": "Задача", "created_by": "alice",
+                "created_ts": 1700000000}],
+        comments=[
+            {"id": 1, "task_id": 1, "username": "alice", "text": "Поздний",
+             "created_ts": 1700000900},
+            {"id": 2, "task_id": 1, "username": "alice", "text": "Ранний",
+             "created_ts": 1700000100},
+        ],
+    )
+    assert database.get_task(1)[LAST_COMMENT_AT] == 1700000900
+    database.delete_comment(1)
+    assert database.get_task(1)[LAST_COMMENT_AT] == 1700000100
+    assert database.check_comment_counts() == []
+
+
+def test_delete_tasks_with_comments(database):
+    database.add_user("alice")
+    task_ids = [database.add_task(f"Задача {i}", "alice") for i in range(3)]
+    for task_id in task_ids:
+        for i in range(3):
+            database.add_comment(task_id, "alice", f"Комментарий {i}")
+
+    assert database.delete_tasks(task_ids[:2]) == 2
+    assert database.get_task_comments(task_ids[0]) == []
+    assert database.get_task(task_ids[2])[COMMENT_COUNT] == 3
+    assert database.check_comment_counts() == []
+
+
+def test_import_keeps_counts(database, seed, tmp_path):
+    seed(
+        users=[{"username": "alice"}],
+        tasks=[
+            {"id": i, "description": f"Задача {i}", "created_by": "alice",
+             "created_ts": 1700000000}
+            for i in range(1, 4)
+        ],
+        comments=[
+            {"id": i, "task_id": i % 3 + 1, "username": "alice", "text": f"Комментарий {i}",
+             "created_ts": 1700000000 + i}
+            for i in range(1, 11)
+        ],
+    )
+    # Повторный импорт тех же id пропускается и счетчики не удваивает
+    inserted = seed(comments=[
+        {"id": 1, "task_id": 2, "username": "alice", "text": "Дубль", "created_ts": 1700000001},
+    ])
+    assert inserted["comment"] == 0
+    assert [database.get_task(i)[COMMENT_COUNT] for i in range(1, 4)] == [3, 4, 3]
+    assert database.check_comment_counts() == []
+
+    # Задача с занятым id пропускается вместе со своими комментариями,
+    # к локальной задаче 2 они не прикрепляются
+    inserted = seed(
+        tasks=[{"id": 2, "description": "Чужая задача", "created_by": "alice",
+                "created_ts": 1700000000}],
+        comments=[{"id": 100, "task_id": 2, "username": "alice", "text": "Чужой",
+                   "created_ts": 1700000100}],
+    )
+    assert inserted["task"] == 0 and inserted["comment"] == 0
+    assert database.get_task(2)[COMMENT_COUNT] == 4
+    assert "Чужой" not in [row[1] for row in database.get_task_comments(2)]
+
+    # Загруженный комментарий к существующей задаче меняет ее версию:
+    # закэшированная карточка перерисовывается
+    version = database.get_task_version(3)
+    seed(comments=[{"id": 101, "task_id": 3, "username": "alice", "text": "Новый",
+                    "created_ts": 1700000200}])
+    assert database.get_task(3)[COMMENT_COUNT] == 4
+    assert database.get_task_version(3) > version
+    assert database.check_comment_counts() == []
+
+    # Выгрузка и загрузка в новую БД дают те же счетчики
+    with Database(str(tmp_path / "copy.db")) as copy:
+        copy.import_rows(database.export_rows())
+        assert [copy.get_task(i)[COMMENT_COUNT] for i in range(1, 4)] == [3, 4, 4]
+        assert copy.check_comment_counts() == []
+
+
+def test_check_and_repair(database):
+    database.add_user("alice")
+    task_id = database.add_task("Задача", "alice")
+    database.add_comment(task_id, "alice", "Комментарий")
+    with database.pool.writer() as connection:
+        connection.execute(
+            "UPDATE tasks SET comment_count = 7, last_comment_at = NULL WHERE id = ?",
+            (task_id,)
+        )
+
+    mismatches = database.check_comment_counts()
+    assert [(row[0], row[1], row[2]) for row in mismatches] == [(task_id, 7, 1)]
+    version = database.get_task_version(task_id)
+
+    database.check_comment_counts(repair=True)
+    assert database.check_comment_counts() == []
+    assert database.get_task(task_id)[COMMENT_COUNT] == 1
+    # Карточка задачи перерисовывается: версия выросла
+    assert database.get_task_version(task_id) > version
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Keyset-пагинация задач и комментариев по курсору (created_ts, id):
+страницы не теряют и не повторяют строки, в том числе при одинаковом
+created_ts, и корректно заканчиваются на границах
+"""
+
+import pytest
+
+from config import TaskStatuses
+
+PAGE = 5
+# Задачи парами с одинаковым created_ts: порядок внутри пары - по id
+TASK_TIMESTAMPS = [1700000000 + (i // 2) * 60 for i in range(12)]
+
+
+@pytest.fixture
+def tasks(database, seed):
+    seed(
+        users=[{"username": "alice"}, {"username": "bob"}],
+        tasks=[
+            {"id": i + 1, "description": f"Задача {i + 1}",
+             "status": TaskStatuses.DONE if i % 3 == 0 else TaskStatuses.NEW,
+             "created_by": "alice" if i % 2 else "bob", "created_ts": created_ts}
+            for i, created_ts in enumerate(TASK_TIMESTAMPS)
+        ],
+    )
+    # Все задачи от новых к старым
+    return [row[0] for row in database.get_all_tasks()]
+
+
+def cursor(row):
+    """Курсор (created_ts, id) строки задачи"""
+    return row[4], row[0]
+
+
+def walk_forward(database, **filters):
+    pages, after = [], None
+    while True:
+        page = database.get_tasks_page(after=after, limit=PAGE, **filters)
+        if not page:
+            return pages
+        pages.append([row[0] for row in page])
+        after = cursor(page[-1])
+
+
+def test_forward_pages_cover_all_tasks_once(database, tasks):
+    pages = walk_forward(database)
+    assert [task_id for page in pages for task_id in page] == tasks
+    assert [len(page) for page in pages] == [5, 5, 2]
+
+
+def test_ties_on_created_ts_are_ordered_by_id(database, tasks):
+    first = database.get_tasks_page(limit=2)
+    assert first[0][4] == first[1][4]
+    assert first[0][0] > first[1][0]
+    # Курсор на первой строке пары не пропускает вторую
+    after = database.get_tasks_page(after=cursor(first[0]), limit=1)
+    assert after[0][0] == first[1][0]
+
+
+def test_backward_pages_return_to_start(database, tasks):
+    """Страницы назад от самой старой задачи собирают все остальные по порядку"""
+    collected = []
+    before = cursor(database.get_task(tasks[-1]))
+    while True:
+        page = database.get_tasks_page(before=before, limit=PAGE)
+        if not page:
+            break
+        # Страница назад упорядочена так же, от новых к старым
+        assert [row[0] for row in page] == sorted((row[0] for row in page), reverse=True)
+        collected = [row[0] for row in page] + collected
+        before = cursor(page[0])
+    assert collected == tasks[:-1]
+
+
+def test_boundaries(database, tasks):
+    oldest = database.get_task(tasks[-1])
+    newest = database.get_task(tasks[0])
+    assert database.get_tasks_page(after=cursor(oldest), limit=PAGE) == []
+    assert database.get_tasks_page(before=cursor(newest), limit=PAGE) == []
+    # Страница ровно до последней задачи
+    page = database.get_tasks_page(after=cursor(database.get_task(tasks[-PAGE - 1])), limit=PAGE)
+    assert [row[0] for row in page] == tasks[-PAGE:]
+
+
+def test_pages_with_filters(database, tasks):
+    pages = walk_forward(database, status_filter="new", author_filter="alice")
+    expected = [row[0] for row in database.get_filtered_tasks(
+        status_filter="new", author_filter="alice"
+    )]
+    assert [task_id for page in pages for task_id in page] == expected
+    assert database.count_tasks(status_filter="new", author_filter="alice") == len(expected)
+
+
+@pytest.fixture
+def comments(database, seed):
+    seed(
+        users=[{"username": "alice"}],
+        tasks=[{"id": 1, "description": "Задача", "created_by": "alice",
+                "created_ts": 1700000000}],
+        comments=[
+            {"id": i + 1, "task_id": 1, "username": "alice", "text": f"Комментарий {i + 1}",
+             "created_ts": 1700000000 + (i // 2) * 60}
+            for i in range(9)
+        ],
+    )
+    # Все комментарии от новых к старым
+    return [row[0] for row in database.get_comments_page(1, limit=100)]
+
+
+def test_comment_pages_older_and_newer(database, comments):
+    """Порции старше курсора до начала ленты и обратно новее курсора"""
+    older, page = [], database.get_comments_page(1, limit=PAGE - 1)
+    while page:
+        older += [row[0] for row in page]
+        page = database.get_comments_page(1, before=(page[-1][3], page[-1][0]), limit=PAGE - 1)
+    assert older == comments
+
+    oldest = database.get_comments_page(1, before=(1700000000, 2), limit=PAGE)
+    assert [row[0] for row in oldest] == [1]
+    newer, after = [], (oldest[0][3], oldest[0][0])
+    while page := database.get_comments_page(1, after=after, limit=PAGE - 1):
+        newer += [row[0] for row in page]
+        after = (page[-1][3], page[-1][0])
+    assert newer == comments[::-1][1:]
+    assert database.get_comments_page(1, after=after, limit=PAGE) == []
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+SQLitePersistence: повторная загрузка ключа, вытесненного из кэша
+состояний, не возвращает значения, уже удаленные из памяти
+"""
+
+import asyncio
+import pickle
+
+from config import CacheConfig
+from database import AsyncDatabase, Database
+from utils.persistence import KIND_USER, SQLitePersistence
+
+
+def run_with_persistence(scenario, path):
+    """
+    Выполнение scenario(persistence) поверх AsyncDatabase новой БД
+    (AsyncDatabase.shutdown закрывает ее соединения)
+    """
+    async def main():
+        async_database = AsyncDatabase(Database(str(path)))
+        try:
+            return await scenario(SQLitePersistence(async_database))
+        finally:
+            async_database.shutdown()
+    return asyncio.run(main())
+
+
+async def stored_state(persistence, user_id):
+    """Состояние пользователя, записанное в БД"""
+    blob = await persistence.database.load_persistent_data(KIND_USER, str(user_id))
+    return pickle.loads(blob) if blob is not None else None
+
+
+def test_reload_after_eviction_keeps_deletions(tmp_path, monkeypatch):
+    monkeypatch.setattr(CacheConfig, "PERSISTENCE_STATE_CACHE_SIZE", 1)
+
+    async def scenario(persistence):
+        user_data = {}
+        await persistence.refresh_user_data(1, user_data)
+        user_data.update(awaiting_task=True, task_filters={"status": "new"})
+        await persistence.update_user_data(1, dict(user_data))
+        await persistence.flush()
+
+        # Обработчик завершил ввод, update_persistence еще не проходил
+        user_data.pop("awaiting_task")
+        # Обновление другого пользователя вытесняет ключ первого
+        await persistence.refresh_user_data(2, {})
+        await persistence.refresh_user_data(1, user_data)
+        await persistence.flush()
+        return user_data, await stored_state(persistence, 1), persistence.get_stats()
+
+    user_data, stored, stats = run_with_persistence(scenario, tmp_path / "state.db")
+    assert user_data == {"task_filters": {"status": "new"}}
+    assert stored == {"task_filters": {"status": "new"}}
+    assert stats["evicted_keys"] >= 1
+
+
+def test_eviction_of_unchanged_key_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(CacheConfig, "PERSISTENCE_STATE_CACHE_SIZE", 1)
+
+    async def scenario(persistence):
+        user_data = {}
+        await persistence.refresh_user_data(1, user_data)
+        user_data["awaiting_task"] = True
+        await persistence.update_user_data(1, dict(user_data))
+        await persistence.flush()
+        written = persistence.get_stats()["written"]
+
+        await persistence.refresh_user_data(2, {})
+        await persistence.flush()
+        return persistence.get_stats()["written"] - written, await stored_state(persistence, 1)
+
+    written, stored = run_with_persistence(scenario, tmp_path / "state.db")
+    assert written == 0
+    assert stored == {"awaiting_task": True}
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Планы частых запросов (HOT_QUERIES): ни один не должен
+выполняться полным просмотром таблицы; списки за период
+не сортируются во временном B-дереве
+"""
+
+import time
+
+import pytest
+
+from config import TaskStatuses
+from database import HOT_QUERIES, build_tasks_query, has_full_scan
+from utils.filters import PERIOD_BUCKETS
+
+
+def test_has_full_scan():
+    assert has_full_scan(["SCAN tasks"])
+    assert has_full_scan(["SEARCH t USING INTEGER PRIMARY KEY (rowid=?)", "SCAN comments"])
+    assert not has_full_scan(["SEARCH tasks USING INDEX idx_tasks_created_ts (created_ts<?)"])
+    assert not has_full_scan(["SCAN tasks_fts VIRTUAL TABLE INDEX 0:M1"])
+    assert not has_full_scan([])
+
+
+def test_hot_queries_after_analyze(database, seed):
+    """Статистика ANALYZE по заполненной БД не уводит планы в полный просмотр"""
+    statuses = list(TaskStatuses.KEYS.values())
+    seed(
+        users=[{"username": f"user_{i}"} for i in range(20)],
+        tasks=[
+            {"id": i, "description": f"Задача {i}", "status": statuses[i % len(statuses)],
+             "created_by": f"user_{i % 20}", "created_ts": 1700000000 + i * 600}
+            for i in range(1, 2001)
+        ],
+        comments=[
+            {"id": i, "task_id": i % 2000 + 1, "username": f"user_{i % 20}",
+             "text": f"Комментарий {i}", "created_ts": 1700000000 + i * 60}
+            for i in range(1, 5001)
+        ],
+    )
+    with database.pool.writer() as connection:
+        connection.execute("ANALYZE")
+    assert database.check_query_plans() == {}
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(database, name):
+    sql, params = HOT_QUERIES[name]
+    plan = database.explain_query_plan(sql, params)
+    assert plan and not has_full_scan(plan), plan
+
+
+@pytest.mark.parametrize("period", ["today", "week", "month"])
+@pytest.mark.parametrize("filters", [{}, {"status_filter": "new"}, {"author_filter": "user"}])
+def test_period_page_is_ordered_by_index(database, period, filters):
+    sql, params = build_tasks_query(period_filter=period, limit=6, **filters)
+    plan = database.explain_query_plan(sql, params)
+    column, _ = PERIOD_BUCKETS[period]
+    assert f"({column}=?)" in " ".join(plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+def test_period_filter_selects_current_bucket(database, seed):
+    now = int(time.time())
+    seed(
+        users=[{"username": "alice"}],
+        tasks=[
+            {"id": 1, "description": "Сейчас", "created_by": "alice", "created_ts": now},
+            {"id": 2, "description": "Год назад", "created_by": "alice",
+             "created_ts": now - 366 * 86400},
+        ],
+    )
+    for period in ("today", "week", "month"):
+        assert database.count_tasks(period_filter=period) == 1
+        assert [task[0] for task in database.get_tasks_page(period_filter=period)] == [1]
+    assert database.count_tasks(period_filter="all") == 2
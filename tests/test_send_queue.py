@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+SendScheduler против заглушки Bot API: повтор после 429 (RetryAfter)
+с паузой только своего чата, порядок выдачи токенов по приоритету и
+обработка обновлений других чатов, пока корзина одного чата пуста
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import pytest
+from telegram import Chat, Message, Update, User
+from telegram.error import RetryAfter
+from telegram.ext import ApplicationBuilder, ExtBot, MessageHandler, filters
+
+from bench.fake_bot_api import FakeBotApi
+from config import SendQueueConfig
+from utils.send_queue import ChatUpdateProcessor, SendScheduler
+
+TOKEN = "1:test"
+
+
+@pytest.fixture(autouse=True)
+def fast_limits(monkeypatch):
+    """Лимиты, при которых тест идет доли секунды"""
+    monkeypatch.setattr(SendQueueConfig, "RETRY_MARGIN", 0.0)
+    monkeypatch.setattr(SendQueueConfig, "GLOBAL_RATE", 1000)
+    monkeypatch.setattr(SendQueueConfig, "GLOBAL_BURST", 1000)
+
+
+def run_with_bot(scenario, scheduler, **api_options):
+    """Выполнение scenario(bot, api) с ботом, направленным на заглушку"""
+    async def main():
+        api = FakeBotApi(**api_options)
+        api.start()
+        bot = ExtBot(TOKEN, base_url=api.base_url, rate_limiter=scheduler)
+        await bot.initialize()
+        try:
+            return await scenario(bot, api)
+        finally:
+            await bot.shutdown()
+            await api.stop()
+    return asyncio.run(main())
+
+
+def sent_texts(api, chat_id):
+    """Тексты сообщений чата в порядке поступления в заглушку"""
+    return [
+        text for (chat, _), (text, _) in sorted(api.messages.items(), key=lambda item: item[0][1])
+        if chat == chat_id
+    ]
+
+
+def test_retry_after_is_retried(monkeypatch):
+    monkeypatch.setattr(SendQueueConfig, "PRIVATE_CHAT_BURST", 10)
+    scheduler = SendScheduler()
+
+    async def scenario(bot, api):
+        started = time.monotonic()
+        await asyncio.gather(*(bot.send_message(1, f"Сообщение {i}") for i in range(3)))
+        return time.monotonic() - started
+
+    elapsed = run_with_bot(scenario, scheduler, chat_limit=2, retry_after=1)
+    # Третье сообщение получило 429 и ушло после паузы retry_after
+    assert scheduler.flood_waits >= 1
+    assert scheduler.retries >= 1
+    assert elapsed >= 1.0
+    assert scheduler.get_stats()["lanes"]["interactive"]["sent"] == 3
+
+
+def test_retry_after_pauses_only_its_chat(monkeypatch):
+    monkeypatch.setattr(SendQueueConfig, "PRIVATE_CHAT_BURST", 10)
+    scheduler = SendScheduler()
+
+    async def scenario(bot, api):
+        flooded = asyncio.gather(*(bot.send_message(1, f"Сообщение {i}") for i in range(3)))
+        await asyncio.sleep(0.2)
+        # Пока чат 1 на паузе, другой чат отвечает сразу
+        started = time.monotonic()
+        await bot.send_message(2, "Ответ")
+        other = time.monotonic() - started
+        await flooded
+        return other
+
+    assert run_with_bot(scenario, scheduler, chat_limit=2, retry_after=1) < 0.5
+
+
+def test_retry_limit_raises(monkeypatch):
+    monkeypatch.setattr(SendQueueConfig, "PRIVATE_CHAT_BURST", 10)
+    scheduler = SendScheduler(max_retries=0)
+
+    async def scenario(bot, api):
+        await bot.send_message(1, "Первое")
+        with pytest.raises(RetryAfter):
+            await bot.send_message(1, "Второе")
+
+    run_with_bot(scenario, scheduler, chat_limit=1, retry_after=1)
+    assert scheduler.flood_waits == 1
+    assert scheduler.retries == 0
+
+
+def test_interactive_requests_overtake_notifications(monkeypatch):
+    monkeypatch.setattr(SendQueueConfig, "PRIVATE_CHAT_RATE", 50)
+    monkeypatch.setattr(SendQueueConfig, "PRIVATE_CHAT_BURST", 1)
+    scheduler = SendScheduler()
+
+    async def scenario(bot, api):
+        notifications = [scheduler.notify(bot, 1, f"Уведомление {i}") for i in range(5)]
+        # Первое уведомление забирает токен, остальные ждут в очереди чата
+        while len(getattr(scheduler._chat_gates.get(1), "_waiters", ())) < 4:
+            await asyncio.sleep(0.001)
+        await bot.send_message(1, "Ответ")
+        await asyncio.gather(*notifications)
+        return sent_texts(api, 1)
+
+    texts = run_with_bot(scenario, scheduler)
+    # Ответ пользователю обслуживается раньше ожидающих уведомлений
+    assert texts.index("Ответ") == 1
+    assert len(texts) == 6
+    assert scheduler.get_stats()["lanes"]["notification"]["sent"] == 5
+
+
+def make_update(update_id, chat_id, text):
+    user = User(chat_id, f"user{chat_id}", is_bot=False)
+    message = Message(update_id, datetime.now(timezone.utc), Chat(chat_id, Chat.PRIVATE),
+                      from_user=user, text=text)
+    return Update(update_id, message=message)
+
+
+def test_exhausted_chat_does_not_delay_other_chats(monkeypatch):
+    # Корзина чата 1 - один токен, следующий через 0.5 с
+    monkeypatch.setattr(SendQueueConfig, "PRIVATE_CHAT_RATE", 2)
+    monkeypatch.setattr(SendQueueConfig, "PRIVATE_CHAT_BURST", 1)
+
+    async def main():
+        api = FakeBotApi()
+        api.start()
+        application = (
+            ApplicationBuilder()
+            .token(TOKEN)
+            .base_url(api.base_url)
+            .rate_limiter(SendScheduler())
+            .concurrent_updates(ChatUpdateProcessor(8))
+            .build()
+        )
+        replied = {}
+
+        async def reply(update, context):
+            await context.bot.send_message(update.effective_chat.id, f"Ответ {update.message.text}")
+            replied[update.message.text] = time.monotonic() - started
+
+        application.add_handler(MessageHandler(filters.TEXT, reply))
+        await application.initialize()
+        await application.start()
+        try:
+            started = time.monotonic()
+            for update_id, (chat_id, text) in enumerate(
+                    [(1, "A1"), (1, "A2"), (1, "A3"), (2, "B1")], start=1):
+                await application.update_queue.put(make_update(update_id, chat_id, text))
+            while len(replied) < 4:
+                await asyncio.sleep(0.01)
+        finally:
+            await application.stop()
+            await application.shutdown()
+            await api.stop()
+        return replied, sent_texts(api, 1)
+
+    replied, texts = asyncio.run(main())
+    # Чат 2 не ждет, пока чат 1 дождется токенов на A2 и A3
+    assert replied["B1"] < 0.3
+    assert replied["A3"] >= 0.9
+    # Обновления одного чата обрабатываются по очереди
+    assert texts == ["Ответ A1", "Ответ A2", "Ответ A3"]
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Карточка задачи: строится из строки tasks (без чтения комментариев)
+и укладывается в лимит сообщения Telegram
+"""
+
+import asyncio
+
+import pytest
+from telegram.ext import ApplicationBuilder
+
+from config import Pagination
+from database import adb, db
+from handlers.tasks import TaskHandlers
+from utils.router import CallbackRouter
+
+
+@pytest.fixture
+def handlers():
+    application = ApplicationBuilder().token("1:test").build()
+    return TaskHandlers(application, CallbackRouter())
+
+
+def render(handlers, task_id):
+    return asyncio.run(handlers._render_task_card(task_id, "alice"))
+
+
+def test_card_with_many_long_comments(handlers, monkeypatch):
+    db.add_user("alice")
+    task_id = db.add_task("Задача с обсуждением", "alice")
+    for i in range(50):
+        db.add_comment(task_id, "alice", f"Комментарий {i} " + "текст " * 150)
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("Карточка не должна читать комментарии")
+    monkeypatch.setattr(adb, "get_task_comments", fail, raising=False)
+    monkeypatch.setattr(adb, "get_comments_page", fail, raising=False)
+
+    text, _ = render(handlers, task_id)
+    assert len(text) <= Pagination.MESSAGE_MAX_LENGTH
+    assert "Комментарии: 50" in text
+    assert "текст" not in text
+
+
+def test_card_with_long_description(handlers):
+    db.add_user("alice")
+    task_id = db.add_task("описание " * 1000, "alice")
+    text, _ = render(handlers, task_id)
+    assert len(text) == Pagination.MESSAGE_MAX_LENGTH
+    assert text.endswith("Комментарии отсутствуют")
+
+
+def test_missing_task(handlers):
+    assert render(handlers, 10 ** 9) is None
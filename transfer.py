@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Импорт и экспорт данных Task Tracker из командной строки
+
+Запуск:
+    python transfer.py export backup.jsonl.gz [--db task_tracker.db] [--format csv]
+    python transfer.py import backup.jsonl.gz [--db task_tracker.db] [--batch-size N]
+"""
+
+import argparse
+import sys
+from config import DatabaseConfig, TransferConfig
+
+def print_progress(progress):
+    """Ход передачи в stderr (одна обновляемая строка)"""
+    sys.stderr.write(f"\r{progress.rows} строк, {progress.rate:.0f} строк/с   ")
+    sys.stderr.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Импорт и экспорт задач и комментариев")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("path", help="Файл выгрузки (.jsonl.gz или .csv.gz)")
+    parser.add_argument("--db", default=DatabaseConfig.DB_FILENAME, help="Файл БД")
+    parser.add_argument("--format", choices=("jsonl", "csv"),
+                        help="Формат (по умолчанию - по расширению файла)")
+    parser.add_argument("--batch-size", type=int, default=TransferConfig.BATCH_SIZE,
+                        help="Строк в одном fetchmany/транзакции")
+    args = parser.parse_args()
+
+    # Глобальное подключение database.db открывает выбранный файл
+    DatabaseConfig.DB_FILENAME = args.db
+    TransferConfig.BATCH_SIZE = args.batch_size
+    from database import db
+    from utils.transfer import TransferProgress, export_data, import_data
+
+    progress = TransferProgress(print_progress)
+    try:
+        if args.command == "export":
+            export_data(db, args.path, args.format, progress)
+            sys.stderr.write(f"\rЭкспорт: {progress.summary()}\n")
+        else:
+            _, inserted = import_data(db, args.path, args.format, progress)
+            sys.stderr.write(f"\rИмпорт: {progress.summary()}\n")
+            sys.stderr.write(
+                "Добавлено: " + ", ".join(f"{kind}: {count}" for kind, count in inserted.items())
+                + "\n"
+            )
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Модуль кэширования в памяти процесса
+"""
+
+import threading
+from collections import OrderedDict
+
+# Маркер отсутствия значения (None - допустимое кэшируемое значение)
+MISSING = object()
+
+class LRUCache:
+    """Потокобезопасный LRU-кэш ограниченного размера со счетчиками"""
+
+    def __init__(self, maxsize, on_evict=None):
+        """
+        :param maxsize: Максимальное количество значений
+        :param on_evict: Функция on_evict(key, value), вызываемая для значений,
+            вытесненных по размеру (вне блокировки кэша)
+        """
+        self.maxsize = maxsize
+        self.on_evict = on_evict
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # Поколение растет при каждой инвалидации; значение, загруженное
+        # до инвалидации, в кэш не попадает
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=MISSING):
+        """Получение значения с обновлением порядка использования"""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, generation=None):
+        """
+        Сохранение значения с вытеснением самого старого
+        :param generation: Поколение на момент загрузки значения (см. get_or_load)
+        """
+        evicted = []
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                evicted.append(self._data.popitem(last=False))
+                self.evictions += 1
+        if self.on_evict:
+            for evicted_key, evicted_value in evicted:
+                self.on_evict(evicted_key, evicted_value)
+
+    def get_or_load(self, key, loader):
+        """
+        Read-through: значение из кэша или из loader() с сохранением
+        :param loader: Функция без аргументов, загружающая значение
+        """
+        value = self.get(key)
+        if value is not MISSING:
+            return value
+        with self._lock:
+            generation = self._generation
+        value = loader()
+        self.set(key, value, generation)
+        return value
+
+    def invalidate(self, key):
+        """Удаление значения из кэша"""
+        with self._lock:
+            self._generation += 1
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Полная очистка кэша"""
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def get_stats(self):
+        """Снимок счетчиков кэша"""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
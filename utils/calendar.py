@@ -4,11 +4,15 @@
 Интеграция с python-telegram-calendar
 """
 
+import calendar
 import logging
 from datetime import datetime, timedelta
+from functools import lru_cache
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
-from telegram.ext import CallbackQueryHandler, ContextTypes
-from config import CalendarConfig
+from telegram.ext import ContextTypes
+from config import CacheConfig, CalendarConfig
+from utils.cache import LRUCache, MISSING
+from utils.router import build_callback
 
 # Настройка логгирования
 logger = logging.getLogger(__name__)
@@ -16,31 +20,62 @@ logger = logging.getLogger(__name__)
 class CalendarHandler:
     """Класс для обработки календаря и выбора дат"""
     
-    def __init__(self):
+    def __init__(self, count_loader=None):
+        """
+        :param count_loader: Корутина count_loader(year, month), возвращающая
+            {день: количество задач} для тепловой карты (опционально)
+        """
         self.date_format = CalendarConfig.DATE_FORMAT
         self.quick_periods = CalendarConfig.QUICK_PERIODS
+        self.count_loader = count_loader
+        # Готовые разметки: (year, month, счетчики по дням) -> InlineKeyboardMarkup
+        self.markup_cache = LRUCache(CacheConfig.CALENDAR_CACHE_SIZE)
     
-    def generate_calendar(self, year=None, month=None):
-        """Генерация клавиатуры календаря"""
+    async def render_calendar(self, year=None, month=None):
+        """Клавиатура календаря со счетчиками задач по дням"""
+        now = datetime.now()
+        year = year or now.year
+        month = month or now.month
+
+        day_counts = None
+        if self.count_loader:
+            day_counts = await self.count_loader(year, month)
+        return self.generate_calendar(year, month, day_counts)
+    
+    def generate_calendar(self, year=None, month=None, day_counts=None):
+        """
+        Генерация клавиатуры календаря (с кэшированием готовой разметки)
+        :param day_counts: Словарь {день: количество задач} для тепловой карты
+        """
         now = datetime.now()
         if not year:
             year = now.year
         if not month:
             month = now.month
 
+        counts_key = tuple(sorted(day_counts.items())) if day_counts else ()
+        cache_key = (year, month, counts_key)
+        markup = self.markup_cache.get(cache_key)
+        if markup is MISSING:
+            markup = self._build_calendar(year, month, day_counts or {})
+            self.markup_cache.set(cache_key, markup)
+        return markup
+    
+    def _build_calendar(self, year, month, day_counts):
+        """Построение клавиатуры календаря"""
         keyboard = []
         
         # Заголовок с месяцем и годом
         month_name = self._get_month_name(month)
         keyboard.append([
-            InlineKeyboardButton("◀", callback_data=f"prev_month_{year}_{month}"),
-            InlineKeyboardButton(f"{month_name} {year}", callback_data="ignore"),
-            InlineKeyboardButton("▶", callback_data=f"next_month_{year}_{month}")
+            InlineKeyboardButton("◀", callback_data=build_callback("calendar", "prev", year, month)),
+            InlineKeyboardButton(f"{month_name} {year}", callback_data=build_callback("ignore")),
+            InlineKeyboardButton("▶", callback_data=build_callback("calendar", "next", year, month))
         ])
         
         # Дни недели
         keyboard.append([
-            InlineKeyboardButton(day, callback_data="ignore") 
+            InlineKeyboardButton(day, callback_data=build_callback("ignore")) 
             for day in ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
         ])
         
@@ -49,14 +84,17 @@ class CalendarHandler:
         for week in month_days:
             keyboard.append([
                 InlineKeyboardButton(
-                    str(day) if day != 0 else " ", 
-                    callback_data=f"select_day_{year}_{month}_{day}" if day != 0 else "ignore"
+                    self._day_label(day, day_counts.get(day, 0)) if day != 0 else " ", 
+                    callback_data=(
+                        build_callback("calendar", "day", year, month, day)
+                        if day != 0 else build_callback("ignore")
+                    )
                 ) for day in week
             ])
         
         # Быстрый выбор периода
         keyboard.append([
-            InlineKeyboardButton(period, callback_data=f"quick_period_{period_id}")
+            InlineKeyboardButton(period, callback_data=build_callback("calendar", "period", period_id))
             for period_id, period in self.quick_periods.items()
         ])
         
@@ -71,52 +109,41 @@ class CalendarHandler:
         ]
         return months[month - 1]
     
-    def _get_month_days(self, year, month):
-        """Генерация дней месяца для календаря"""
-        first_day = datetime(year, month, 1)
-        last_day = datetime(year, month + 1, 1) - timedelta(days=1)
-        
-        # Находим день недели первого дня месяца (0-6, где 0 - понедельник)
-        weekday = first_day.weekday()
-        
-        # Создаем матрицу 6x7
-        weeks = []
-        week = [0] * 7
-        
-        day = 1
-        for i in range(1, last_day.day + weekday + 1):
-            if i <= weekday:
-                week[i-1] = 0
-            else:
-                week[(i-1)%7] = day
-                if (i-1)%7 == 6:
-                    weeks.append(week)
-                    week = [0] * 7
-                day += 1
-        
-        if week != [0] * 7:
-            weeks.append(week)
-        
-        return weeks
+    @staticmethod
+    def _day_label(day, count):
+        """Подпись ячейки дня: число и количество задач, если они есть"""
+        return f"{day}·{count}" if count else str(day)
+    
+    @staticmethod
+    @lru_cache(maxsize=CacheConfig.CALENDAR_CACHE_SIZE)
+    def _get_month_days(year, month):
+        """
+        Генерация дней месяца для календаря
+        :return: Кортеж недель (понедельник - первый день), 0 - пустая ячейка
+        """
+        return tuple(
+            tuple(week)
+            for week in calendar.Calendar(firstweekday=0).monthdayscalendar(year, month)
+        )
     
     async def process_selection(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработка выбора даты"""
         query = update.callback_query
         await query.answer()
         
-        data = query.data
+        # calendar:day:<год>:<месяц>:<день>, calendar:prev|next:<год>:<месяц>,
+        # calendar:period:<период>
+        kind, *args = context.args
         
-        if data.startswith("select_day_"):
-            _, _, year, month, day = data.split("_")
+        if kind == "day":
+            year, month, day = args
             selected_date = datetime(int(year), int(month), int(day))
             return selected_date.strftime(self.date_format)
         
-        elif data.startswith(("prev_month_", "next_month_")):
-            action, year, month = data.split("_")
-            year = int(year)
-            month = int(month)
+        elif kind in ("prev", "next"):
+            year, month = int(args[0]), int(args[1])
             
-            if action == "prev_month":
+            if kind == "prev":
                 if month == 1:
                     month = 12
                     year -= 1
@@ -129,12 +156,12 @@ class CalendarHandler:
                 else:
                     month += 1
             
-            new_calendar = self.generate_calendar(year, month)
+            new_calendar = await self.render_calendar(year, month)
             await query.edit_message_reply_markup(reply_markup=new_calendar)
             return None
         
-        elif data.startswith("quick_period_"):
-            period = data.split("_")[2]
+        elif kind == "period":
+            period = args[0]
             now = datetime.now()
             
             if period == "today":
@@ -145,21 +172,16 @@ class CalendarHandler:
                 return f"{start.strftime(self.date_format)}-{end.strftime(self.date_format)}"
             elif period == "month":
                 start = datetime(now.year, now.month, 1)
-                end = datetime(now.year, now.month + 1, 1) - timedelta(days=1)
+                end = start.replace(day=calendar.monthrange(now.year, now.month)[1])
                 return f"{start.strftime(self.date_format)}-{end.strftime(self.date_format)}"
             else:  # all
                 return "all"
         
         return None
 
-def register_calendar_handlers(application, calendar_handler):
+def register_calendar_handlers(calendar_handler, router):
     """Регистрация обработчиков календаря"""
     async def calendar_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return await calendar_handler.process_selection(update, context)
     
-    application.add_handler(
-        CallbackQueryHandler(
-            calendar_callback,
-            pattern="^(select_day|prev_month|next_month|quick_period)_"
-        )
-    )
\ No newline at end of file
+    router.add_route("calendar", calendar_callback, owner="CalendarHandler")
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+Модуль компактного кодирования callback_data
+Действие кодируется номером (опкодом) из таблицы ACTIONS, аргументы -
+типизированными varint-целыми и строками UTF-8; результат - base64url
+без выравнивания. Данные длиннее ограничения Telegram (64 байта)
+сохраняются в хранилище на сервере, а в кнопку попадает короткий id -
+хэш тела. id известен без обращения к хранилищу, поэтому клавиатура
+строится без ожидания БД: запись уходит в фон (AsyncDatabase) одним
+пакетом на клавиатуру, а до ее завершения тело берется из памяти.
+
+Формат (версия 1):
+    заголовок: VERSION << 4 | вид (KIND_INLINE / KIND_STORED)
+    KIND_INLINE: опкод (varint), затем аргументы:
+        целое  - varint(zigzag(n) << 1)
+        строка - varint(len << 1 | 1) + байты UTF-8
+    KIND_STORED: varint id записи в хранилище, где лежит тело KIND_INLINE
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import logging
+import sqlite3
+import time
+from config import CacheConfig, DatabaseConfig
+from utils.cache import LRUCache, MISSING
+
+# Настройка логгирования
+logger = logging.getLogger(__name__)
+
+# Ограничение Telegram на длину callback_data в байтах
+CALLBACK_DATA_LIMIT = 64
+
+VERSION = 1
+KIND_INLINE = 0
+KIND_STORED = 1
+
+# Таблица опкодов: номер действия - его позиция.
+# Опубликованные кнопки хранят номера, поэтому действия только добавляются в конец
+ACTIONS = (
+    "back", "ignore",
+    "tasks", "page", "search_page", "create_task", "task", "status", "delete", "filter",
+    "comment", "comments",
+    "manage_users", "user_detail", "change_role",
+    "promote", "demote", "delete_user", "admin_tasks",
+    "calendar",
+    "confirm", "cancel_action",
+    "select", "bulk",
+)
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+
+class CallbackDecodeError(ValueError):
+    """callback_data не удалось разобрать (чужой формат, версия или id)"""
+
+class MemoryPayloadStore:
+    """Хранилище длинных payload в памяти процесса (для стендов и тестов)"""
+
+    def __init__(self):
+        # id -> (payload, время выдачи)
+        self._payloads = {}
+
+    def save_callback_payloads(self, payloads):
+        for payload_id, payload, issued_ts in payloads:
+            self._payloads[payload_id] = (payload, issued_ts)
+
+    def load_callback_payload(self, payload_id):
+        stored = self._payloads.get(payload_id)
+        return stored[0] if stored else None
+
+    def prune_callback_payloads(self, before_ts):
+        expired = [
+            payload_id for payload_id, (_, issued_ts) in self._payloads.items()
+            if issued_ts < before_ts
+        ]
+        for payload_id in expired:
+            del self._payloads[payload_id]
+        return len(expired)
+
+def _write_varint(buffer, value):
+    while value > 0x7F:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def _read_varint(payload, position):
+    result = shift = 0
+    while True:
+        try:
+            byte = payload[position]
+        except IndexError:
+            raise CallbackDecodeError("Обрезанный varint") from None
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, position
+        shift += 7
+
+class CallbackCodec:
+    """Кодирование и декодирование callback_data"""
+
+    def __init__(self, store=None, async_store=None, ttl=None):
+        """
+        :param store: Хранилище длинных payload с методами
+            save_callback_payloads([(id, bytes, время выдачи)]),
+            load_callback_payload(id) -> bytes | None и prune_callback_payloads(before_ts)
+            (по умолчанию - в памяти процесса)
+        :param async_store: Асинхронный фасад хранилища (AsyncDatabase): через него
+            идет запись из цикла событий. None - запись синхронно через store
+        :param ttl: Срок хранения payload в секундах
+            (по умолчанию DatabaseConfig.CALLBACK_PAYLOAD_TTL)
+        """
+        self.store = store or MemoryPayloadStore()
+        self.async_store = async_store
+        self.ttl = ttl or DatabaseConfig.CALLBACK_PAYLOAD_TTL
+        # Время последней записи payload: выданные недавно не пишутся повторно,
+        # давно выданные - переписываются, чтобы продлить срок хранения
+        self._issued = LRUCache(CacheConfig.CALLBACK_PAYLOAD_CACHE_SIZE)
+        self._stored_payloads = LRUCache(CacheConfig.CALLBACK_PAYLOAD_CACHE_SIZE)
+        # id -> (payload, время выдачи) до записи в хранилище
+        self._pending = {}
+        self._write_task = None
+        self._pruned_at = 0.0
+
+    @staticmethod
+    def payload_id(body):
+        """id записи хранилища: 63 бита хэша тела (одинаковые тела - один id)"""
+        return int.from_bytes(hashlib.blake2b(body, digest_size=8).digest(), "big") >> 1
+
+    def encode(self, action, *args):
+        """
+        Формирование callback_data (без ожидания хранилища)
+        :param action: Действие из ACTIONS
+        :param args: Аргументы (int или str)
+        :return: Строка не длиннее CALLBACK_DATA_LIMIT
+        """
+        body = self.pack(action, *args)
+        data = self._b64encode(bytes((VERSION << 4 | KIND_INLINE,)) + body)
+        if len(data) <= CALLBACK_DATA_LIMIT:
+            return data
+
+        payload_id = self.payload_id(body)
+        now = time.time()
+        issued = self._issued.get(body)
+        if issued is MISSING or now - issued > self.ttl / 2:
+            self._issued.set(body, now)
+            self._stored_payloads.set(payload_id, body)
+            self._pending[payload_id] = (body, int(now))
+            self._schedule_write()
+        header = bytearray((VERSION << 4 | KIND_STORED,))
+        _write_varint(header, payload_id)
+        return self._b64encode(bytes(header))
+
+    def _schedule_write(self):
+        """Запись новых payload: в фоне из цикла событий, иначе сразу"""
+        loop = None
+        if self.async_store is not None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                pass
+        if loop is None:
+            # Вне цикла событий (скрипты, стенды) ждать некому
+            batch, self._pending = self._pending, {}
+            self.store.save_callback_payloads(self._rows(batch))
+            if self._prune_due():
+                self.store.prune_callback_payloads(self._prune_before())
+            return
+        if self._write_task is None or self._write_task.done():
+            self._write_task = loop.create_task(self._write_pending())
+
+    async def _write_pending(self):
+        """Запись накопленных payload пакетом (транзакция на пакет)"""
+        # Все кнопки строящейся клавиатуры кодируются до этой точки
+        await asyncio.sleep(0)
+        while self._pending:
+            batch, self._pending = self._pending, {}
+            try:
+                await self.async_store.save_callback_payloads(self._rows(batch))
+                if self._prune_due():
+                    await self.async_store.prune_callback_payloads(self._prune_before())
+            except sqlite3.Error:
+                logger.exception("Не удалось сохранить %d callback_data", len(batch))
+                # Повтор при следующей записи; тела остаются доступны из _pending
+                for payload_id, stored in batch.items():
+                    self._pending.setdefault(payload_id, stored)
+                return
+
+    @staticmethod
+    def _rows(batch):
+        return [(payload_id, body, issued_ts) for payload_id, (body, issued_ts) in batch.items()]
+
+    def _prune_due(self):
+        now = time.time()
+        if now - self._pruned_at < DatabaseConfig.CALLBACK_PAYLOAD_PRUNE_INTERVAL:
+            return False
+        self._pruned_at = now
+        return True
+
+    def _prune_before(self):
+        return int(time.time() - self.ttl)
+
+    async def flush(self):
+        """Запись всех ожидающих payload (вызывается при остановке бота)"""
+        if self._write_task:
+            await self._write_task
+        if self._pending:
+            await self._write_pending()
+
+    def decode(self, data):
+        """
+        Разбор callback_data за один проход
+        :return: Кортеж (action, список аргументов int/str)
+        :raises CallbackDecodeError: Данные не в формате кодека
+        """
+        try:
+            raw = base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+        except (binascii.Error, ValueError):
+            raise CallbackDecodeError(f"Не base64: {data!r}") from None
+        if not raw or raw[0] >> 4 != VERSION:
+            raise CallbackDecodeError(f"Неизвестная версия: {data!r}")
+
+        kind = raw[0] & 0x0F
+        if kind == KIND_INLINE:
+            return self.unpack(raw, 1)
+        if kind == KIND_STORED:
+            payload_id, _ = _read_varint(raw, 1)
+            body = self._stored_payloads.get(payload_id)
+            if body is MISSING and payload_id in self._pending:
+                body = self._pending[payload_id][0]
+            if body is MISSING:
+                body = self.store.load_callback_payload(payload_id)
+                if body is None:
+                    raise CallbackDecodeError(f"Нет сохраненных данных с id {payload_id}")
+                self._stored_payloads.set(payload_id, body)
+            return self.unpack(body, 0)
+        raise CallbackDecodeError(f"Неизвестный вид данных: {kind}")
+
+    @staticmethod
+    def pack(action, *args):
+        """Тело: опкод и типизированные аргументы"""
+        try:
+            code = ACTION_CODES[action]
+        except KeyError:
+            raise ValueError(f"Действие {action!r} отсутствует в таблице опкодов") from None
+
+        buffer = bytearray()
+        _write_varint(buffer, code)
+        for arg in args:
+            if isinstance(arg, int):
+                # zigzag: отрицательные числа тоже занимают мало байт
+                _write_varint(buffer, ((arg << 1) ^ (arg >> 63)) << 1)
+            elif isinstance(arg, str):
+                encoded = arg.encode("utf-8")
+                _write_varint(buffer, len(encoded) << 1 | 1)
+                buffer += encoded
+            else:
+                raise TypeError(f"Неподдерживаемый тип аргумента: {type(arg).__name__}")
+        return bytes(buffer)
+
+    @staticmethod
+    def unpack(payload, position):
+        """Разбор тела, начиная с позиции position"""
+        code, position = _read_varint(payload, position)
+        if code >= len(ACTIONS):
+            raise CallbackDecodeError(f"Неизвестный опкод: {code}")
+
+        args = []
+        end = len(payload)
+        while position < end:
+            value, position = _read_varint(payload, position)
+            if value & 1:
+                length = value >> 1
+                if position + length > end:
+                    raise CallbackDecodeError("Обрезанная строка")
+                args.append(payload[position:position + length].decode("utf-8", "replace"))
+                position += length
+            else:
+                zigzag = value >> 1
+                args.append((zigzag >> 1) ^ -(zigzag & 1))
+        return ACTIONS[code], args
+
+    @staticmethod
+    def _b64encode(raw):
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+# Общий кодек; main.py подключает к нему хранилище в БД (db и adb)
+codec = CallbackCodec()
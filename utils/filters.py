@@ -3,9 +3,54 @@
 Модуль для фильтрации задач по различным параметрам
 """
 
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from config import TaskStatuses, CalendarConfig
 
+# Формат CURRENT_TIMESTAMP в SQLite (время в UTC)
+SQLITE_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Период списка -> (колонка бакета, позиция в кортеже time_buckets)
+PERIOD_BUCKETS = {
+    "today": ("day_bucket", 0),
+    "week": ("week_bucket", 1),
+    "month": ("month_bucket", 2),
+}
+
+def time_buckets(timestamp):
+    """
+    Предвычисленные бакеты даты для колонок day/week/month_bucket
+    :param timestamp: Время создания (секунды epoch)
+    :return: Кортеж (day_bucket, week_bucket, month_bucket) по локальной дате:
+        порядковый номер дня, номер понедельника недели и год * 12 + месяц - 1
+    """
+    day = datetime.fromtimestamp(timestamp).date()
+    day_bucket = day.toordinal()
+    return day_bucket, day_bucket - day.weekday(), day.year * 12 + day.month - 1
+
+def sqlite_timestamp_to_epoch(value):
+    """Перевод CURRENT_TIMESTAMP из SQLite (UTC) в секунды epoch"""
+    parsed = datetime.strptime(value, SQLITE_TIMESTAMP_FORMAT)
+    return int(parsed.replace(tzinfo=timezone.utc).timestamp())
+
+def format_timestamp(timestamp, date_format=CalendarConfig.DATE_FORMAT):
+    """Форматирование времени создания для отображения"""
+    return datetime.fromtimestamp(timestamp).strftime(date_format)
+
+def to_fts_query(text):
+    """
+    Перевод пользовательского запроса в выражение FTS5 MATCH.
+    Каждое слово берется в кавычки (операторы FTS5 не интерпретируются),
+    последнее ищется по префиксу
+    :param text: Текст запроса
+    :return: Выражение MATCH или None для пустого запроса
+    """
+    words = [word.replace('"', '""') for word in text.split()]
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
 class TaskFilter:
     """Класс для фильтрации списка задач"""
 
@@ -29,30 +74,13 @@ class TaskFilter:
         :param period: Период для фильтрации (сегодня/неделя/месяц/все)
         :return: Отфильтрованный список задач
         """
-        if period == 'all':
+        bounds = TaskFilter.get_period_bounds(period)
+        if not bounds:
             return tasks
 
-        now = datetime.now()
-        date_format = CalendarConfig.DATE_FORMAT
-
-        if period == 'today':
-            today_str = now.strftime(date_format)
-            return [task for task in tasks 
-                   if datetime.strptime(task[4], date_format).date() == now.date()]
-
-        elif period == 'week':
-            week_start = now - timedelta(days=now.weekday())
-            week_end = week_start + timedelta(days=6)
-            return [task for task in tasks 
-                   if week_start.date() <= datetime.strptime(task[4], date_format).date() <= week_end.date()]
-
-        elif period == 'month':
-            month_start = datetime(now.year, now.month, 1)
-            month_end = datetime(now.year, now.month + 1, 1) - timedelta(days=1)
-            return [task for task in tasks 
-                   if month_start.date() <= datetime.strptime(task[4], date_format).date() <= month_end.date()]
-
-        return tasks
+        start, end = (day.toordinal() for day in bounds)
+        return [task for task in tasks 
+               if start <= time_buckets(task[4])[0] < end]
 
     @staticmethod
     def filter_by_custom_date(tasks, start_date, end_date):
@@ -63,16 +91,14 @@ class TaskFilter:
         :param end_date: Конечная дата (str в формате CalendarConfig.DATE_FORMAT)
         :return: Отфильтрованный список задач
         """
-        date_format = CalendarConfig.DATE_FORMAT
-        try:
-            start = datetime.strptime(start_date, date_format).date()
-            end = datetime.strptime(end_date, date_format).date()
-            
-            return [task for task in tasks 
-                   if start <= datetime.strptime(task[4], date_format).date() <= end]
-        except ValueError:
+        bounds = TaskFilter.get_custom_bounds(start_date, end_date)
+        if not bounds:
             return tasks
 
+        start, end = (day.toordinal() for day in bounds)
+        return [task for task in tasks 
+               if start <= time_buckets(task[4])[0] < end]
+
     @staticmethod
     def filter_by_author(tasks, username):
         """
@@ -111,4 +137,116 @@ class TaskFilter:
         if author_filter:
             filtered_tasks = TaskFilter.filter_by_author(filtered_tasks, author_filter)
             
-        return filtered_tasks
\ No newline at end of file
+        return filtered_tasks
+
+    @staticmethod
+    def get_period_bounds(period):
+        """
+        Границы периода в виде полуинтервала дат [start, end)
+        :param period: Период (today/week/month)
+        :return: Кортеж (start, end) или None для неизвестного периода
+        """
+        today = datetime.now().date()
+
+        if period == 'today':
+            return today, today + timedelta(days=1)
+        elif period == 'week':
+            start = today - timedelta(days=today.weekday())
+            return start, start + timedelta(days=7)
+        elif period == 'month':
+            start = today.replace(day=1)
+            end = (start + timedelta(days=32)).replace(day=1)
+            return start, end
+        return None
+
+    @staticmethod
+    def get_custom_bounds(start_date, end_date):
+        """
+        Границы произвольного периода в виде полуинтервала дат [start, end)
+        :param start_date: Начальная дата (str в формате CalendarConfig.DATE_FORMAT)
+        :param end_date: Конечная дата (str в формате CalendarConfig.DATE_FORMAT)
+        :return: Кортеж (start, end) или None при неверном формате
+        """
+        date_format = CalendarConfig.DATE_FORMAT
+        try:
+            start = datetime.strptime(start_date, date_format).date()
+            end = datetime.strptime(end_date, date_format).date()
+        except ValueError:
+            return None
+        return start, end + timedelta(days=1)
+
+    @staticmethod
+    def build_where(status_filter=None, period_filter=None,
+                    author_filter=None, custom_dates=None):
+        """
+        Компиляция фильтров в параметризованное условие WHERE для tasks
+        :return: Кортеж (список условий, параметры)
+        """
+        conditions = []
+        params = []
+
+        if status_filter and status_filter.lower() != 'all':
+            conditions.append("status = ?")
+            params.append(TaskStatuses.KEYS.get(status_filter, status_filter))
+
+        if author_filter:
+            conditions.append("created_by = ?")
+            params.append(author_filter)
+
+        # Сегодня/неделя/месяц - одно значение бакета текущей даты: индекс
+        # (бакет, created_ts) отдает строки уже в порядке ORDER BY
+        if period_filter in PERIOD_BUCKETS:
+            column, position = PERIOD_BUCKETS[period_filter]
+            conditions.append(f"{column} = ?")
+            params.append(time_buckets(datetime.now().timestamp())[position])
+
+        # Произвольный период - диапазон по индексированному day_bucket
+        if custom_dates:
+            custom_bounds = TaskFilter.get_custom_bounds(*custom_dates)
+            if custom_bounds:
+                start, end = custom_bounds
+                conditions.append("day_bucket >= ? AND day_bucket < ?")
+                params.append(start.toordinal())
+                params.append(end.toordinal())
+
+        return conditions, params
+
+    @staticmethod
+    def build_query(status_filter=None, period_filter=None,
+                    author_filter=None, custom_dates=None, limit=None,
+                    after=None, before=None):
+        """
+        Компиляция фильтров в один параметризованный SQL-запрос к tasks.
+        Принимает те же аргументы, что и apply_filters, но фильтрация
+        выполняется в SQLite по индексированным колонкам.
+        :param status_filter: Фильтр по статусу (значение или ключ из TaskStatuses.KEYS)
+        :param period_filter: Фильтр по периоду (сегодня/неделя/месяц)
+        :param author_filter: Фильтр по автору
+        :param custom_dates: Кортеж (start_date, end_date) для произвольного периода
+        :param limit: Максимальное количество задач
+        :param after: Курсор (created_ts, id) - задачи старше курсора
+        :param before: Курсор (created_ts, id) - задачи новее курсора
+            (возвращаются в порядке возрастания)
+        :return: Кортеж (WHERE/ORDER BY/LIMIT часть запроса, параметры)
+        """
+        conditions, params = TaskFilter.build_where(
+            status_filter, period_filter, author_filter, custom_dates)
+
+        # Keyset-пагинация по (created_ts, id)
+        if after:
+            conditions.append("(created_ts, id) < (?, ?)")
+            params.extend(after)
+        if before:
+            conditions.append("(created_ts, id) > (?, ?)")
+            params.extend(before)
+
+        clause = ""
+        if conditions:
+            clause = " WHERE " + " AND ".join(conditions)
+        order = "ASC" if before else "DESC"
+        clause += f" ORDER BY created_ts {order}, id {order}"
+        if limit:
+            clause += " LIMIT ?"
+            params.append(limit)
+
+        return clause, params
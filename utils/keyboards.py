@@ -1,10 +1,26 @@
 # -*- coding: utf-8 -*-
 """
 Модуль для генерации клавиатур и кнопок
+Клавиатуры, не зависящие от конкретной задачи или пользователя, строятся
+один раз и переиспользуются: объекты telegram неизменяемы после создания,
+поэтому одну разметку можно безопасно отдавать во все обработчики.
 """
 
+from functools import lru_cache
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
 from config import BotConfig, Roles, TaskStatuses
+from utils.router import build_callback
+
+# Кнопка "Назад" общая для всех клавиатур
+BACK_BUTTON = InlineKeyboardButton("🔙 Назад", callback_data=build_callback("back"))
+BACK_ROW = (BACK_BUTTON,)
+
+# Кнопка смены статуса в карточке задачи: статус -> (текст, действие)
+TASK_STATUS_ACTIONS = {
+    TaskStatuses.NEW: ("🛠 Взять в работу", "take"),
+    TaskStatuses.IN_PROGRESS: ("✅ Завершить", "complete"),
+    TaskStatuses.DONE: ("🔄 Вернуть в работу", "reopen"),
+}
 
 class Keyboards:
     """Класс для генерации всех клавиатур бота"""
@@ -16,8 +32,12 @@ class Keyboards:
         :param username: Telegram username пользователя
         :return: ReplyKeyboardMarkup
         """
-        is_admin = username == BotConfig.ADMIN_USERNAME
+        return Keyboards._build_main_menu(username == BotConfig.ADMIN_USERNAME)
 
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _build_main_menu(is_admin):
+        """Построение главного меню (одно на роль)"""
         if is_admin:
             keyboard = [
                 ["➕ Создать задачу", "📋 Все задачи"],
@@ -31,7 +51,7 @@ class Keyboards:
         return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
 
     @staticmethod
-    def get_task_keyboard(task_status, current_user, task_id=None):
+    def get_task_keyboard(task_status, current_user, task_id):
         """
         Клавиатура для управления задачей (InlineKeyboardMarkup)
         :param task_status: Текущий статус задачи
@@ -39,46 +59,38 @@ class Keyboards:
         :param task_id: ID задачи (для callback_data)
         :return: InlineKeyboardMarkup
         """
-        buttons = []
-        callback_prefix = f"task_{task_id}_" if task_id else ""
+        rows = Keyboards._task_keyboard_rows(
+            task_status, current_user == BotConfig.ADMIN_USERNAME)
 
-        # Кнопки для всех пользователей
-        buttons.append([
-            InlineKeyboardButton(
-                "✏️ Комментировать",
-                callback_data=f"{callback_prefix}comment")
-        ])
+        buttons = [
+            [InlineKeyboardButton(text, callback_data=build_callback(action, task_id, *args))]
+            for text, action, args in rows
+        ]
+        buttons.append(BACK_ROW)
 
-        # Кнопки только для админа
-        if current_user == BotConfig.ADMIN_USERNAME:
-            if task_status == TaskStatuses.NEW:
-                buttons.append([
-                    InlineKeyboardButton(
-                        "🛠 Взять в работу",
-                        callback_data=f"{callback_prefix}take")
-                ])
-            elif task_status == TaskStatuses.IN_PROGRESS:
-                buttons.append([
-                    InlineKeyboardButton(
-                        "✅ Завершить",
-                        callback_data=f"{callback_prefix}complete")
-                ])
-            elif task_status == TaskStatuses.DONE:
-                buttons.append([
-                    InlineKeyboardButton(
-                        "🔄 Вернуть в работу",
-                        callback_data=f"{callback_prefix}reopen")
-                ])
+        return InlineKeyboardMarkup(buttons)
 
-            buttons.append([
-                InlineKeyboardButton(
-                    "🗑 Удалить",
-                    callback_data=f"{callback_prefix}delete")
-            ])
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _task_keyboard_rows(task_status, is_admin):
+        """
+        Готовые ряды карточки задачи для пары (статус, is_admin)
+        :return: Кортеж (текст кнопки, действие, аргументы после ID задачи)
+        """
+        # Кнопки для всех пользователей
+        rows = [
+            ("✏️ Комментировать", "comment", ()),
+            ("💬 Комментарии", "comments", ()),
+        ]
 
-        buttons.append([Keyboards.get_back_button()])
+        # Кнопки только для админа
+        if is_admin:
+            if task_status in TASK_STATUS_ACTIONS:
+                text, action = TASK_STATUS_ACTIONS[task_status]
+                rows.append((text, "status", (action,)))
+            rows.append(("🗑 Удалить", "delete", ()))
 
-        return InlineKeyboardMarkup(buttons)
+        return tuple(rows)
 
     @staticmethod
     def get_filters_keyboard(filter_type="status"):
@@ -87,31 +99,38 @@ class Keyboards:
         :param filter_type: Тип фильтра (status/period)
         :return: InlineKeyboardMarkup
         """
+        return Keyboards._build_filters_keyboard(
+            "status" if filter_type == "status" else "period")
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _build_filters_keyboard(filter_type):
+        """Построение клавиатуры фильтров (одна на тип)"""
         if filter_type == "status":
             buttons = [
                 [
-                    InlineKeyboardButton("🔘 Все", callback_data="filter_status_all"),
-                    InlineKeyboardButton("⚪️ Новые", callback_data="filter_status_new"),
-                    InlineKeyboardButton("⚪️ В работе", callback_data="filter_status_in_progress"),
-                    InlineKeyboardButton("⚪️ Завершённые", callback_data="filter_status_done")
+                    InlineKeyboardButton("🔘 Все", callback_data=build_callback("filter", "status", "all")),
+                    InlineKeyboardButton("⚪️ Новые", callback_data=build_callback("filter", "status", "new")),
+                    InlineKeyboardButton("⚪️ В работе", callback_data=build_callback("filter", "status", "in_progress")),
+                    InlineKeyboardButton("⚪️ Завершённые", callback_data=build_callback("filter", "status", "done"))
                 ]
             ]
         else:  # period
             buttons = [
                 [
-                    InlineKeyboardButton("📅 Сегодня", callback_data="filter_period_today"),
-                    InlineKeyboardButton("📅 Неделя", callback_data="filter_period_week"),
-                    InlineKeyboardButton("📅 Месяц", callback_data="filter_period_month"),
-                    InlineKeyboardButton("📅 Все", callback_data="filter_period_all")
+                    InlineKeyboardButton("📅 Сегодня", callback_data=build_callback("filter", "period", "today")),
+                    InlineKeyboardButton("📅 Неделя", callback_data=build_callback("filter", "period", "week")),
+                    InlineKeyboardButton("📅 Месяц", callback_data=build_callback("filter", "period", "month")),
+                    InlineKeyboardButton("📅 Все", callback_data=build_callback("filter", "period", "all"))
                 ],
                 [
                     InlineKeyboardButton(
                         "📅 Произвольный период", 
-                        callback_data="filter_custom_period")
+                        callback_data=build_callback("filter", "custom"))
                 ]
             ]
 
-        buttons.append([Keyboards.get_back_button()])
+        buttons.append(BACK_ROW)
         return InlineKeyboardMarkup(buttons)
 
     @staticmethod
@@ -130,7 +149,7 @@ class Keyboards:
             buttons.append([
                 InlineKeyboardButton(
                     f"{role_icon} @{user[1]}",
-                    callback_data=f"user_detail_{user[1]}")
+                    callback_data=build_callback("user_detail", user[1]))
             ])
 
         buttons.append([Keyboards.get_back_button()])
@@ -150,19 +169,19 @@ class Keyboards:
             buttons.append([
                 InlineKeyboardButton(
                     "👔 Назначить руководителем",
-                    callback_data=f"promote_{username}")
+                    callback_data=build_callback("promote", username))
             ])
         else:
             buttons.append([
                 InlineKeyboardButton(
                     "👤 Понизить до пользователя",
-                    callback_data=f"demote_{username}")
+                    callback_data=build_callback("demote", username))
             ])
 
         buttons.append([
             InlineKeyboardButton(
                 "🗑 Удалить пользователя",
-                callback_data=f"delete_user_{username}")
+                callback_data=build_callback("delete_user", username))
         ])
 
         buttons.append([Keyboards.get_back_button()])
@@ -171,9 +190,10 @@ class Keyboards:
     @staticmethod
     def get_back_button():
         """Кнопка 'Назад' для всех клавиатур"""
-        return InlineKeyboardButton("🔙 Назад", callback_data="back")
+        return BACK_BUTTON
 
     @staticmethod
+    @lru_cache(maxsize=256)
     def get_confirmation_keyboard(action):
         """
         Клавиатура подтверждения действия
@@ -182,7 +202,16 @@ class Keyboards:
         """
         return InlineKeyboardMarkup([
             [
-                InlineKeyboardButton("✅ Подтвердить", callback_data=f"confirm_{action}"),
-                InlineKeyboardButton("❌ Отменить", callback_data="cancel_action")
+                InlineKeyboardButton("✅ Подтвердить", callback_data=build_callback("confirm", action)),
+                InlineKeyboardButton("❌ Отменить", callback_data=build_callback("cancel_action"))
             ]
-        ])
\ No newline at end of file
+        ])
+
+# Функции уровня модуля для импорта в обработчиках
+get_main_menu_keyboard = Keyboards.get_main_menu_keyboard
+get_task_keyboard = Keyboards.get_task_keyboard
+get_filters_keyboard = Keyboards.get_filters_keyboard
+get_user_management_keyboard = Keyboards.get_user_management_keyboard
+get_user_actions_keyboard = Keyboards.get_user_actions_keyboard
+get_back_button = Keyboards.get_back_button
+get_confirmation_keyboard = Keyboards.get_confirmation_keyboard
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Модуль отслеживания состояния отправленных сообщений
+Для каждого сообщения (chat_id, message_id) хранятся хэши последнего
+отображенного текста и клавиатуры. Редактирование, не меняющее ни того,
+ни другого, не отправляется в Telegram (иначе - лишний запрос и ошибка
+"message is not modified"). Правки одного сообщения, накопившиеся, пока
+выполняется предыдущая (например, ожидание токена в SendScheduler),
+сливаются: отправляется только последняя.
+Подключается как rate limiter PTB поверх SendScheduler.
+"""
+
+import asyncio
+import json
+import logging
+
+from telegram.error import BadRequest
+from telegram.ext import BaseRateLimiter
+
+from config import CacheConfig
+from utils.cache import LRUCache, MISSING
+
+# Настройка логгирования
+logger = logging.getLogger(__name__)
+
+# Поля, определяющие отображение текста сообщения
+TEXT_FIELDS = ("text", "parse_mode", "entities", "link_preview_options")
+
+# Методы, результат которых - новое сообщение с известным содержимым
+SEND_METHODS = {"sendMessage"}
+EDIT_TEXT = "editMessageText"
+EDIT_MARKUP = "editMessageReplyMarkup"
+
+def _to_plain(value):
+    """Объекты Telegram (клавиатуры, entities) для json.dumps"""
+    to_dict = getattr(value, "to_dict", None)
+    return to_dict() if to_dict else str(value)
+
+def _digest(*values):
+    return hash(json.dumps(values, default=_to_plain, sort_keys=True, ensure_ascii=False))
+
+def text_digest(data):
+    """Хэш текста сообщения из параметров запроса"""
+    return _digest(*(data.get(field) for field in TEXT_FIELDS))
+
+def markup_digest(data):
+    """Хэш клавиатуры (None - клавиатуры нет)"""
+    return _digest(data.get("reply_markup"))
+
+class _MessageSlot:
+    """Состояние одного сообщения и очередь его правок"""
+
+    def __init__(self):
+        self.text = None
+        self.markup = None
+        # Последний ответ Telegram с этим сообщением
+        self.result = True
+        self.lock = asyncio.Lock()
+        # Последняя правка в очереди: к ней присоединяются следующие
+        self.pending = None
+
+class _PendingEdit:
+    """Последняя версия правки и все, кто ее ждет"""
+
+    def __init__(self, request):
+        self.request = request
+        self.futures = []
+
+    @property
+    def endpoint(self):
+        return self.request[3]
+
+    def absorbs(self, endpoint):
+        """
+        Можно ли заменить правку новой: правка того же вида или текста
+        (editMessageText задает и текст, и клавиатуру)
+        """
+        return endpoint == self.endpoint or endpoint == EDIT_TEXT
+
+class MessageStateTracker(BaseRateLimiter):
+    """
+    Подавление пустых правок и слияние частых правок одного сообщения.
+    Остальные запросы без изменений передаются во вложенный limiter
+    """
+
+    def __init__(self, limiter, size=CacheConfig.MESSAGE_STATE_CACHE_SIZE):
+        """
+        :param limiter: Вложенный BaseRateLimiter (SendScheduler)
+        :param size: Количество отслеживаемых сообщений
+        """
+        self.limiter = limiter
+        self._slots = LRUCache(size)
+        # Правки, не отправленные благодаря совпадению содержимого
+        self.suppressed = 0
+        # Правки, замененные более поздней правкой того же сообщения
+        self.coalesced = 0
+        # Ответы "message is not modified" (состояние не было известно)
+        self.not_modified = 0
+        self.edits = 0
+
+    async def initialize(self):
+        await self.limiter.initialize()
+
+    async def shutdown(self):
+        await self.limiter.shutdown()
+
+    @staticmethod
+    def _key(data):
+        chat_id = data.get("chat_id")
+        message_id = data.get("message_id")
+        if chat_id is None or message_id is None:
+            return None
+        return str(chat_id), int(message_id)
+
+    def _slot(self, key):
+        slot = self._slots.get(key)
+        if slot is MISSING:
+            slot = _MessageSlot()
+            self._slots.set(key, slot)
+        return slot
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        """Передача запроса во вложенный limiter с учетом состояния сообщения"""
+        request = (callback, args, kwargs, endpoint, data, rate_limit_args)
+        key = self._key(data) if endpoint in (EDIT_TEXT, EDIT_MARKUP) else None
+        if key is None:
+            result = await self.limiter.process_request(*request)
+            self._observe(endpoint, data, result)
+            return result
+
+        self.edits += 1
+        slot = self._slot(key)
+        pending = slot.pending
+        if pending is not None and pending.absorbs(endpoint):
+            # Правка еще ждет очереди: отправится только новая версия
+            self.coalesced += 1
+            pending.request = request
+            future = asyncio.get_running_loop().create_future()
+            pending.futures.append(future)
+            return await future
+
+        pending = _PendingEdit(request)
+        slot.pending = pending
+        async with slot.lock:
+            if slot.pending is pending:
+                slot.pending = None
+            try:
+                result = await self._edit(slot, pending.request)
+            except Exception as error:
+                for future in pending.futures:
+                    future.set_exception(error)
+                raise
+            for future in pending.futures:
+                future.set_result(result)
+            return result
+
+    async def _edit(self, slot, request):
+        """Отправка правки, если она меняет сообщение"""
+        endpoint, data = request[3], request[4]
+        text = text_digest(data) if endpoint == EDIT_TEXT else slot.text
+        markup = markup_digest(data)
+        # None - содержимое неизвестно и совпадением не считается;
+        # для editMessageReplyMarkup сравнивается только клавиатура
+        if markup == slot.markup is not None and (endpoint == EDIT_MARKUP or text == slot.text):
+            self.suppressed += 1
+            return slot.result
+
+        try:
+            result = await self.limiter.process_request(*request)
+        except BadRequest as error:
+            if "not modified" not in error.message.lower():
+                # Содержимое сообщения неизвестно
+                slot.text = slot.markup = None
+                raise
+            self.not_modified += 1
+            result = slot.result
+        slot.text, slot.markup = text, markup
+        if isinstance(result, dict):
+            slot.result = result
+        return result
+
+    def _observe(self, endpoint, data, result):
+        """Запоминание содержимого отправленных и удаление удаленных сообщений"""
+        if endpoint in SEND_METHODS and isinstance(result, dict):
+            slot = self._slot((str(result["chat"]["id"]), result["message_id"]))
+            slot.text = text_digest(data)
+            slot.markup = markup_digest(data)
+            slot.result = result
+        elif endpoint == "deleteMessage":
+            key = self._key(data)
+            if key is not None:
+                self._slots.invalidate(key)
+
+    @property
+    def saved_calls(self):
+        """Запросы к Bot API, которые не понадобились"""
+        return self.suppressed + self.coalesced
+
+    def get_stats(self):
+        """Счетчики правок и сэкономленных запросов"""
+        return {
+            "edits": self.edits,
+            "suppressed": self.suppressed,
+            "coalesced": self.coalesced,
+            "not_modified": self.not_modified,
+            "saved_calls": self.saved_calls,
+            "tracked_messages": self._slots.get_stats()["size"],
+        }
@@ -5,6 +5,7 @@
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from config import Pagination as PaginationConfig
+from utils.router import build_callback
 
 class Paginator:
     """Класс для управления пагинацией списка задач"""
@@ -13,13 +14,18 @@ class Paginator:
         self.items_per_page = PaginationConfig.TASKS_PER_PAGE
         self.max_buttons = PaginationConfig.MAX_PAGE_BUTTONS
 
-    async def show_page(self, message, tasks, page=1, filters=None):
+    async def show_page(self, message, tasks, page=1, filters=None,
+                        page_action="page", title=None, edit=True):
         """
         Отображение страницы с задачами
         :param message: Объект сообщения Telegram
         :param tasks: Полный список задач
         :param page: Номер текущей страницы
         :param filters: Примененные фильтры (для callback_data)
+        :param page_action: Действие кнопок навигации
+            (например, search_page для результатов поиска)
+        :param title: Заголовок над номером страницы
+        :param edit: Редактировать сообщение вместо отправки нового
         :return: None
         """
         total_pages = (len(tasks) + self.items_per_page - 1) // self.items_per_page
@@ -31,15 +37,95 @@ class Paginator:
 
         # Формируем текст сообщения
         text = self._generate_page_text(page, total_pages, filters)
+        if title:
+            text = f"{title}\n{text}"
         
         # Формируем клавиатуру с задачами и пагинацией
-        keyboard = self._generate_page_keyboard(page_tasks, page, total_pages, filters)
+        keyboard = self._generate_page_keyboard(
+            page_tasks, page, total_pages, filters, page_action=page_action
+        )
 
-        if hasattr(message, 'edit_text'):
+        if edit:
             await message.edit_text(text, reply_markup=keyboard)
         else:
             await message.reply_text(text, reply_markup=keyboard)
 
+    async def show_cursor_page(self, message, load_page, total, page=1,
+                               cursor=None, filters=None, edit=True,
+                               selection=None, selectable=False):
+        """
+        Отображение страницы в keyset-режиме: из БД читается только
+        TASKS_PER_PAGE + 1 строк после (или до) курсора
+        :param message: Объект сообщения Telegram
+        :param load_page: Корутина load_page(after=..., before=..., limit=...)
+        :param total: Общее количество задач (из кэшированного счетчика)
+        :param page: Номер текущей страницы
+        :param cursor: Кортеж (направление 'a'/'b', (created_ts, id)) или None
+        :param filters: Примененные фильтры (для callback_data)
+        :param edit: Редактировать сообщение вместо отправки нового
+        :param selection: Множество id отмеченных задач в режиме выбора
+            (None - обычный режим)
+        :param selectable: Показать кнопку перехода в режим выбора
+        :return: None
+        """
+        total_pages = max(1, (total + self.items_per_page - 1) // self.items_per_page)
+        page = max(1, min(page, total_pages))
+        limit = self.items_per_page + 1
+
+        direction, position = cursor if cursor else ("a", None)
+        if direction == "b":
+            rows = await load_page(before=position, limit=limit)
+            # Лишняя строка при движении назад находится в начале
+            page_tasks = rows[-self.items_per_page:]
+            has_next = True
+        else:
+            rows = await load_page(after=position, limit=limit)
+            page_tasks = rows[:self.items_per_page]
+            has_next = len(rows) > self.items_per_page
+        has_prev = page > 1 and bool(page_tasks)
+
+        text = self._generate_page_text(page, total_pages, filters)
+        if selection is not None:
+            text += f"\nВыбрано задач: {len(selection)}"
+        keyboard = self._generate_page_keyboard(
+            page_tasks, page, total_pages, filters,
+            keyset=True,
+            prev_cursor=self._encode_cursor("b", page_tasks[0]) if has_prev else None,
+            next_cursor=self._encode_cursor("a", page_tasks[-1]) if has_next and page_tasks else None,
+            selection=selection, selectable=selectable,
+        )
+
+        if edit:
+            await message.edit_text(text, reply_markup=keyboard)
+        else:
+            await message.reply_text(text, reply_markup=keyboard)
+
+    @staticmethod
+    def _encode_cursor(direction, task):
+        """Курсор для callback_data по строке задачи (id, ..., created_ts)"""
+        return direction, task[4], task[0]
+
+    @staticmethod
+    def parse_page_callback(args):
+        """
+        Разбор аргументов кнопки пагинации:
+        page:<N>:<статус>:<период>[:<a|b>:<created_ts>:<id>]
+        :param args: Аргументы callback_data (context.args)
+        :return: Кортеж (page, cursor, filters)
+        """
+        page, status, period, *cursor_args = args
+
+        cursor = None
+        if cursor_args:
+            direction, created_ts, task_id = cursor_args
+            cursor = (direction, (int(created_ts), int(task_id)))
+
+        filters = {
+            key: value
+            for key, value in (("status", status), ("period", period)) if value
+        }
+        return int(page), cursor, filters
+
     def _generate_page_text(self, page, total_pages, filters):
         """Генерация текста для страницы"""
         text = f"Страница {page}/{total_pages}\n"
@@ -56,68 +142,109 @@ class Paginator:
         text += "───────────────────"
         return text
 
-    def _generate_page_keyboard(self, tasks, current_page, total_pages, filters):
-        """Генерация клавиатуры для страницы"""
+    def _generate_page_keyboard(self, tasks, current_page, total_pages, filters,
+                                keyset=False, prev_cursor=None, next_cursor=None,
+                                page_action="page", selection=None, selectable=False):
+        """
+        Генерация клавиатуры для страницы
+        В keyset-режиме кнопки навигации несут курсор prev_cursor/next_cursor.
+        В режиме выбора (selection не None) кнопки задач отмечают задачу,
+        а вместо создания и фильтров показываются групповые действия
+        """
         keyboard = []
         
         # Кнопки задач
         for task in tasks:
-            keyboard.append([
-                InlineKeyboardButton(
-                    f"#{task[0]} {task[1][:30]}... ({task[2]})",
-                    callback_data=f"task_{task[0]}")
-            ])
+            # Количество комментариев (если строка содержит comment_count)
+            activity = f" 💬{task[5]}" if len(task) > 5 and task[5] else ""
+            label = f"#{task[0]} {task[1][:30]}... ({task[2]}){activity}"
+            if selection is None:
+                callback_data = build_callback("task", task[0])
+            else:
+                label = ("☑️ " if task[0] in selection else "⬜ ") + label
+                callback_data = build_callback("select", task[0])
+            keyboard.append([InlineKeyboardButton(label, callback_data=callback_data)])
         
         # Кнопки пагинации
         pagination_buttons = []
-        filter_prefix = self._get_filter_prefix(filters)
         
         # Кнопка "Назад"
-        if current_page > 1:
+        if prev_cursor:
+            pagination_buttons.append(
+                InlineKeyboardButton(
+                    "⬅️",
+                    callback_data=self._page_callback(
+                        page_action, current_page - 1, filters, prev_cursor))
+            )
+        elif current_page > 1 and not keyset:
             pagination_buttons.append(
                 InlineKeyboardButton(
                     "⬅️", 
-                    callback_data=f"{filter_prefix}page_{current_page - 1}")
+                    callback_data=self._page_callback(page_action, current_page - 1, filters))
             )
         
         # Номер текущей страницы
         pagination_buttons.append(
             InlineKeyboardButton(
                 f"{current_page}/{total_pages}", 
-                callback_data="ignore")
+                callback_data=build_callback("ignore"))
         )
         
         # Кнопка "Вперед"
-        if current_page < total_pages:
+        if next_cursor:
+            pagination_buttons.append(
+                InlineKeyboardButton(
+                    "➡️",
+                    callback_data=self._page_callback(
+                        page_action, current_page + 1, filters, next_cursor))
+            )
+        elif current_page < total_pages and not keyset:
             pagination_buttons.append(
                 InlineKeyboardButton(
                     "➡️", 
-                    callback_data=f"{filter_prefix}page_{current_page + 1}")
+                    callback_data=self._page_callback(page_action, current_page + 1, filters))
             )
         
         keyboard.append(pagination_buttons)
         
+        if selection is not None:
+            keyboard.extend(self._bulk_action_rows())
+            return InlineKeyboardMarkup(keyboard)
+        
         # Дополнительные кнопки
         additional_buttons = []
         additional_buttons.append(
-            InlineKeyboardButton("➕ Создать задачу", callback_data="create_task")
+            InlineKeyboardButton("➕ Создать задачу", callback_data=build_callback("create_task"))
         )
         additional_buttons.append(
-            InlineKeyboardButton("🔍 Фильтры", callback_data="filter_status")
+            InlineKeyboardButton("🔍 Фильтры", callback_data=build_callback("filter", "status"))
         )
         keyboard.append(additional_buttons)
+        if selectable:
+            keyboard.append([
+                InlineKeyboardButton("☑️ Выбрать несколько", callback_data=build_callback("select"))
+            ])
         
         return InlineKeyboardMarkup(keyboard)
 
-    def _get_filter_prefix(self, filters):
-        """Генерация префикса для callback_data с учетом фильтров"""
-        if not filters:
-            return ""
-        
-        prefix = []
-        if filters.get('status'):
-            prefix.append(f"status_{filters['status']}")
-        if filters.get('period'):
-            prefix.append(f"period_{filters['period']}")
-        
-        return "_".join(prefix) + "_" if prefix else ""
\ No newline at end of file
+    @staticmethod
+    def _bulk_action_rows():
+        """Кнопки групповых действий над отмеченными задачами"""
+        return [
+            [
+                InlineKeyboardButton("🔄 В работу", callback_data=build_callback("bulk", "take")),
+                InlineKeyboardButton("✅ Выполнены", callback_data=build_callback("bulk", "complete")),
+            ],
+            [
+                InlineKeyboardButton("🗑 Удалить", callback_data=build_callback("bulk", "delete")),
+                InlineKeyboardButton("✖️ Отмена", callback_data=build_callback("bulk", "cancel")),
+            ],
+        ]
+
+    @staticmethod
+    def _page_callback(page_action, page, filters, cursor=()):
+        """callback_data кнопки перехода на страницу с фильтрами и курсором"""
+        filters = filters or {}
+        return build_callback(
+            page_action, page, filters.get("status", ""), filters.get("period", ""), *cursor
+        )
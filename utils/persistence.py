@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Модуль сохранения состояния диалогов в БД
+SQLitePersistence хранит context.user_data (awaiting_task, current_task,
+фильтры списка и т.д.) в таблице persistent_data основной БД, поэтому
+незавершенный ввод переживает перезапуск бота.
+
+В отличие от PicklePersistence, которая перезаписывает весь файл:
+  - данные пользователя читаются из БД при первом обновлении от него
+    (refresh_user_data), а не все сразу при запуске;
+  - записываются только ключи, сериализованное состояние которых
+    изменилось с последней записи или загрузки;
+  - все изменения одного прохода update_persistence записываются
+    одной транзакцией.
+Время запуска и записи не зависит от общего числа пользователей, а
+память на служебные хэши ограничена PERSISTENCE_STATE_CACHE_SIZE ключами.
+"""
+
+import asyncio
+import json
+import logging
+import pickle
+import sqlite3
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from config import CacheConfig, PersistenceConfig
+from utils.cache import LRUCache, MISSING
+
+# Настройка логгирования
+logger = logging.getLogger(__name__)
+
+# Виды записей persistent_data
+KIND_USER = "user"
+KIND_CHAT = "chat"
+KIND_BOT = "bot"
+KIND_CALLBACK = "callback"
+KIND_CONVERSATION = "conversation:{name}"
+
+class SQLitePersistence(BasePersistence):
+    """
+    BasePersistence поверх таблицы persistent_data.
+    Application.user_data содержит только пользователей, от которых были
+    обновления после запуска: состояние остальных лежит в БД и
+    подгружается при их следующем обновлении
+    """
+
+    def __init__(self, database, store_data=None, update_interval=None):
+        """
+        :param database: AsyncDatabase (запросы выполняются в ее пуле потоков)
+        :param store_data: Какие данные сохранять (по умолчанию только user_data -
+            остальные бот не использует)
+        :param update_interval: Интервал записи в секундах
+            (по умолчанию PersistenceConfig.UPDATE_INTERVAL)
+        """
+        super().__init__(
+            store_data=store_data or PersistenceInput(
+                bot_data=False, chat_data=False, callback_data=False
+            ),
+            update_interval=update_interval or PersistenceConfig.UPDATE_INTERVAL,
+        )
+        self.database = database
+        # (kind, key) -> (хэш сохраненного состояния или None - в БД нет записи,
+        # словарь user_data/chat_data в памяти); наличие ключа означает, что
+        # состояние загружено. Вытесненный ключ загружается повторно, а его
+        # следующая запись выполняется безусловно
+        self._stored = LRUCache(
+            CacheConfig.PERSISTENCE_STATE_CACHE_SIZE, on_evict=self._on_evict
+        )
+        # Загрузки, которые ждут параллельные обновления того же пользователя
+        self._loading = {}
+        # (kind, key) -> сериализованные данные или None (удаление) до записи
+        self._pending = {}
+        # Пакет, который записывается сейчас
+        self._writing = {}
+        self._write_task = None
+        self._stats = {
+            "loads": 0,
+            "batches": 0,
+            "written": 0,
+            "unchanged": 0,
+            "failed_batches": 0,
+        }
+
+    # ========== Загрузка ==========
+    async def _load(self, key, data):
+        """Загрузка ключа из БД в словарь data (один раз на ключ)"""
+        try:
+            # Еще не записанное состояние новее, чем в БД (например, после drop_*)
+            if key in self._pending:
+                blob = self._pending[key]
+            elif key in self._writing:
+                blob = self._writing[key]
+            else:
+                blob = await self.database.load_persistent_data(*key)
+            if blob is not None:
+                # Значения, записанные обработчиками до окончания загрузки, новее
+                for name, value in pickle.loads(blob).items():
+                    data.setdefault(name, value)
+            self._stored.set(key, (hash(blob) if blob is not None else None, data))
+            self._stats["loads"] += 1
+        finally:
+            self._loading.pop(key, None)
+
+    async def _refresh(self, kind, key_id, data):
+        key = (kind, str(key_id))
+        stored = self._stored.get(key)
+        if stored is not MISSING:
+            if stored[1] is not data:
+                # update_* получает копию данных, а при вытеснении
+                # сравнивается словарь, который меняют обработчики
+                self._stored.set(key, (stored[0], data))
+            return
+        loading = self._loading.get(key)
+        if loading is None:
+            loading = self._loading[key] = asyncio.ensure_future(self._load(key, data))
+        await loading
+
+    async def get_user_data(self):
+        """Пустой словарь: данные пользователей загружаются лениво (refresh_user_data)"""
+        return {}
+
+    async def get_chat_data(self):
+        """Пустой словарь: данные чатов загружаются лениво (refresh_chat_data)"""
+        return {}
+
+    async def get_bot_data(self):
+        blob = await self.database.load_persistent_data(KIND_BOT, "")
+        self._stored.set((KIND_BOT, ""), (hash(blob) if blob is not None else None, None))
+        return pickle.loads(blob) if blob is not None else {}
+
+    async def get_callback_data(self):
+        blob = await self.database.load_persistent_data(KIND_CALLBACK, "")
+        self._stored.set((KIND_CALLBACK, ""), (hash(blob) if blob is not None else None, None))
+        return pickle.loads(blob) if blob is not None else None
+
+    async def get_conversations(self, name):
+        kind = KIND_CONVERSATION.format(name=name)
+        conversations = {}
+        for key, blob in await self.database.load_persistent_kind(kind):
+            self._stored.set((kind, key), (hash(blob), None))
+            conversations[tuple(json.loads(key))] = pickle.loads(blob)
+        return conversations
+
+    async def refresh_user_data(self, user_id, user_data):
+        await self._refresh(KIND_USER, user_id, user_data)
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        await self._refresh(KIND_CHAT, chat_id, chat_data)
+
+    async def refresh_bot_data(self, bot_data):
+        """bot_data загружается целиком при запуске (get_bot_data)"""
+
+    # ========== Запись ==========
+    def _stage(self, kind, key_id, data, delete=False):
+        """
+        Постановка ключа в очередь записи, если его состояние изменилось
+        :param delete: Удалить запись ключа вместо сохранения data
+        """
+        key = (kind, str(key_id))
+        blob = None if delete else pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        digest = None if blob is None else hash(blob)
+        stored = self._stored.get(key)
+        if stored is not MISSING and stored[0] == digest:
+            self._stats["unchanged"] += 1
+            return
+        self._pending[key] = blob
+        self._schedule_write()
+        # Может вытеснить другой ключ (см. _on_evict)
+        self._stored.set(key, (digest, stored[1] if stored is not MISSING else None))
+
+    def _on_evict(self, key, stored):
+        """
+        Запись изменений вытесненного ключа, еще не переданных в update_*.
+        Повторная загрузка сливает состояние из БД с данными в памяти, и без
+        этой записи вернула бы значения, уже удаленные из памяти
+        """
+        digest, data = stored
+        if data is None:
+            return
+        blob = pickle.dumps(data, pickle.HIGHEST_PROTOCOL) if data else None
+        if (None if blob is None else hash(blob)) != digest:
+            self._pending[key] = blob
+            self._schedule_write()
+
+    def _schedule_write(self):
+        if self._write_task is None or self._write_task.done():
+            self._write_task = asyncio.create_task(self._write_pending())
+
+    async def _write_pending(self):
+        """Запись накопленных изменений пакетами (транзакция на пакет)"""
+        # Все update_* одного прохода update_persistence выполняются
+        # до этой точки и попадают в один пакет
+        await asyncio.sleep(0)
+        while self._pending:
+            batch, self._pending = self._pending, {}
+            self._writing = batch
+            try:
+                await self.database.save_persistent_data(
+                    [(kind, key, blob) for (kind, key), blob in batch.items()]
+                )
+            except sqlite3.Error:
+                logger.exception("Не удалось сохранить состояние %d ключей", len(batch))
+                self._stats["failed_batches"] += 1
+                # Повтор при следующей записи; более новые изменения не затираются
+                for key, blob in batch.items():
+                    self._pending.setdefault(key, blob)
+                return
+            finally:
+                self._writing = {}
+            self._stats["batches"] += 1
+            self._stats["written"] += len(batch)
+
+    async def update_user_data(self, user_id, data):
+        # Пустой словарь (весь ввод завершен) - запись удаляется
+        self._stage(KIND_USER, user_id, data, delete=not data)
+
+    async def update_chat_data(self, chat_id, data):
+        self._stage(KIND_CHAT, chat_id, data, delete=not data)
+
+    async def update_bot_data(self, data):
+        self._stage(KIND_BOT, "", data, delete=not data)
+
+    async def update_callback_data(self, data):
+        self._stage(KIND_CALLBACK, "", data)
+
+    async def update_conversation(self, name, key, new_state):
+        self._stage(
+            KIND_CONVERSATION.format(name=name), json.dumps(list(key)), new_state,
+            delete=new_state is None
+        )
+
+    def _drop(self, kind, key_id):
+        """Удаление ключа из БД и из памяти (до записи он читается из _pending)"""
+        self._stage(kind, key_id, None, delete=True)
+        self._stored.invalidate((kind, str(key_id)))
+
+    async def drop_user_data(self, user_id):
+        self._drop(KIND_USER, user_id)
+
+    async def drop_chat_data(self, chat_id):
+        self._drop(KIND_CHAT, chat_id)
+
+    async def flush(self):
+        """Запись всех изменений (вызывается Application при остановке)"""
+        if self._write_task:
+            await self._write_task
+        if self._pending:
+            await self._write_pending()
+
+    def get_stats(self):
+        """Счетчики загрузок и записей"""
+        cache = self._stored.get_stats()
+        return {
+            **self._stats,
+            "loaded_keys": cache["size"],
+            "evicted_keys": cache["evictions"],
+            "pending": len(self._pending),
+        }
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Модуль маршрутизации нажатий inline-кнопок
+callback_data (action и аргументы, см. utils.callback_codec) разбирается
+один раз; обработчик выбирается по action из словаря вместо
+последовательной проверки регулярных выражений отдельных CallbackQueryHandler
+"""
+
+import logging
+from telegram import Update
+from telegram.ext import CallbackQueryHandler, ContextTypes
+from utils.callback_codec import ACTION_CODES, CallbackDecodeError, codec
+
+# Настройка логгирования
+logger = logging.getLogger(__name__)
+
+class RouteCollisionError(ValueError):
+    """Два обработчика объявили одно и то же действие"""
+
+class CallbackRouter:
+    """Словарь маршрутов action -> обработчик для всех inline-кнопок"""
+
+    def __init__(self):
+        self.routes = {}
+        # Владелец маршрута (класс обработчиков) - для сообщений о коллизиях
+        self._owners = {}
+
+    def add_route(self, action, callback, owner=None):
+        """
+        Регистрация обработчика действия
+        :param action: Имя действия из таблицы опкодов ACTIONS
+        :param callback: Корутина callback(update, context); аргументы
+            кнопки передаются в context.args
+        :param owner: Кто объявил маршрут (для диагностики)
+        :raises RouteCollisionError: Действие уже занято
+        """
+        if action not in ACTION_CODES:
+            raise ValueError(f"Действие {action!r} отсутствует в таблице опкодов")
+        if action in self.routes:
+            raise RouteCollisionError(
+                f"Действие {action!r} объявлено дважды: "
+                f"{self._owners[action]} и {owner}"
+            )
+        self.routes[action] = callback
+        self._owners[action] = owner
+
+    def add_routes(self, routes, owner=None):
+        """Регистрация словаря маршрутов {action: callback}"""
+        for action, callback in routes.items():
+            self.add_route(action, callback, owner)
+
+    @staticmethod
+    def build(action, *args):
+        """Формирование callback_data кнопки (аргументы - int или str)"""
+        return codec.encode(action, *args)
+
+    @staticmethod
+    def parse(data):
+        """
+        Разбор callback_data
+        :return: Кортеж (action, список аргументов)
+        :raises CallbackDecodeError: Данные не в формате кодека
+        """
+        return codec.decode(data)
+
+    def resolve(self, data):
+        """
+        Поиск обработчика для callback_data
+        :return: Кортеж (callback или None, аргументы)
+        """
+        try:
+            action, args = self.parse(data)
+        except CallbackDecodeError:
+            return None, []
+        return self.routes.get(action), args
+
+    async def dispatch(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Единый обработчик всех нажатий inline-кнопок"""
+        callback, args = self.resolve(update.callback_query.data or "")
+        if callback is None:
+            logger.warning("Нет маршрута для callback_data %r", update.callback_query.data)
+            await update.callback_query.answer()
+            return
+        context.args = args
+        await callback(update, context)
+
+    def get_handler(self):
+        """CallbackQueryHandler, передающий все нажатия в маршрутизатор"""
+        return CallbackQueryHandler(self.dispatch)
+
+# Функция уровня модуля для формирования callback_data в клавиатурах
+build_callback = CallbackRouter.build
@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+Модуль планирования исходящих запросов к Bot API
+Подключается к Application как rate limiter PTB, поэтому через него
+проходят все вызовы бота (reply_text, edit_text, ...), а обработчики
+не меняются. Каждый запрос к чату берет токен из корзины чата
+(личные и групповые чаты - разные лимиты Telegram) и из общей корзины
+бота; ожидающие запросы обслуживаются по приоритету, поэтому ответы
+пользователю опережают уведомления. Ответ 429 (RetryAfter) ставит
+на паузу только корзину своего чата, и запрос повторяется автоматически.
+Ожидание токена идет внутри обработчика обновления, поэтому обновления
+разных чатов обрабатываются параллельно (ChatUpdateProcessor), а
+обновления одного чата - по очереди.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+
+from telegram.error import RetryAfter
+from telegram import Update
+from telegram.ext import BaseRateLimiter, BaseUpdateProcessor
+
+from config import SendQueueConfig
+
+# Настройка логгирования
+logger = logging.getLogger(__name__)
+
+class SendPriority:
+    """Приоритеты исходящих запросов (меньше - раньше)"""
+    # Ответы на действия пользователя (по умолчанию)
+    INTERACTIVE = 0
+    # Уведомления и массовые рассылки
+    NOTIFICATION = 1
+
+    NAMES = {INTERACTIVE: "interactive", NOTIFICATION: "notification"}
+
+class TokenBucket:
+    """Корзина токенов: rate токенов в секунду, не более capacity"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now):
+        """
+        Попытка взять токен
+        :return: 0 - токен взят, иначе секунды до появления следующего
+        """
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def is_full(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+class PriorityGate:
+    """
+    Корзина токенов с очередью ожидающих по приоритету.
+    Токены раздает одна фоновая задача: следующий токен получает
+    ожидающий с наименьшим приоритетом, при равенстве - пришедший раньше
+    """
+
+    def __init__(self, rate, capacity):
+        self.bucket = TokenBucket(rate, capacity)
+        self.paused_until = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._dispatcher = None
+
+    def _take(self):
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        return self.bucket.take(now)
+
+    async def acquire(self, priority):
+        """Ожидание токена"""
+        if not self._waiters and not self._take():
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self):
+        """Выдача токенов ожидающим по мере пополнения корзины"""
+        try:
+            while True:
+                # Отмененные ожидания токен не получают
+                while self._waiters and self._waiters[0][2].done():
+                    heapq.heappop(self._waiters)
+                if not self._waiters:
+                    break
+                delay = self._take()
+                if delay:
+                    await asyncio.sleep(delay)
+                    continue
+                heapq.heappop(self._waiters)[2].set_result(None)
+        finally:
+            self._dispatcher = None
+
+    def pause(self, seconds):
+        """Остановка выдачи токенов (ответ 429 от Telegram)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def is_idle(self):
+        """Нет ожидающих, корзина полна - состояние можно удалить"""
+        now = time.monotonic()
+        return not self._waiters and now >= self.paused_until and self.bucket.is_full(now)
+
+    def close(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+
+class LaneStats:
+    """
+    Метрики одной приоритетной полосы: depth - запросы в планировщике
+    (ожидают токен, выполняются или ждут повтора), ожидание - суммарное
+    время ожидания токенов запросом, включая паузы после 429
+    """
+
+    def __init__(self, samples=SendQueueConfig.WAIT_SAMPLES):
+        self.depth = 0
+        self.max_depth = 0
+        self.sent = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._waits = deque(maxlen=samples)
+
+    def enter(self):
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+
+    def leave(self, wait):
+        self.depth -= 1
+        self.sent += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self._waits.append(wait)
+
+    def snapshot(self):
+        waits = sorted(self._waits)
+
+        def percentile(share):
+            return waits[min(len(waits) - 1, int(len(waits) * share))] * 1000 if waits else 0.0
+
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "avg_wait_ms": self.total_wait / self.sent * 1000 if self.sent else 0.0,
+            "p50_wait_ms": percentile(0.5),
+            "p95_wait_ms": percentile(0.95),
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+class SendScheduler(BaseRateLimiter):
+    """
+    Планировщик исходящих запросов: общая корзина бота, корзины
+    чатов, приоритетные полосы и повтор после RetryAfter.
+    Приоритет запроса передается через rate_limit_args
+    (например, rate_limit_args=SendPriority.NOTIFICATION)
+    """
+
+    def __init__(self, max_retries=SendQueueConfig.MAX_RETRIES):
+        self.max_retries = max_retries
+        self.global_gate = PriorityGate(
+            SendQueueConfig.GLOBAL_RATE, SendQueueConfig.GLOBAL_BURST
+        )
+        self._chat_gates = {}
+        self.lanes = {priority: LaneStats() for priority in SendPriority.NAMES}
+        self.retries = 0
+        self.flood_waits = 0
+        self._notifications = set()
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        """Дожидается отправки уведомлений и останавливает раздачу токенов"""
+        if self._notifications:
+            await asyncio.gather(*self._notifications, return_exceptions=True)
+        self.global_gate.close()
+        for gate in self._chat_gates.values():
+            gate.close()
+        self._chat_gates.clear()
+
+    def _chat_gate(self, chat_id):
+        """Корзина чата (создается при первом запросе)"""
+        gate = self._chat_gates.get(chat_id)
+        if gate is None:
+            if len(self._chat_gates) >= SendQueueConfig.CHAT_STATE_LIMIT:
+                self._chat_gates = {
+                    key: value for key, value in self._chat_gates.items()
+                    if not value.is_idle()
+                }
+            # Отрицательный id или @username - группа или канал
+            if isinstance(chat_id, int) and chat_id > 0:
+                gate = PriorityGate(
+                    SendQueueConfig.PRIVATE_CHAT_RATE, SendQueueConfig.PRIVATE_CHAT_BURST
+                )
+            else:
+                gate = PriorityGate(
+                    SendQueueConfig.GROUP_CHAT_RATE, SendQueueConfig.GROUP_CHAT_BURST
+                )
+            self._chat_gates[chat_id] = gate
+        return gate
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        """Выполнение запроса в пределах лимитов Telegram"""
+        chat_id = data.get("chat_id")
+        # Запросы вне чата (answerCallbackQuery, setWebhook, ...) не ограничиваются
+        if chat_id is None:
+            return await callback(*args, **kwargs)
+
+        priority = rate_limit_args or SendPriority.INTERACTIVE
+        lane = self.lanes.get(priority) or self.lanes[SendPriority.NOTIFICATION]
+        lane.enter()
+        waited = 0.0
+        attempt = 0
+        try:
+            while True:
+                gate = self._chat_gate(chat_id)
+                queued_at = time.monotonic()
+                await gate.acquire(priority)
+                await self.global_gate.acquire(priority)
+                waited += time.monotonic() - queued_at
+
+                try:
+                    return await callback(*args, **kwargs)
+                except RetryAfter as error:
+                    self.flood_waits += 1
+                    # Пауза только для чата, в котором превышен лимит
+                    gate.pause(error.retry_after + SendQueueConfig.RETRY_MARGIN)
+                    if attempt >= self.max_retries:
+                        raise
+                    attempt += 1
+                    self.retries += 1
+                    logger.warning(
+                        "%s в чат %s: лимит Telegram, повтор через %s с (попытка %d)",
+                        endpoint, chat_id, error.retry_after, attempt
+                    )
+        finally:
+            lane.leave(waited)
+
+    def notify(self, bot, chat_id, text, **kwargs):
+        """
+        Фоновая отправка уведомления с низким приоритетом
+        (вызывающий не ждет очереди и повторов)
+        :return: asyncio.Task с отправленным сообщением
+        """
+        task = asyncio.create_task(bot.send_message(
+            chat_id, text, rate_limit_args=SendPriority.NOTIFICATION, **kwargs
+        ))
+        self._notifications.add(task)
+        task.add_done_callback(self._notification_done)
+        return task
+
+    def _notification_done(self, task):
+        self._notifications.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Уведомление не отправлено: %s", task.exception())
+
+    def get_stats(self):
+        """Метрики очереди: глубина и ожидание по полосам, повторы, чаты"""
+        return {
+            "lanes": {
+                SendPriority.NAMES[priority]: lane.snapshot()
+                for priority, lane in self.lanes.items()
+            },
+            "retries": self.retries,
+            "flood_waits": self.flood_waits,
+            "chats": len(self._chat_gates),
+            "pending_notifications": len(self._notifications),
+        }
+
+class ChatUpdateProcessor(BaseUpdateProcessor):
+    """
+    Параллельная обработка обновлений разных чатов.
+    Обновления одного чата выполняются по очереди в порядке поступления:
+    состояние ввода (awaiting_task, ...) и порядок ответов сохраняются,
+    а ожидание корзины чата не задерживает остальные чаты
+    """
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        # Ключ чата -> [asyncio.Lock, число обновлений чата в обработке]
+        self._chats = {}
+
+    @staticmethod
+    def _chat_key(update):
+        if not isinstance(update, Update):
+            return None
+        if update.effective_chat:
+            return update.effective_chat.id
+        if update.effective_user:
+            return ("user", update.effective_user.id)
+        return None
+
+    async def do_process_update(self, update, coroutine):
+        key = self._chat_key(update)
+        if key is None:
+            await coroutine
+            return
+        entry = self._chats.get(key)
+        if entry is None:
+            entry = self._chats[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await coroutine
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chats[key]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+"""
+Модуль замера обработчиков и методов БД
+Tracer оборачивает зарегистрированные обработчики Application (включая
+маршруты CallbackRouter) и публичные методы экземпляра Database.
+Для каждого обработчика/метода считаются вызовы, ошибки и строки,
+возвращенные из БД, а время выполнения попадает в гистограмму
+с границами в стиле Prometheus. Время замеряется только для доли
+вызовов SAMPLE_RATE; перцентили оцениваются по гистограмме.
+Снимок доступен администратору командой /stats и периодически
+записывается в текстовый файл формата Prometheus.
+"""
+
+import asyncio
+import bisect
+import functools
+import inspect
+import logging
+import os
+import random
+import threading
+import time
+
+from telegram.ext import ApplicationHandlerStop
+
+from config import TracingConfig
+
+# Настройка логгирования
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы времени (секунды)
+DURATION_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+METRIC_PREFIX = "task_tracker"
+
+class TraceKind:
+    """Виды замеряемых вызовов"""
+    HANDLER = "handler"
+    DATABASE = "db"
+
+def count_rows(result):
+    """
+    Количество строк в результате метода Database
+    :return: Число строк или None, если результат - не строки таблицы
+    """
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, tuple):
+        # fetchone() - одна строка
+        return 1
+    return None
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин (не потокобезопасна)"""
+
+    def __init__(self, bounds=DURATION_BUCKETS):
+        self.bounds = bounds
+        # Последняя корзина - значения больше всех границ (+Inf)
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, share):
+        """
+        Оценка перцентиля линейной интерполяцией внутри корзины
+        (как histogram_quantile в Prometheus), не больше наблюдавшегося максимума
+        """
+        if not self.count:
+            return 0.0
+        rank = share * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if index == len(self.bounds):
+                    # Выше последней границы интерполировать не между чем
+                    return self.max
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index]
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def cumulative(self):
+        """Пары (граница, количество значений не больше границы) для экспорта"""
+        total = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+class TraceSeries:
+    """Счетчики одного обработчика или метода БД"""
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.histogram = Histogram()
+        self._lock = threading.Lock()
+
+    def record(self, duration=None, error=False, rows=None):
+        """
+        Учет одного вызова
+        :param duration: Время выполнения в секундах (None - вызов не в выборке)
+        :param error: Вызов завершился исключением
+        :param rows: Строк возвращено из БД
+        """
+        with self._lock:
+            self.calls += 1
+            if error:
+                self.errors += 1
+            if rows:
+                self.rows += rows
+            if duration is not None:
+                self.histogram.observe(duration)
+
+    def snapshot(self):
+        with self._lock:
+            histogram = self.histogram
+            sampled = histogram.count
+            return {
+                "kind": self.kind,
+                "name": self.name,
+                "calls": self.calls,
+                "errors": self.errors,
+                "rows": self.rows,
+                "sampled": sampled,
+                "avg_ms": histogram.sum / sampled * 1000 if sampled else 0.0,
+                "p50_ms": histogram.quantile(0.50) * 1000,
+                "p95_ms": histogram.quantile(0.95) * 1000,
+                "p99_ms": histogram.quantile(0.99) * 1000,
+                # Оценка суммарного времени всех вызовов по выборке
+                "total_ms": histogram.sum / sampled * self.calls * 1000 if sampled else 0.0,
+            }
+
+class Tracer:
+    """Реестр счетчиков и обертки для обработчиков и методов БД"""
+
+    # Методы Database, которые не оборачиваются
+    SKIP_METHODS = {"close"}
+
+    def __init__(self, sample_rate=None):
+        """
+        :param sample_rate: Доля вызовов с замером времени
+            (по умолчанию TracingConfig.SAMPLE_RATE)
+        """
+        self.sample_rate = TracingConfig.SAMPLE_RATE if sample_rate is None else sample_rate
+        self.started = time.time()
+        self._series = {}
+        self._lock = threading.Lock()
+        self._export_task = None
+        self._export_path = None
+
+    def series(self, kind, name):
+        """Счетчики вызова (создаются при первом обращении)"""
+        key = (kind, name)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(key, TraceSeries(kind, name))
+        return series
+
+    def _sampled(self):
+        rate = self.sample_rate
+        return rate >= 1.0 or random.random() < rate
+
+    def trace_async(self, kind, name, callback):
+        """Обертка корутины callback с учетом вызовов в series(kind, name)"""
+        series = self.series(kind, name)
+
+        @functools.wraps(callback)
+        async def traced(*args, **kwargs):
+            started = time.perf_counter() if self._sampled() else None
+            error = False
+            try:
+                return await callback(*args, **kwargs)
+            except ApplicationHandlerStop:
+                # Штатное завершение обработки обновления, не ошибка
+                raise
+            except Exception:
+                error = True
+                raise
+            finally:
+                series.record(
+                    time.perf_counter() - started if started is not None else None, error
+                )
+
+        traced.traced = True
+        return traced
+
+    def trace_sync(self, kind, name, method):
+        """Обертка функции method с учетом вызовов и возвращенных строк"""
+        series = self.series(kind, name)
+
+        @functools.wraps(method)
+        def traced(*args, **kwargs):
+            if not self._sampled():
+                try:
+                    result = method(*args, **kwargs)
+                except Exception:
+                    series.record(None, True)
+                    raise
+                series.record(None, False, count_rows(result))
+                return result
+
+            started = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            except Exception:
+                series.record(time.perf_counter() - started, True)
+                raise
+            series.record(time.perf_counter() - started, False, count_rows(result))
+            return result
+
+        traced.traced = True
+        return traced
+
+    def instrument_database(self, database):
+        """
+        Замена публичных методов экземпляра Database обертками.
+        Вызывается до первого обращения через AsyncDatabase, которая
+        кэширует найденные методы. Генераторы (export_rows) не
+        оборачиваются: их время складывается из чтения потребителем
+        """
+        for name, method in inspect.getmembers(database, inspect.ismethod):
+            if (name.startswith("_") or name in self.SKIP_METHODS
+                    or inspect.isgeneratorfunction(method)
+                    or getattr(method, "traced", False)):
+                continue
+            setattr(database, name, self.trace_sync(TraceKind.DATABASE, name, method))
+
+    def instrument_application(self, application, router=None):
+        """
+        Обертка всех зарегистрированных обработчиков Application.
+        Нажатия кнопок учитываются по маршрутам router, а не по общему
+        обработчику CallbackRouter.dispatch
+        :param application: telegram.ext.Application после регистрации обработчиков
+        :param router: CallbackRouter с маршрутами inline-кнопок
+        """
+        for handlers in application.handlers.values():
+            for handler in handlers:
+                callback = handler.callback
+                if getattr(callback, "traced", False):
+                    continue
+                if router and getattr(callback, "__self__", None) is router:
+                    continue
+                handler.callback = self.trace_async(
+                    TraceKind.HANDLER, callback.__qualname__, callback
+                )
+
+        if router:
+            for action, callback in router.routes.items():
+                if not getattr(callback, "traced", False):
+                    router.routes[action] = self.trace_async(
+                        TraceKind.HANDLER, callback.__qualname__, callback
+                    )
+
+    def snapshot(self, kind=None):
+        """
+        Снимок счетчиков
+        :param kind: Вид вызовов из TraceKind (None - все)
+        :return: Список словарей, отсортированный по суммарному времени
+        """
+        with self._lock:
+            series = list(self._series.values())
+        snapshots = [item.snapshot() for item in series if kind in (None, item.kind)]
+        snapshots.sort(key=lambda item: (item["total_ms"], item["calls"]), reverse=True)
+        return snapshots
+
+    def reset(self):
+        """Сброс всех счетчиков (обертки продолжают работать)"""
+        with self._lock:
+            for series in self._series.values():
+                with series._lock:
+                    series.calls = series.errors = series.rows = 0
+                    series.histogram = Histogram()
+            self.started = time.time()
+
+    def render_prometheus(self):
+        """Счетчики в текстовом формате Prometheus"""
+        with self._lock:
+            series = sorted(self._series.values(), key=lambda item: (item.kind, item.name))
+
+        calls, errors, rows, durations = [], [], [], []
+        for item in series:
+            with item._lock:
+                labels = f'kind="{item.kind}",name="{item.name}"'
+                calls.append(f"{METRIC_PREFIX}_calls_total{{{labels}}} {item.calls}")
+                errors.append(f"{METRIC_PREFIX}_errors_total{{{labels}}} {item.errors}")
+                if item.kind == TraceKind.DATABASE:
+                    rows.append(f"{METRIC_PREFIX}_rows_total{{{labels}}} {item.rows}")
+                for bound, count in item.histogram.cumulative():
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    durations.append(
+                        f'{METRIC_PREFIX}_duration_seconds_bucket{{{labels},le="{le}"}} {count}'
+                    )
+                durations.append(
+                    f"{METRIC_PREFIX}_duration_seconds_sum{{{labels}}} {item.histogram.sum!r}"
+                )
+                durations.append(
+                    f"{METRIC_PREFIX}_duration_seconds_count{{{labels}}} {item.histogram.count}"
+                )
+
+        lines = []
+        for metric, kind, help_text, samples in (
+            ("calls_total", "counter", "Вызовы обработчиков и методов БД", calls),
+            ("errors_total", "counter", "Вызовы, завершившиеся исключением", errors),
+            ("rows_total", "counter", "Строк возвращено методами БД", rows),
+            ("duration_seconds", "histogram",
+             "Время выполнения (только вызовы из выборки)", durations),
+        ):
+            lines.append(f"# HELP {METRIC_PREFIX}_{metric} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{metric} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """
+        Запись метрик в файл: сначала во временный, затем переименование,
+        чтобы сборщик не прочитал файл наполовину
+        """
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as stream:
+            stream.write(self.render_prometheus())
+        os.replace(temporary, path)
+
+    async def _export_loop(self, path, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.write_prometheus, path)
+            except OSError:
+                logger.exception("Не удалось записать метрики в %s", path)
+
+    def start_export(self, path=None, interval=None):
+        """
+        Периодическая запись метрик в файл в текущем цикле событий
+        :param path: Файл метрик (по умолчанию TracingConfig.PROMETHEUS_FILE;
+            None - запись выключена)
+        :param interval: Интервал в секундах (по умолчанию PROMETHEUS_INTERVAL)
+        """
+        path = path or TracingConfig.PROMETHEUS_FILE
+        if not path or self._export_task:
+            return
+        self._export_path = path
+        self._export_task = asyncio.create_task(
+            self._export_loop(path, interval or TracingConfig.PROMETHEUS_INTERVAL)
+        )
+
+    async def stop_export(self):
+        """Остановка периодической записи с последней записью файла"""
+        if not self._export_task:
+            return
+        self._export_task.cancel()
+        try:
+            await self._export_task
+        except asyncio.CancelledError:
+            pass
+        self._export_task = None
+        await asyncio.to_thread(self.write_prometheus, self._export_path)
+
+# Глобальный реестр счетчиков процесса
+tracer = Tracer()
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Модуль импорта и экспорта данных
+Пользователи, задачи и комментарии передаются потоком записей
+(вид записи, словарь полей) между Database.export_rows/import_rows и
+файлом JSONL или CSV, сжатым gzip; в памяти находится только текущая
+порция строк, поэтому объем данных не ограничен памятью процесса.
+
+JSONL: по объекту в строке с полем "type" (user, task, comment).
+CSV: колонка type и объединение полей всех видов записей (CSV_COLUMNS).
+"""
+
+import csv
+import gzip
+import json
+import os
+import time
+from collections import Counter
+from config import TransferConfig
+
+FORMATS = ("jsonl", "csv")
+
+CSV_COLUMNS = (
+    "type", "id", "task_id", "username", "role", "description",
+    "status", "created_by", "text", "created_ts",
+)
+INTEGER_COLUMNS = {"id", "task_id", "created_ts"}
+
+def detect_format(path):
+    """Формат по имени файла (data.csv.gz -> csv, иначе jsonl)"""
+    name = os.path.basename(path).lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    return "csv" if name.endswith(".csv") else "jsonl"
+
+def write_jsonl(records, stream):
+    for kind, fields in records:
+        stream.write(json.dumps({"type": kind, **fields}, ensure_ascii=False))
+        stream.write("\n")
+
+def read_jsonl(stream):
+    for line in stream:
+        if line.strip():
+            fields = json.loads(line)
+            yield fields.pop("type", None), fields
+
+def write_csv(records, stream):
+    writer = csv.DictWriter(stream, CSV_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    for kind, fields in records:
+        writer.writerow({"type": kind, **fields})
+
+def read_csv(stream):
+    for row in csv.DictReader(stream):
+        kind = row.pop("type", None)
+        yield kind, {
+            column: (int(value) if value else None) if column in INTEGER_COLUMNS else value
+            for column, value in row.items()
+        }
+
+WRITERS = {"jsonl": write_jsonl, "csv": write_csv}
+READERS = {"jsonl": read_jsonl, "csv": read_csv}
+
+class TransferProgress:
+    """Счетчик строк и скорости передачи с периодическим отчетом"""
+
+    def __init__(self, callback=None, interval=TransferConfig.PROGRESS_INTERVAL):
+        """
+        :param callback: Функция callback(progress), вызываемая не чаще
+            раза в interval секунд (из потока, выполняющего передачу)
+        :param interval: Интервал отчетов в секундах
+        """
+        self.callback = callback
+        self.interval = interval
+        self.rows = 0
+        self.counts = Counter()
+        self.started = time.monotonic()
+        self.finished = None
+        self._next_report = self.started + interval
+
+    def track(self, records):
+        """Подсчет записей потока без его буферизации"""
+        for record in records:
+            self.rows += 1
+            self.counts[record[0]] += 1
+            if self.callback and self.rows % 1000 == 0:
+                now = time.monotonic()
+                if now >= self._next_report:
+                    self._next_report = now + self.interval
+                    self.callback(self)
+            yield record
+        self.finished = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def rate(self):
+        """Строк в секунду"""
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        """Строка отчета для пользователя"""
+        details = ", ".join(f"{kind}: {count}" for kind, count in sorted(self.counts.items()))
+        return (
+            f"{self.rows} строк ({details or 'нет данных'}) "
+            f"за {self.elapsed:.1f} с, {self.rate:.0f} строк/с"
+        )
+
+def export_data(database, path, fmt=None, progress=None):
+    """
+    Выгрузка БД в сжатый gzip файл
+    :param database: Экземпляр Database
+    :param path: Путь к файлу (.jsonl.gz или .csv.gz)
+    :param fmt: Формат из FORMATS (по умолчанию - по имени файла)
+    :param progress: TransferProgress для отчетов о ходе выгрузки
+    :return: TransferProgress с итогами
+    """
+    fmt = fmt or detect_format(path)
+    progress = progress or TransferProgress()
+    with gzip.open(path, "wt", encoding="utf-8", newline="",
+                   compresslevel=TransferConfig.GZIP_LEVEL) as stream:
+        WRITERS[fmt](progress.track(database.export_rows()), stream)
+    return progress
+
+def import_data(database, path, fmt=None, progress=None):
+    """
+    Загрузка файла выгрузки в БД (gzip определяется по расширению .gz)
+    :param database: Экземпляр Database
+    :param path: Путь к файлу выгрузки
+    :param fmt: Формат из FORMATS (по умолчанию - по имени файла)
+    :param progress: TransferProgress для отчетов о ходе загрузки
+    :return: Кортеж (TransferProgress, {вид записи: добавлено строк})
+    """
+    fmt = fmt or detect_format(path)
+    progress = progress or TransferProgress()
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", newline="") as stream:
+        inserted = database.import_rows(progress.track(READERS[fmt](stream)))
+    return progress, inserted